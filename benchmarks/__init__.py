@@ -0,0 +1,10 @@
+"""
+Benchmarks of moodler, run as modules, e.g. `python -m benchmarks.bench_session`.
+"""
+
+import os
+
+# The settings moodler reads when calling the Moodle API, so the benchmarks
+# run without a .env file
+for variable in ("TOKEN", "URL", "MOODLE_USERNAME", "MOODLE_PASSWORD"):
+    os.environ.setdefault(variable, "benchmark")
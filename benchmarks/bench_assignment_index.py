@@ -0,0 +1,84 @@
+"""
+Compares matching submissions to grades with a linear scan over the grades
+(the previous `Assignment.__init__` logic) and with a userid index, and times
+building whole Assignment objects, on synthetic courses.
+
+Usage:
+    python -m benchmarks.bench_assignment_index
+"""
+
+import timeit
+
+from moodler.assignment import Assignment, index_grades_by_user
+
+ASSIGNMENT_JSON = {"id": 1, "cmid": 1, "name": "Benchmark"}
+COURSE_SIZES = (1000, 2500, 5000, 10000)
+
+
+def synthetic_course(students):
+    submissions = [
+        {
+            "userid": user_id,
+            "status": "submitted",
+            "attemptnumber": 0,
+            "gradingstatus": "graded",
+            "timemodified": 1700000000,
+            "plugins": [],
+        }
+        for user_id in range(students)
+    ]
+    # Moodle does not return the grades in the submissions order
+    grades = [
+        {"userid": user_id, "timemodified": 1700000001, "grade": "50.0"}
+        for user_id in reversed(range(students))
+    ]
+    return submissions, grades
+
+
+def linear_scan(submissions, grades):
+    for submission in submissions:
+        for grade in grades:
+            if submission["userid"] == grade["userid"]:
+                break
+
+
+def indexed(submissions, grades):
+    grades_by_user = index_grades_by_user(grades)
+    for submission in submissions:
+        grades_by_user.get(submission["userid"])
+
+
+def main():
+    print(
+        "{:>8} {:>14} {:>14} {:>10} {:>14}".format(
+            "students", "linear scan", "index", "speedup", "Assignment()"
+        )
+    )
+    for students in COURSE_SIZES:
+        submissions, grades = synthetic_course(students)
+        linear_time = min(
+            timeit.repeat(lambda: linear_scan(submissions, grades), number=1, repeat=3)
+        )
+        index_time = min(
+            timeit.repeat(lambda: indexed(submissions, grades), number=1, repeat=3)
+        )
+        assignment_time = min(
+            timeit.repeat(
+                lambda: Assignment(ASSIGNMENT_JSON, submissions, grades),
+                number=1,
+                repeat=3,
+            )
+        )
+        print(
+            "{:>8} {:>12.2f}ms {:>12.2f}ms {:>9.0f}x {:>12.2f}ms".format(
+                students,
+                linear_time * 1000,
+                index_time * 1000,
+                linear_time / index_time,
+                assignment_time * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
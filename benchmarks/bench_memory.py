@@ -0,0 +1,207 @@
+"""
+Measures the memory held by the parsed Assignment objects of a synthetic
+course with tracemalloc, and the peak RSS, with and without `__slots__` on
+the submissions, grades and files, and with and without keeping their
+source JSON (KEEP_RAW_JSON).
+
+Usage:
+    python -m benchmarks.bench_memory [--students 1000] [--assignments 20]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+from moodler import assignment, submission
+from moodler.assignment import Assignment
+
+# The configurations measured, the unslotted one with the source JSON being
+# how submissions were held before
+CONFIGURATIONS = (
+    ("dict, keep JSON", False, "true"),
+    ("slots, keep JSON", True, "true"),
+    ("slots, drop JSON", True, "false"),
+)
+
+
+def synthetic_assignment(assignment_id, students):
+    submissions = [
+        {
+            "id": assignment_id * students + user_id,
+            "userid": user_id,
+            "attemptnumber": 0,
+            "timecreated": 1700000000,
+            "timemodified": 1700000000,
+            "status": "submitted",
+            "groupid": 0,
+            "gradingstatus": "graded",
+            "plugins": [
+                {
+                    "type": "onlinetext",
+                    "name": "Online text",
+                    "fileareas": [{"area": "submissions_onlinetext", "files": []}],
+                    "editorfields": [
+                        {
+                            "name": "onlinetext",
+                            "description": "Online text submissions",
+                            "text": "",
+                            "format": 1,
+                        }
+                    ],
+                },
+                {
+                    "type": "file",
+                    "name": "File submissions",
+                    "fileareas": [
+                        {
+                            "area": "submission_files",
+                            "files": [
+                                {
+                                    "filename": "solution.py",
+                                    "filepath": "/",
+                                    "filesize": 418,
+                                    "fileurl": "http://moodle/webservice/pluginfile.php/"
+                                    f"{assignment_id}/{user_id}/solution.py",
+                                    "timemodified": 1700000000,
+                                    "mimetype": "text/plain",
+                                    "isexternalfile": False,
+                                }
+                            ],
+                        }
+                    ],
+                },
+                {"type": "comments", "name": "Submission comments"},
+            ],
+        }
+        for user_id in range(students)
+    ]
+    grades = [
+        {
+            "id": assignment_id * students + user_id,
+            "userid": user_id,
+            "attemptnumber": 0,
+            "timecreated": 1700000001,
+            "timemodified": 1700000001,
+            "grader": 2,
+            "grade": "50.00000",
+        }
+        for user_id in range(students)
+    ]
+    return {"id": assignment_id, "cmid": assignment_id, "name": "Benchmark"}, (
+        submissions,
+        grades,
+    )
+
+
+def without_slots(cls):
+    """
+    Returns a copy of `cls` keeping its attributes in a `__dict__`.
+    """
+    slots = set(cls.__slots__)
+    namespace = {
+        name: value
+        for name, value in vars(cls).items()
+        if name not in slots and name not in ("__slots__", "__dict__", "__weakref__")
+    }
+    return type(cls.__name__, cls.__bases__, namespace)
+
+
+def use_unslotted_classes():
+    # Submission creates its Grade and SubmissionFile objects through the
+    # globals of moodler.submission, and Assignment its submissions through
+    # the globals of moodler.assignment
+    submission.Grade = without_slots(submission.Grade)
+    submission.SubmissionFile = without_slots(submission.SubmissionFile)
+    assignment.Submission = without_slots(submission.Submission)
+
+
+def build_course(students, assignments):
+    course = []
+    for assignment_id in range(assignments):
+        assignment_json, (submissions, grades) = synthetic_assignment(
+            assignment_id, students
+        )
+        course.append(Assignment(assignment_json, submissions, grades))
+    return course
+
+
+def measure(students, assignments):
+    """
+    Builds the course and prints the memory it retains, the peak traced memory
+    and the peak RSS of the process as JSON.
+    """
+    tracemalloc.start()
+    course = build_course(students, assignments)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        json.dumps(
+            {
+                "objects": len(course),
+                "retained": retained,
+                "peak": peak,
+                # Kilobytes on Linux
+                "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--assignments", type=int, default=20)
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--unslotted", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        if args.unslotted:
+            use_unslotted_classes()
+        measure(args.students, args.assignments)
+        return
+
+    print(
+        "{} students x {} assignments = {} submissions".format(
+            args.students, args.assignments, args.students * args.assignments
+        )
+    )
+    print("{:<18} {:>12} {:>12} {:>12}".format("", "retained", "peak", "peak RSS"))
+    for name, slotted, keep_json in CONFIGURATIONS:
+        # Every configuration runs in a fresh process, for a comparable RSS
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_memory",
+                "--measure",
+                "--students",
+                str(args.students),
+                "--assignments",
+                str(args.assignments),
+                *(() if slotted else ("--unslotted",)),
+            ],
+            env={**os.environ, "KEEP_RAW_JSON": keep_json},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        result = json.loads(output)
+        print(
+            "{:<18} {:>10.1f}MB {:>10.1f}MB {:>10.1f}MB".format(
+                name,
+                result["retained"] / 2**20,
+                result["peak"] / 2**20,
+                result["max_rss"] / 2**20,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
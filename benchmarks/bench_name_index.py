@@ -0,0 +1,73 @@
+"""
+Compares looking up students by part of their name with a linear scan over
+the enrolled users (the previous `get_students_ids_by_name` logic) and with
+the n-gram index of `StudentNameIndex`, on synthetic courses.
+
+Usage:
+    python -m benchmarks.bench_name_index
+"""
+
+import random
+import string
+import timeit
+
+from moodler.students import StudentNameIndex
+
+COURSE_SIZES = (1000, 10000, 30000)
+QUERIES = 1000
+
+
+def random_word(rng):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+
+
+def synthetic_course(students, rng):
+    return {
+        user_id: "{} {}".format(random_word(rng), random_word(rng)).title()
+        for user_id in range(students)
+    }
+
+
+def linear_scan(students, queries):
+    for query in queries:
+        query = query.lower()
+        [user_id for user_id, name in students.items() if query in name.lower()]
+
+
+def indexed(students, queries):
+    index = StudentNameIndex(students)
+    for query in queries:
+        index.find(query)
+
+
+def main():
+    rng = random.Random(0)
+    print(
+        "{:>8} {:>8} {:>14} {:>14} {:>10}".format(
+            "students", "queries", "linear scan", "index", "speedup"
+        )
+    )
+    for students_count in COURSE_SIZES:
+        students = synthetic_course(students_count, rng)
+        queries = [
+            name.split()[1] for name in rng.sample(list(students.values()), QUERIES)
+        ]
+        linear_time = min(
+            timeit.repeat(lambda: linear_scan(students, queries), number=1, repeat=1)
+        )
+        index_time = min(
+            timeit.repeat(lambda: indexed(students, queries), number=1, repeat=3)
+        )
+        print(
+            "{:>8} {:>8} {:>12.2f}ms {:>12.2f}ms {:>9.0f}x".format(
+                students_count,
+                QUERIES,
+                linear_time * 1000,
+                index_time * 1000,
+                linear_time / index_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
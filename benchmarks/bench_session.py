@@ -0,0 +1,79 @@
+"""
+Compares the per-call latency of a bare `requests.post` (a new connection for
+every call) with the pooled keep-alive `MoodleClient`, against a local
+stand-in for the Moodle web service.
+
+Usage:
+    python -m benchmarks.bench_session [--calls 500]
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from moodler.moodle_api import HEADERS, MoodleClient, prepare_data
+
+RESPONSE_BODY = json.dumps({"courses": [], "warnings": []}).encode()
+
+
+class MoodleStandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def bare_post(url, calls):
+    data = prepare_data("mod_assign_get_assignments", courseids=[1])
+    for _ in range(calls):
+        requests.post(url, data, headers=HEADERS).json()
+
+
+def pooled_client(url, calls):
+    client = MoodleClient(url=url)
+    for _ in range(calls):
+        client.call("mod_assign_get_assignments", courseids=[1])
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MoodleStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:{}/webservice/rest/server.php".format(server.server_port)
+
+    results = {}
+    for name, benchmark in (
+        ("requests.post", bare_post),
+        ("MoodleClient", pooled_client),
+    ):
+        start = time.perf_counter()
+        benchmark(url, args.calls)
+        results[name] = (time.perf_counter() - start) / args.calls * 1000
+        print("{:<15} {:.3f} ms/call".format(name, results[name]))
+
+    saved = results["requests.post"] - results["MoodleClient"]
+    print(
+        "Saved {:.3f} ms/call ({:.0%})".format(saved, saved / results["requests.post"])
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures the start up time of the command line and of importing
+`moodler.moodle`, which both leave the HTTP stack to the commands using it,
+against importing `moodler.moodle_api`, and lists the slowest imports of the
+latter.
+
+Usage:
+    python -m benchmarks.bench_startup
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RUNS = 10
+TOP_IMPORTS = 10
+
+COMMANDS = {
+    "main.py --help": [str(ROOT / "main.py"), "--help"],
+    "import moodler.moodle": ["-c", "import moodler.moodle"],
+    "import moodler.moodle_api": ["-c", "import moodler.moodle_api"],
+}
+
+IMPORT_TIME_PATTERN = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run(arguments, extra_flags=()):
+    return subprocess.run(
+        [sys.executable, *extra_flags, *arguments],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+
+
+def measure(arguments):
+    durations = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run(arguments)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def slowest_imports(arguments):
+    # -X importtime reports the cumulative time of every import on stderr
+    output = run(arguments, ("-X", "importtime")).stderr
+    imports = []
+    for match in IMPORT_TIME_PATTERN.finditer(output):
+        cumulative, indent, module = match.groups()
+        imports.append((int(cumulative), len(indent), module))
+    return sorted(imports, reverse=True)[:TOP_IMPORTS]
+
+
+def main():
+    for name, arguments in COMMANDS.items():
+        print(f"{name:<25}{measure(arguments) * 1000:>8.1f}ms (median of {RUNS})")
+
+    print()
+    print("Slowest imports of moodler.moodle_api (cumulative):")
+    for cumulative, depth, module in slowest_imports(
+        COMMANDS["import moodler.moodle_api"]
+    ):
+        print(f"  {cumulative / 1000:>8.1f}ms  {' ' * depth}{module}")
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares counting the submissions of a synthetic course one by one (without
+NumPy) and with the masks and group-bys of a SubmissionTable, for
+`submissions_statistics` and `status_report`.
+
+Usage:
+    python -m benchmarks.bench_statistics
+"""
+
+import timeit
+from unittest import mock
+
+from moodler.assignment import Assignment
+from moodler.moodle import status_report, submissions_statistics
+
+COURSE_SIZES = ((100, 10), (1000, 20), (3000, 30))
+GROUPS = 10
+STATUSES = ("submitted", "submitted", "submitted", "draft", "new")
+GRADING_STATUSES = ("notgraded", "graded", "released", "inmarking")
+
+
+def synthetic_course(students, assignments):
+    course = []
+    for assignment_id in range(assignments):
+        submissions = [
+            {
+                "userid": user_id,
+                "status": STATUSES[(user_id + assignment_id) % len(STATUSES)],
+                "attemptnumber": 0,
+                "gradingstatus": GRADING_STATUSES[user_id % len(GRADING_STATUSES)],
+                "timemodified": 1700000000 + user_id % 3,
+                "plugins": [],
+            }
+            for user_id in range(students)
+        ]
+        # Every other student was graded, before or after submitting
+        grades = [
+            {"userid": user_id, "timemodified": 1700000001, "grade": "50.0"}
+            for user_id in range(0, students, 2)
+        ]
+        course.append(
+            Assignment(
+                {
+                    "id": assignment_id,
+                    "cmid": assignment_id,
+                    "name": f"Ex{assignment_id}",
+                },
+                submissions,
+                grades,
+            )
+        )
+    return course
+
+
+def main():
+    print(
+        "{:>8} {:>11} {:>12} {:>12} {:>12} {:>12}".format(
+            "students",
+            "assignments",
+            "stats loop",
+            "stats table",
+            "report loop",
+            "report table",
+        )
+    )
+    for students, assignments in COURSE_SIZES:
+        group_names = [f"Group {index}" for index in range(GROUPS)]
+        context = mock.Mock(
+            students={user_id: f"Student {user_id}" for user_id in range(students)},
+            assignments=synthetic_course(students, assignments),
+            user_group_map={
+                user_id: group_names[user_id % GROUPS] for user_id in range(students)
+            },
+        )
+        groups = [mock.Mock(name=name) for name in group_names]
+        for group, name in zip(groups, group_names):
+            group.name = name
+
+        def time(function, **kwargs):
+            return min(timeit.repeat(lambda: function(**kwargs), number=1, repeat=3))
+
+        timings = []
+        for function, kwargs in (
+            (submissions_statistics, {"groups": groups}),
+            (status_report, {}),
+        ):
+            with mock.patch("moodler.moodle._submission_table", return_value=None):
+                timings.append(time(function, course_id=1, context=context, **kwargs))
+            timings.append(time(function, course_id=1, context=context, **kwargs))
+
+        print(
+            "{:>8} {:>11} {:>10.1f}ms {:>10.1f}ms {:>10.1f}ms {:>10.1f}ms".format(
+                students, assignments, *(timing * 1000 for timing in timings)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares encoding a `mod_assign_save_grades` request with the previous
+recursive `urlencode` and `prepare_data` and with the current ones.
+
+Usage:
+    python -m benchmarks.bench_urlencode
+"""
+
+import os
+import timeit
+import urllib.parse
+
+from moodler.moodle_api import prepare_data
+from moodler.urlencode import iterate
+
+GRADE_COUNTS = (10, 100, 500)
+
+
+def recursive_urlencode(input, path="", delimiter="&"):
+    def encode(s):
+        return urllib.parse.quote_plus(str(s))
+
+    def get_prefix(path, key):
+        return f"{path}[{encode(key)}]" if path else encode(key)
+
+    def build(input, path):
+        str_list = []
+        for key, value in iterate(input):
+            if isinstance(value, (list, dict)):
+                str_list.extend(build(value, get_prefix(path, key)))
+            elif value is not None:
+                str_list.append(f"{get_prefix(path, key)}={encode(value)}")
+        return str_list
+
+    return delimiter.join(build(input, path))
+
+
+def recursive_prepare_data(moodle_function, **kwargs):
+    return recursive_urlencode(
+        {
+            **kwargs,
+            "wstoken": os.environ["TOKEN"],
+            "wsfunction": moodle_function,
+            "moodlewsrestformat": "json",
+        }
+    )
+
+
+def save_grades_kwargs(grades):
+    return {
+        "assignmentid": 1,
+        "applytoall": 1,
+        "grades": [
+            {
+                "userid": user_id,
+                "grade": 85.5,
+                "attemptnumber": -1,
+                "addattempt": 0,
+                "workflowstate": "released",
+                "plugindata": {
+                    "assignfeedbackcomments_editor": {
+                        "format": 4,
+                        "text": "**Well done**, see the comments in the file",
+                    }
+                },
+            }
+            for user_id in range(grades)
+        ],
+    }
+
+
+def main():
+    print(
+        "{:>8} {:>14} {:>14} {:>10}".format("grades", "recursive", "current", "speedup")
+    )
+    for grades in GRADE_COUNTS:
+        kwargs = save_grades_kwargs(grades)
+        assert recursive_prepare_data(
+            "mod_assign_save_grades", **kwargs
+        ) == prepare_data("mod_assign_save_grades", **kwargs)
+
+        number = max(1, 2000 // grades)
+        recursive_time = min(
+            timeit.repeat(
+                lambda: recursive_prepare_data("mod_assign_save_grades", **kwargs),
+                number=number,
+                repeat=5,
+            )
+        )
+        current_time = min(
+            timeit.repeat(
+                lambda: prepare_data("mod_assign_save_grades", **kwargs),
+                number=number,
+                repeat=5,
+            )
+        )
+        print(
+            "{:>8} {:>12.3f}ms {:>12.3f}ms {:>9.1f}x".format(
+                grades,
+                recursive_time / number * 1000,
+                current_time / number * 1000,
+                recursive_time / current_time,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,8 @@ import logging
 from pathlib import Path
 from pprint import pprint
 
-from tabulate import tabulate
-
-from moodler.moodle import (
-    export_all,
-    export_feedbacks,
-    status_report,
-    submissions_statistics,
-)
-from moodler.students import get_students
+# The moodler modules and tabulate are imported by the commands that use them,
+# so the help and argument errors are printed without loading the HTTP stack
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +16,22 @@ def setup_logging():
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.set_defaults(which="none")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not use or store cached Moodle responses",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore the responses stored in the disk cache and store fresh ones",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Keep a snapshot of the submissions and grades and only fetch their "
+        "changes since the last run, --refresh fetches everything again",
+    )
     subparsers = parser.add_subparsers(dest="which", required=True)
 
     parser_ungraded = subparsers.add_parser(
@@ -56,6 +65,11 @@ def parse_args():
     parser_export.add_argument(
         "download_folder", type=str, help="The folder to export to"
     )
+    parser_export.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete the exported files that were removed from the course",
+    )
 
     parser_list_students = subparsers.add_parser(
         "list_students", help="List names of all students"
@@ -76,27 +90,67 @@ def parse_args():
     return args, parser
 
 
+def setup_cache(no_cache, refresh):
+    from moodler.moodle_api import get_client
+
+    client = get_client()
+    if no_cache:
+        client.cache = None
+        client.disk_cache = None
+    elif refresh and client.disk_cache is not None:
+        client.disk_cache.refresh = True
+
+
+def setup_sync(sync, refresh, course_id):
+    from moodler.config import settings
+
+    if sync:
+        settings.SYNC_SUBMISSIONS = True
+    if settings.SYNC_SUBMISSIONS and refresh:
+        from moodler.sync import AssignmentSync
+
+        snapshot_folder = Path(settings.SYNC_SNAPSHOT_PATH).expanduser()
+        AssignmentSync(course_id, snapshot_folder).reset()
+
+
 def main():
     setup_logging()
 
     args, parser = parse_args()
+    setup_cache(args.no_cache, args.refresh)
+    setup_sync(args.sync, args.refresh, args.course_id)
 
     if "none" == args.which:
         parser.print_help()
     elif "ungraded" == args.which:
+        from moodler.moodle import submissions_statistics
+
         submissions_status = submissions_statistics(
             args.course_id,
             is_verbose=args.verbose,
             download_folder=args.download_folder,
         )
-        print("Total ungraded: {}".format(submissions_status["total_ungraded"]))
+        total_ungraded = sum(
+            group_status.total_ungraded for group_status in submissions_status.values()
+        )
+        print("Total ungraded: {}".format(total_ungraded))
     elif args.which == "list_students":
+        from moodler.students import get_students
+
         pprint(get_students(args.course_id))
     elif "feedbacks" == args.which:
+        from moodler.moodle import export_feedbacks
+
         export_feedbacks(args.course_id, Path(args.download_folder))
     elif "export" == args.which:
-        export_all(args.course_id, Path(args.download_folder))
+        from moodler.moodle import export_all
+
+        export_all(args.course_id, Path(args.download_folder), args.prune)
     elif "student_report" == args.which:
+        from tabulate import tabulate
+
+        from moodler.moodle import status_report
+
         student_statuses = status_report(args.course_id)
         headers = ("Student", "Submissions", "Last Submission")
         print(tabulate(student_statuses, headers, tablefmt="pretty"))
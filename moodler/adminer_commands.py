@@ -5,7 +5,7 @@ interface in the Moodle UI.
 
 import re
 
-from moodler.config import URL
+from moodler.config import settings
 from moodler.moodle_exception import MoodlerException
 
 DB_UPDATE_SQL_COMMAND = r"""
@@ -94,7 +94,7 @@ def get_sql_command_token(session):
     :return: The value of the token for the SQL command.
     """
     params = {"server": "", "username": "", "db": DB_NAME, "sql": ""}
-    response = session.get(URL + ADMINER_PAGE, params=params)
+    response = session.get(settings.URL + ADMINER_PAGE, params=params)
 
     token_match = re.search(TOKEN_PATTERN, response.content.decode(), re.DOTALL)
 
@@ -128,7 +128,7 @@ def run_sql_command_using_token(session, token_value, sql_command):
         "token": (None, token_value),
     }
     response = session.post(
-        URL + "/local/adminer/lib/run_adminer.php", params=params, files=files
+        settings.URL + "/local/adminer/lib/run_adminer.php", params=params, files=files
     )
 
     rows_affected_counts = re.findall(
@@ -1,11 +1,14 @@
 import logging
-from typing import Optional, TypedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional, TypedDict
 
-from moodler.config import URL
+from moodler.chunking import fetch_in_chunks
+from moodler.config import settings
 from moodler.enums import CommentFormat, SubmissionStatus, WorkflowState
-from moodler.moodle_api import call_moodle_api
+from moodler.json_stream import ITEM
+from moodler.moodle_api import call_moodle_api, call_moodle_api_stream
 from moodler.moodle_exception import MoodlerException
-from moodler.students import get_students, get_students_ids_by_name, get_user_name
+from moodler.students import get_students, get_students_ids_by_name, get_user_names
 from moodler.submission import MissingGrade, Submission, mod_assign_get_submissions
 
 logger = logging.getLogger(__name__)
@@ -33,45 +36,109 @@ class GradeParams(TypedDict):
 
 
 class Assignment(object):
-    def __init__(self, assignment_json, submissions_json, grades_json):
+    def __init__(
+        self,
+        assignment_json,
+        submissions_json,
+        grades_json,
+        lazy=False,
+        user_names=None,
+    ):
+        """
+        :param lazy: Parse the submissions only when they are first accessed,
+        for callers that only need the assignment's metadata.
+        :param user_names: Dict mapping user ID to name, used to name the
+        students with missing grades without requesting their names.
+        """
         # a random number Moodle generates in API (not seen when you use Moodle visually)
         self.uid = assignment_json["id"]
         # the actual ID that you see in the Moodle interface
         self.cmid = assignment_json["cmid"]
         self.name = assignment_json["name"]
         self.description = assignment_json.get("intro", "")
+        # The files attached to the description, with their size and timestamp
+        self.attachment_files: list[dict] = assignment_json.get("introattachments", [])
         self.attachments: list[str] = [
-            attachment["fileurl"]
-            for attachment in assignment_json.get("introattachments", [])
+            attachment["fileurl"] for attachment in self.attachment_files
         ]
 
-        self.submissions: list[Submission] = []
-        for submission in submissions_json:
-            grade_json = None
+        self._assignment_json = assignment_json
+        self._submissions_json = submissions_json
+        self._grades_json = grades_json
+
+        self._submissions: list[Submission] | None = None
+        self._user_names = user_names
+        # IDs of the users whose grade is missing, known once parsed
+        self.missing_grades: list[int] = []
+        if not lazy:
+            parse_submissions([self], user_names)
+
+    @property
+    def submissions(self) -> list[Submission]:
+        if self._submissions is None:
+            self._parse_submissions()
+            self.warn_missing_grades(self.missing_grades)
+        return self._submissions
+
+    def _parse_submissions(self):
+        self.missing_grades = []
+        self._submissions = list(self._parse(self.missing_grades))
+
+        # The parsed submissions hold everything needed from the source JSON
+        if not settings.KEEP_RAW_JSON:
+            self._submissions_json = None
+            self._grades_json = None
+
+    def _parse(self, missing_grades) -> Iterator[Submission]:
+        grades_by_user = index_grades_by_user(self._grades_json)
+        for submission in self._submissions_json:
             user_id = submission["userid"]
-            for grade in grades_json:
-                if user_id == grade["userid"]:
-                    grade_json = grade
-                    break
+            grade_json = grades_by_user.get(user_id)
 
             if "new" != submission["status"]:
                 try:
-                    self.submissions.append(Submission(user_id, grade_json, submission))
+                    yield Submission(user_id, grade_json, submission)
                 except MissingGrade:
-                    logger.warning(
-                        'Missing grade for student "{}" in assignment "{}". Fix ASAP at {}'.format(
-                            get_user_name(user_id),
-                            self.name,
-                            "{}/mod/assign/view.php?id={}&action=grader&userid={}".format(
-                                URL, self.cmid, user_id
-                            ),
-                        )
-                    )
-                    self.submissions.append(Submission(user_id, None, submission))
+                    missing_grades.append(user_id)
+                    yield Submission(user_id, None, submission)
 
-        self._assignment_json = assignment_json
-        self._submissions_json = submissions_json
-        self._grades_json = grades_json
+    def iter_submissions(self) -> Iterator[Submission]:
+        """
+        Yields the submissions of the assignment. If they were not parsed yet,
+        they are parsed one by one without being kept.
+        """
+        if self._submissions is not None:
+            yield from self._submissions
+            return
+
+        missing_grades: list[int] = []
+        yield from self._parse(missing_grades)
+        self.warn_missing_grades(missing_grades)
+
+    def warn_missing_grades(self, user_ids, user_names=None):
+        """
+        Logs a warning for every student whose grade is missing.
+
+        :param user_ids: The IDs of the students.
+        :param user_names: Dict mapping user ID to name. If not given, the
+        names are resolved with `get_user_names`.
+        """
+        if not user_ids:
+            return
+
+        if user_names is None:
+            user_names = get_user_names(user_ids, self._user_names)
+
+        for user_id in user_ids:
+            logger.warning(
+                'Missing grade for student "{}" in assignment "{}". Fix ASAP at {}'.format(
+                    user_names.get(user_id, user_id),
+                    self.name,
+                    "{}/mod/assign/view.php?id={}&action=grader&userid={}".format(
+                        settings.URL, self.cmid, user_id
+                    ),
+                )
+            )
 
     def submitted(self):
         return [
@@ -92,15 +159,18 @@ class Assignment(object):
         )
 
     def lock_submissions(
-        self, course_id, students_names=None, only_lock_resubmissions=True
+        self,
+        course_id,
+        students_names=None,
+        only_lock_resubmissions=True,
+        context=None,
     ):
         """
         Locking submissions for this specific assignment.
+
+        :param context: A CourseContext holding the enrolled users of the course.
         """
-        if students_names is None:
-            students_ids = list(get_students(course_id).keys())
-        else:
-            students_ids = get_students_ids_by_name(course_id, students_names)
+        students_ids = self._get_students_ids(course_id, students_names, context)
 
         if only_lock_resubmissions:
             submitted_users = [sub.user_id for sub in self.submissions]
@@ -126,14 +196,13 @@ class Assignment(object):
                 ),
             )
 
-    def unlock_submissions(self, course_id, students_names=None):
+    def unlock_submissions(self, course_id, students_names=None, context=None):
         """
         Locking submissions for this specific assignment.
+
+        :param context: A CourseContext holding the enrolled users of the course.
         """
-        if students_names is None:
-            students_ids = list(get_students(course_id).keys())
-        else:
-            students_ids = get_students_ids_by_name(course_id, students_names)
+        students_ids = self._get_students_ids(course_id, students_names, context)
 
         if not students_ids:
             logger.warning("No student was found! Aborting...")
@@ -146,10 +215,34 @@ class Assignment(object):
                 students_names if students_names is not None else "all students.",
             )
 
+    @staticmethod
+    def _get_students_ids(course_id, students_names, context):
+        enrolled_users = context.enrolled_users if context is not None else None
+        if students_names is None:
+            return list(get_students(course_id, enrolled_users).keys())
+
+        return get_students_ids_by_name(course_id, students_names, enrolled_users)
+
     def save_grades(self, grades: list[GradeParams]):
         mod_assign_save_grades(self.uid, grades=grades)
 
 
+def index_grades_by_user(grades_json) -> dict[int, dict]:
+    """
+    Maps every user ID to its grade. If a user has several grades, the one of
+    the latest attempt is kept.
+    """
+    grades_by_user = {}
+    for grade in grades_json:
+        current_grade = grades_by_user.get(grade["userid"])
+        if current_grade is None or current_grade.get("attemptnumber", 0) < grade.get(
+            "attemptnumber", 0
+        ):
+            grades_by_user[grade["userid"]] = grade
+
+    return grades_by_user
+
+
 def mod_assign_lock_submissions(assignment_id, user_ids):
     """
     Locks submissions for a specific assignments for a specific user(s).
@@ -172,16 +265,45 @@ def mod_assign_unlock_submissions(assignment_id, user_ids):
     )
 
 
-def mod_assign_get_grades(assignment_ids):
+def mod_assign_get_grades(
+    assignment_ids, course_id=None, stream=None, executor=None, **kwargs
+):
     """
     Returns the grades for all the assignments
+
+    The assignments are fetched in chunks, in `executor` if given, see
+    `fetch_in_chunks`.
+    If `stream` is set (by default STREAM_RESPONSES), every response is
+    decoded assignment by assignment while it is received.
     """
-    response = call_moodle_api("mod_assign_get_grades", assignmentids=assignment_ids)
-    grades = {}
-    for grds in response["assignments"]:
-        grades[grds["assignmentid"]] = grds["grades"]
+    if stream is None:
+        stream = settings.STREAM_RESPONSES
+
+    def fetch(assignment_ids_chunk):
+        if stream:
+            assignments = call_moodle_api_stream(
+                "mod_assign_get_grades",
+                ("assignments", ITEM),
+                assignmentids=assignment_ids_chunk,
+                **kwargs,
+            )
+        else:
+            assignments = call_moodle_api(
+                "mod_assign_get_grades", assignmentids=assignment_ids_chunk, **kwargs
+            )["assignments"]
 
-    return grades
+        grades = {}
+        for grds in assignments:
+            grades[grds["assignmentid"]] = grds["grades"]
+
+        return grades
+
+    return fetch_in_chunks(
+        fetch,
+        assignment_ids,
+        f"mod_assign_get_grades:{course_id}",
+        executor=executor,
+    )
 
 
 def grade_parameters(
@@ -255,7 +377,7 @@ def mod_assign_get_assignments(course_id):
 
 
 def get_assignments_by_field(
-    course_id, field=None, assignments_fields=None
+    course_id, field=None, assignments_fields=None, lazy=False, user_names=None
 ) -> list[Assignment] | None:
     """
     Retrieves assignments, grades, and submissions from server and parses into
@@ -268,71 +390,167 @@ def get_assignments_by_field(
     :param assignments_fields: The fields in the assignments by which to
     retrieve the assignments. If the field `field` in the assignment is in
     this list, then the assignment will be retrieved.
+    :param lazy: Parse the submissions of the assignments on first access.
+    :param user_names: Dict mapping user ID to name, see `Assignment`.
     :return: List of Assignment() objects
     """
-    assignments_not_found = []
     all_assignment_jsons = mod_assign_get_assignments(course_id)
-    assignment_ids = [assign["id"] for assign in all_assignment_jsons]
 
-    if not assignment_ids:
+    if not all_assignment_jsons:
         logger.warning("No assignments were detected for course %s", course_id)
         return None
 
-    grades = mod_assign_get_grades(assignment_ids)
-    submissions = mod_assign_get_submissions(assignment_ids)
-    assignments: list[Assignment] = []
-
-    if assignments_fields:
-        assignments_not_found = assignments_fields[:]
+    # Only fetch the grades and submissions of the requested assignments
+    assignment_jsons = filter_assignments(
+        all_assignment_jsons, field, assignments_fields
+    )
+    assignment_ids = [assign["id"] for assign in assignment_jsons]
+    if not assignment_ids:
+        return []
+
+    # The grades and submissions are independent, so fetch them together.
+    # Their chunks share one pool, so that no more than POOL_SIZE requests use
+    # the connections of the session at the same time
+    with ThreadPoolExecutor(max_workers=settings.POOL_SIZE) as chunk_executor:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            grades_future = executor.submit(
+                mod_assign_get_grades,
+                assignment_ids,
+                course_id,
+                executor=chunk_executor,
+            )
+            submissions_future = executor.submit(
+                mod_assign_get_submissions,
+                assignment_ids,
+                course_id,
+                executor=chunk_executor,
+            )
+            grades = grades_future.result()
+            submissions = submissions_future.result()
 
-    for assignment in all_assignment_jsons:
-        # Filter specific assignment IDs
-        if assignments_fields and field:
-            if assignment[field] not in assignments_fields:
-                continue
+    return build_assignments(assignment_jsons, submissions, grades, lazy, user_names)
 
-            assignments_not_found.remove(assignment[field])
 
-        assignments.append(
-            Assignment(
-                assignment,
-                submissions.get(assignment["id"], []),
-                grades.get(assignment["id"], []),
-            )
-        )
+def filter_assignments(assignment_jsons, field=None, assignments_fields=None):
+    """
+    Keeps only the assignments whose `field` is in `assignments_fields`. If
+    either is not given, all the assignments are kept.
 
+    :param assignment_jsons: The assignments as returned by Moodle.
+    :return: The assignments to retrieve.
+    """
+    if not (assignments_fields and field):
+        return list(assignment_jsons)
+
+    wanted_fields = set(assignments_fields)
+    filtered_assignment_jsons = [
+        assignment
+        for assignment in assignment_jsons
+        if assignment[field] in wanted_fields
+    ]
+
+    assignments_not_found = wanted_fields.difference(
+        assignment[field] for assignment in filtered_assignment_jsons
+    )
     if assignments_not_found:
         logger.error(
             "Could not find the following exercises for the trainer: " "%s",
-            assignments_not_found,
+            list(assignments_not_found),
         )
 
+    return filtered_assignment_jsons
+
+
+def parse_submissions(assignments, user_names=None):
+    """
+    Parses the submissions of the assignments, then warns about the missing
+    grades of all of them, with the names of the students resolved at once.
+
+    :param assignments: Assignment objects whose submissions weren't parsed.
+    :param user_names: Dict mapping user ID to name that the caller already
+    has, e.g. from `get_students`.
+    """
+    for assignment in assignments:
+        assignment._parse_submissions()
+
+    missing_grades = [
+        user_id for assignment in assignments for user_id in assignment.missing_grades
+    ]
+    if not missing_grades:
+        return
+
+    missing_names = get_user_names(missing_grades, user_names)
+    for assignment in assignments:
+        assignment.warn_missing_grades(assignment.missing_grades, missing_names)
+
+
+def build_assignments(
+    assignment_jsons, submissions, grades, lazy=False, user_names=None
+) -> list[Assignment]:
+    """
+    Parses the fetched assignments, submissions and grades into Assignment
+    objects.
+
+    :param assignment_jsons: The assignments as returned by Moodle.
+    :param submissions: Dict mapping assignment id to its submissions.
+    :param grades: Dict mapping assignment id to its grades.
+    :param lazy: Parse the submissions of the assignments on first access.
+    :param user_names: Dict mapping user ID to name, see `Assignment`.
+    :return: List of Assignment() objects
+    """
+    assignments = [
+        Assignment(
+            assignment,
+            submissions.get(assignment["id"], []),
+            grades.get(assignment["id"], []),
+            lazy=True,
+            user_names=user_names,
+        )
+        for assignment in assignment_jsons
+    ]
+
+    # Parse all of them together to resolve the missing grades in one request
+    if not lazy:
+        parse_submissions(assignments, user_names)
+
     return assignments
 
 
-def get_assignments(course_id, assignment_ids_to_get=None) -> list[Assignment] | None:
+def get_assignments(
+    course_id, assignment_ids_to_get=None, lazy=False, user_names=None
+) -> list[Assignment] | None:
     """
     Retrieves assignments, grades, and submissions from server and parses into corresponding objects.
 
     :param course_id: The ID of the course to retrieve its assignments
     :param assignment_ids_to_get: Specific assignment IDs to retrieve.
+    :param lazy: Parse the submissions of the assignments on first access.
+    :param user_names: Dict mapping user ID to name, see `Assignment`.
     :return: List of Assignment() objects
     """
     return get_assignments_by_field(
-        course_id, assignments_fields=assignment_ids_to_get, field="cmid"
+        course_id,
+        assignments_fields=assignment_ids_to_get,
+        field="cmid",
+        lazy=lazy,
+        user_names=user_names,
     )
 
 
-def get_assignments_by_names(course_id, assignment_names_to_get=None):
+def get_assignments_by_names(course_id, assignment_names_to_get=None, lazy=False):
     """
     Retrieves assignments, grades, and submissions from server and parses into corresponding objects.
 
     :param course_id: The ID of the course to retrieve its assignments
     :param assignment_names_to_get: Specific assignment names to retrieve.
+    :param lazy: Parse the submissions of the assignments on first access.
     :return: List of Assignment() objects
     """
     assignments = get_assignments_by_field(
-        course_id, assignments_fields=assignment_names_to_get, field="name"
+        course_id,
+        assignments_fields=assignment_names_to_get,
+        field="name",
+        lazy=lazy,
     )
 
     return assignments
@@ -348,8 +566,8 @@ def get_assignment_files(course_id, assignment_id) -> list[str]:
     assignment_files: list[str] = []
 
     # Retrieve only the files for this specific assignment ID
-    assignment = get_assignments(course_id, [assignment_id])
-    if assignment is None:
+    assignment = get_assignments(course_id, [assignment_id], lazy=True)
+    if not assignment:
         raise InvalidAssignmentID()
 
     for attachment in assignment[0].attachments:
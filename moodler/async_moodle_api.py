@@ -0,0 +1,183 @@
+"""
+Asyncio counterparts of the Moodle API fetchers.
+
+Every call goes through `call_moodle_api` (and so through the same
+`prepare_data`/`validate_response` logic and pooled session) in a thread pool,
+which lets a single event loop keep many requests in flight at once.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from moodler.assignment import (
+    Assignment,
+    build_assignments,
+    filter_assignments,
+    mod_assign_get_assignments,
+    mod_assign_get_grades,
+)
+from moodler.config import settings
+from moodler.feedbacks import (
+    Feedback,
+    mod_feedback_get_analysis,
+    mod_feedback_get_feedbacks_by_courses,
+)
+from moodler.glossary import GlossaryEntry, mod_glossary_get_entries_by_search
+from moodler.groups import Group, get_course_groups
+from moodler.moodle_api import call_moodle_api
+from moodler.sections import core_course_get_contents
+from moodler.students import core_enrol_get_enrolled_users, get_students
+from moodler.submission import mod_assign_get_submissions
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMoodleClient(object):
+    """
+    Awaitable Moodle API client. Up to `max_concurrency` calls (POOL_SIZE by
+    default) run at the same time, the rest wait for a free worker.
+
+    Usage:
+        async with AsyncMoodleClient() as client:
+            assignments, students = await asyncio.gather(
+                client.get_assignments_by_field(course_id),
+                client.get_students(course_id),
+            )
+    """
+
+    def __init__(self, max_concurrency=None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency or settings.POOL_SIZE,
+            thread_name_prefix="moodler",
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Runs a blocking Moodle fetcher in the client's thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(function, *args, **kwargs)
+        )
+
+    async def call(self, moodle_function, **kwargs):
+        """
+        Awaitable version of `call_moodle_api`.
+        """
+        return await self.run(call_moodle_api, moodle_function, **kwargs)
+
+    async def get_assignments(self, course_id) -> list[dict]:
+        return await self.run(mod_assign_get_assignments, course_id)
+
+    async def get_submissions(self, assignment_ids, course_id=None, **kwargs) -> dict:
+        return await self.run(
+            mod_assign_get_submissions, assignment_ids, course_id, **kwargs
+        )
+
+    async def get_grades(self, assignment_ids, course_id=None, **kwargs) -> dict:
+        return await self.run(
+            mod_assign_get_grades, assignment_ids, course_id, **kwargs
+        )
+
+    async def get_enrolled_users(self, course_id) -> list[dict]:
+        return await self.run(core_enrol_get_enrolled_users, course_id)
+
+    async def get_students(self, course_id) -> dict[int, str]:
+        return await self.run(get_students, course_id)
+
+    async def get_course_groups(self, course_id) -> list[Group]:
+        return await self.run(get_course_groups, course_id)
+
+    async def get_course_contents(self, course_id) -> list[dict]:
+        return await self.run(core_course_get_contents, course_id)
+
+    async def get_assignments_by_field(
+        self, course_id, field=None, assignments_fields=None
+    ) -> list[Assignment] | None:
+        """
+        Async version of `get_assignments_by_field`, fetching the grades and
+        submissions at the same time.
+        """
+        all_assignment_jsons = await self.get_assignments(course_id)
+
+        if not all_assignment_jsons:
+            logger.warning("No assignments were detected for course %s", course_id)
+            return None
+
+        assignment_jsons = filter_assignments(
+            all_assignment_jsons, field, assignments_fields
+        )
+        assignment_ids = [assign["id"] for assign in assignment_jsons]
+        if not assignment_ids:
+            return []
+
+        grades, submissions = await asyncio.gather(
+            self.get_grades(assignment_ids, course_id),
+            self.get_submissions(assignment_ids, course_id),
+        )
+
+        return build_assignments(assignment_jsons, submissions, grades)
+
+    async def get_feedbacks(self, course_id) -> list[Feedback]:
+        """
+        Async version of `feedbacks`, fetching the analysis of all the feedbacks
+        at the same time.
+        """
+        course_feedbacks = await self.run(
+            mod_feedback_get_feedbacks_by_courses, course_id
+        )
+        analyses = await asyncio.gather(
+            *(
+                self.run(mod_feedback_get_analysis, feedback["id"])
+                for feedback in course_feedbacks
+            )
+        )
+
+        return [
+            Feedback(feedback["id"], feedback["name"], answers)
+            for feedback, answers in zip(course_feedbacks, analyses)
+        ]
+
+    async def get_all_glossary_entries(
+        self, glossary_id: int, query: str = ""
+    ) -> list[GlossaryEntry]:
+        """
+        Async version of `get_all_glossary_entries`. The first page tells the
+        amount of entries, the rest of the pages are fetched at the same time.
+        """
+        first_page = await self.run(
+            mod_glossary_get_entries_by_search, glossary_id, query
+        )
+        entries: list[GlossaryEntry] = list(first_page["entries"])
+        page_size = len(entries)
+
+        if not page_size:
+            return entries
+
+        pages = await asyncio.gather(
+            *(
+                self.run(
+                    mod_glossary_get_entries_by_search,
+                    glossary_id,
+                    query,
+                    _from=offset,
+                    limit=page_size,
+                )
+                for offset in range(page_size, first_page["count"], page_size)
+            )
+        )
+        for page in pages:
+            entries.extend(page["entries"])
+
+        return entries
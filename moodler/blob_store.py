@@ -0,0 +1,163 @@
+"""
+Content addressed store of exported files.
+
+Every file is stored once, under its SHA-256 digest, and the export folders
+get hardlinks (or reflinks, or copies) of the stored files. The store also
+remembers the name, size and timestamp Moodle reported for every stored
+file, so a file already held, e.g. the same lecture in a copy of the course
+or in the export of the next semester, is linked without being downloaded.
+"""
+
+import json
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from moodler.config import settings
+from moodler.download import DownloadedFile
+
+logger = logging.getLogger(__name__)
+
+LINK_MODES = ("hardlink", "reflink", "copy")
+HINTS_FILE_NAME = "hints.json"
+# The FICLONE ioctl of Linux, cloning a file on filesystems such as Btrfs or XFS
+FICLONE = 0x40049409
+
+
+def _reflink(source, destination):
+    import fcntl
+
+    with open(source, "rb") as source_file, open(destination, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, source_file.fileno())
+
+
+def _place(source, destination, link_mode):
+    """
+    Creates `destination` with the content of `source` without ever leaving
+    a partial file, falling back to a copy when the link mode is not
+    supported, e.g. across filesystems.
+    """
+    destination = Path(destination)
+    temp_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.part")
+    try:
+        try:
+            if "hardlink" == link_mode:
+                os.link(source, temp_path)
+            elif "reflink" == link_mode:
+                _reflink(source, temp_path)
+            else:
+                shutil.copyfile(source, temp_path)
+        except (OSError, ImportError) as e:
+            logger.debug("Copying '%s' since %s failed: %s", source, link_mode, e)
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    finally:
+        # Also left when both are hardlinks of the same file, which makes the
+        # rename do nothing
+        temp_path.unlink(missing_ok=True)
+
+
+class BlobStore(object):
+    """
+    Files stored by their SHA-256 digest under `root`.
+
+    With hardlinks the exported files share their content with the store, so
+    the stored files are read only: editing an exported file in place would
+    change every export of it. Reflinks and copies do not share it.
+
+    The hints only match a file by name, size and timestamp, a file changed
+    without changing any of them is not downloaded again.
+    """
+
+    def __init__(self, root, link_mode=None):
+        """
+        :param root: The folder of the store.
+        :param link_mode: How exported files are made from the stored ones,
+        one of `LINK_MODES`, by default BLOB_STORE_LINK.
+        """
+        self.root = Path(root).expanduser()
+        self.link_mode = link_mode or settings.BLOB_STORE_LINK
+        if self.link_mode not in LINK_MODES:
+            raise ValueError(
+                f"Unknown link mode '{self.link_mode}', expected one of {LINK_MODES}"
+            )
+
+        self._hints_path = self.root / HINTS_FILE_NAME
+        try:
+            self._hints: dict[str, str] = json.loads(self._hints_path.read_text())
+        except FileNotFoundError:
+            self._hints = {}
+
+    def __repr__(self):
+        return "BlobStore(root={}, link_mode={})".format(self.root, self.link_mode)
+
+    def __contains__(self, digest):
+        return self._blob_path(digest).exists()
+
+    def _blob_path(self, digest) -> Path:
+        return self.root / "objects" / digest[:2] / digest[2:]
+
+    @staticmethod
+    def _hint(name, size, timestamp):
+        return f"{name}:{size}:{timestamp}"
+
+    def find(self, name, size, timestamp) -> Optional[str]:
+        """
+        Finds a stored file by the name, size and timestamp Moodle reports.
+
+        :return: The digest of the stored file, or None if there is none.
+        """
+        digest = self._hints.get(self._hint(name, size, timestamp))
+        if digest is None or digest not in self:
+            return None
+        return digest
+
+    def link(self, digest, path) -> DownloadedFile:
+        """
+        Makes the stored file with the given digest appear at `path`.
+        """
+        blob = self._blob_path(digest)
+        _place(blob, path, self.link_mode)
+        return DownloadedFile(Path(path), blob.stat().st_size, digest)
+
+    def add(
+        self, downloaded: DownloadedFile, name=None, size=None, timestamp=None
+    ) -> DownloadedFile:
+        """
+        Stores a downloaded file, or replaces it by a link to the stored file
+        if one with the same content is already stored.
+
+        :param name: The name of the file, with `size` and `timestamp` the
+        hint to find it by later.
+        :param size: The size Moodle reports for the file.
+        :param timestamp: The modification time Moodle reports for the file.
+        """
+        if name is not None and size is not None and timestamp is not None:
+            self._hints[self._hint(name, size, timestamp)] = downloaded.digest
+
+        blob = self._blob_path(downloaded.digest)
+        if blob.exists():
+            return self.link(downloaded.digest, downloaded.path)
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        _place(downloaded.path, blob, self.link_mode)
+        os.chmod(blob, 0o444)
+        return downloaded
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_path = self._hints_path.with_suffix(".part")
+        temp_path.write_text(json.dumps(self._hints, indent=1))
+        os.replace(temp_path, self._hints_path)
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """
+    Returns the store at BLOB_STORE_PATH, or None if it is not set.
+    """
+    if not settings.BLOB_STORE_PATH:
+        return None
+    return BlobStore(settings.BLOB_STORE_PATH)
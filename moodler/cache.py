@@ -0,0 +1,362 @@
+"""
+Caching of responses of read-only Moodle functions, so repeated calls within
+the same process (e.g. fetching the enrolled users of a course in several
+places) only hit the server once.
+
+`DiskCache` optionally keeps the responses that rarely change (course
+structure, enrolments, assignment metadata) between runs as well.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from moodler.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Functions returning the structure of a course (courses, contents,
+# enrolments, groups, assignment metadata), whose responses are cached
+CACHEABLE_FUNCTIONS = frozenset(
+    [
+        "core_course_get_contents",
+        "core_course_get_course_module",
+        "core_course_get_courses",
+        "core_enrol_get_enrolled_users",
+        "core_group_get_course_groups",
+        "core_group_get_group_members",
+        "core_user_get_users_by_field",
+        "core_webservice_get_site_info",
+        "mod_assign_get_assignments",
+        "mod_feedback_get_feedbacks_by_courses",
+        "mod_glossary_get_glossaries_by_courses",
+    ]
+)
+
+# Functions without side effects whose responses change outside of the
+# process (students submitting, graders in the Moodle UI), so they are only
+# cached when passed explicitly in the `functions` of a ResponseCache
+VOLATILE_FUNCTIONS = frozenset(
+    [
+        "gradereport_user_get_grade_items",
+        "mod_assign_get_grades",
+        "mod_assign_get_submission_status",
+        "mod_assign_get_submissions",
+        "mod_attendance_get_sessions",
+        "mod_feedback_get_analysis",
+        "mod_glossary_get_entries_by_search",
+    ]
+)
+
+# Maps functions with side effects to the cached functions they make stale
+INVALIDATED_BY = {
+    "mod_assign_save_grades": (
+        "gradereport_user_get_grade_items",
+        "mod_assign_get_grades",
+        "mod_assign_get_submission_status",
+        "mod_assign_get_submissions",
+    ),
+    "mod_assign_lock_submissions": (
+        "mod_assign_get_submission_status",
+        "mod_assign_get_submissions",
+    ),
+    "mod_assign_unlock_submissions": (
+        "mod_assign_get_submission_status",
+        "mod_assign_get_submissions",
+    ),
+}
+
+# Seconds to keep responses in the disk cache. Functions that are not listed
+# here (e.g. submissions and grades) are not kept between runs.
+DISK_CACHE_TTLS = {
+    "core_course_get_contents": 60 * 60,
+    "core_course_get_courses": 24 * 60 * 60,
+    "core_enrol_get_enrolled_users": 60 * 60,
+    "core_group_get_course_groups": 60 * 60,
+    "core_group_get_group_members": 60 * 60,
+    "core_user_get_users_by_field": 24 * 60 * 60,
+    "core_webservice_get_site_info": 60 * 60,
+    "mod_assign_get_assignments": 60 * 60,
+    "mod_feedback_get_feedbacks_by_courses": 60 * 60,
+    "mod_glossary_get_glossaries_by_courses": 60 * 60,
+}
+
+MISSING = object()
+
+
+class CacheEntry(NamedTuple):
+    expires_at: float
+    moodle_function: str
+    kwargs: dict
+    response: Any
+
+
+def cache_key(moodle_function, kwargs):
+    """
+    Canonical key of a call, independent of the order of the kwargs.
+    """
+    return moodle_function, json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def _mentions_assignment(kwargs, assignment_id):
+    if assignment_id is None:
+        return True
+    if "assignmentids" in kwargs:
+        return assignment_id in kwargs["assignmentids"]
+    if "assignid" in kwargs:
+        return assignment_id == kwargs["assignid"]
+    return True
+
+
+class ResponseCache(object):
+    """
+    In-memory LRU cache of Moodle responses, with entries expiring `ttl`
+    seconds after being stored.
+
+    Cached responses are shared between callers and must not be modified.
+    The ttl and max_size default to CACHE_TTL and CACHE_MAX_SIZE, and the
+    cached functions to CACHEABLE_FUNCTIONS. Pass e.g.
+    `CACHEABLE_FUNCTIONS | VOLATILE_FUNCTIONS` to also cache submissions and
+    grades, when data up to `ttl` seconds old is good enough.
+    """
+
+    def __init__(self, ttl=None, max_size=None, functions=None):
+        self.ttl = settings.CACHE_TTL if ttl is None else ttl
+        self.max_size = settings.CACHE_MAX_SIZE if max_size is None else max_size
+        self.functions = CACHEABLE_FUNCTIONS if functions is None else functions
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "ResponseCache(entries={}, hits={}, misses={})".format(
+            len(self), self.hits, self.misses
+        )
+
+    def get(self, moodle_function, kwargs):
+        """
+        Returns the cached response of the call, or MISSING.
+        """
+        if moodle_function not in self.functions:
+            return MISSING
+
+        key = cache_key(moodle_function, kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        logger.debug('Using cached response of "%s"', moodle_function)
+        return entry.response
+
+    def put(self, moodle_function, kwargs, response):
+        """
+        Stores the response of a cacheable call, evicting the least recently
+        used entries above `max_size`.
+        """
+        if moodle_function not in self.functions:
+            return
+
+        key = cache_key(moodle_function, kwargs)
+        entry = CacheEntry(
+            time.monotonic() + self.ttl, moodle_function, kwargs, response
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, moodle_function, kwargs):
+        """
+        Drops the entries made stale by a call to a function with side effects.
+        Assignment functions only drop the entries of the same assignment.
+        """
+        stale_functions = INVALIDATED_BY.get(moodle_function)
+        if not stale_functions:
+            return
+
+        assignment_id = kwargs.get("assignmentid")
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.moodle_function in stale_functions and _mentions_assignment(
+                    entry.kwargs, assignment_id
+                ):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCache(object):
+    """
+    Persistent cache of Moodle responses in a SQLite file, shared between runs.
+    Responses are stored as compressed JSON and kept for the time set for
+    their function in `ttls`. Once the stored responses take more than
+    `max_size` bytes, the least recently used ones are evicted.
+
+    In `refresh` mode stored responses are ignored, but new ones are stored.
+    """
+
+    def __init__(self, path, url, ttls=None, max_size=None):
+        self.path = Path(path).expanduser()
+        self.url = url
+        self.ttls = DISK_CACHE_TTLS if ttls is None else ttls
+        self.max_size = settings.DISK_CACHE_MAX_SIZE if max_size is None else max_size
+        self.refresh = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                moodle_function TEXT NOT NULL,
+                kwargs TEXT NOT NULL,
+                response BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+            "ON responses (accessed_at)"
+        )
+
+    def __repr__(self):
+        return "DiskCache(path={}, hits={}, misses={})".format(
+            self.path, self.hits, self.misses
+        )
+
+    def _key(self, moodle_function, kwargs):
+        return hashlib.sha256(
+            json.dumps([self.url, *cache_key(moodle_function, kwargs)]).encode()
+        ).hexdigest()
+
+    def get(self, moodle_function, kwargs):
+        """
+        Returns the stored response of the call, or MISSING.
+        """
+        if moodle_function not in self.ttls or self.refresh:
+            return MISSING
+
+        key = self._key(moodle_function, kwargs)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+
+        logger.debug('Using stored response of "%s"', moodle_function)
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, moodle_function, kwargs, response):
+        """
+        Stores the response of a cacheable call, evicting the least recently
+        used responses above `max_size` bytes.
+        """
+        if moodle_function not in self.ttls:
+            return
+
+        compressed_response = zlib.compress(json.dumps(response).encode())
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(moodle_function, kwargs),
+                    moodle_function,
+                    cache_key(moodle_function, kwargs)[1],
+                    compressed_response,
+                    len(compressed_response),
+                    now + self.ttls[moodle_function],
+                    now,
+                ),
+            )
+            self._evict()
+
+    def _evict(self):
+        (total_size,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total_size <= self.max_size:
+            return
+
+        stale_keys = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ):
+            if total_size <= self.max_size:
+                break
+            stale_keys.append((key,))
+            total_size -= size
+
+        self._connection.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def invalidate(self, moodle_function, kwargs):
+        """
+        Drops the responses made stale by a call to a function with side effects.
+        """
+        stale_functions = [
+            function
+            for function in INVALIDATED_BY.get(moodle_function, ())
+            if function in self.ttls
+        ]
+        if not stale_functions:
+            return
+
+        assignment_id = kwargs.get("assignmentid")
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, kwargs FROM responses WHERE moodle_function IN ({})".format(
+                    ", ".join("?" * len(stale_functions))
+                ),
+                stale_functions,
+            ).fetchall()
+            self._connection.executemany(
+                "DELETE FROM responses WHERE key = ?",
+                [
+                    (key,)
+                    for key, stored_kwargs in rows
+                    if _mentions_assignment(json.loads(stored_kwargs), assignment_id)
+                ],
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,129 @@
+"""
+Splitting of large Moodle requests into smaller ones.
+
+Functions such as `mod_assign_get_submissions` receive a list of IDs, and
+requesting all of them at once on a big course can make the server time out.
+The IDs are fetched in chunks at the same time, and a chunk that times out is
+split in half until it succeeds. The chunk size that worked is remembered for
+later runs.
+"""
+
+import json
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from moodler.config import settings
+from moodler.moodle_api import MoodleAPITimeoutException
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkSizes(object):
+    """
+    Chunk sizes that worked, by name, saved in a JSON file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path).expanduser() if path else None
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if self.path is not None and self.path.exists():
+            try:
+                self._sizes = json.loads(self.path.read_text())
+            except ValueError:
+                logger.warning("Ignoring invalid chunk sizes file %s", self.path)
+
+    def get(self, name, default):
+        return self._sizes.get(name, default)
+
+    def set(self, name, size):
+        with self._lock:
+            self._sizes[name] = size
+            if self.path is None:
+                return
+
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_suffix(".tmp")
+                temp_path.write_text(json.dumps(self._sizes))
+                temp_path.replace(self.path)
+            except OSError as e:
+                logger.warning("Failed saving chunk sizes to %s: %s", self.path, e)
+
+
+_chunk_sizes = None
+
+
+def get_chunk_sizes():
+    global _chunk_sizes
+    if _chunk_sizes is None:
+        _chunk_sizes = ChunkSizes(settings.CHUNK_SIZES_PATH)
+    return _chunk_sizes
+
+
+def _split(ids, chunk_size):
+    return [ids[i : i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+
+def fetch_in_chunks(fetch, ids, name, max_workers=None, executor=None) -> dict:
+    """
+    Calls `fetch` for chunks of `ids` at the same time and merges the dicts
+    returned. A chunk that times out is split in half and fetched again.
+
+    :param fetch: Function receiving a list of IDs and returning a dict.
+    :param ids: The IDs to fetch.
+    :param name: The name under which to remember the chunk size that worked,
+    e.g. the function name and the course ID.
+    :param max_workers: The maximum amount of chunks fetched at the same time,
+    by default POOL_SIZE.
+    :param executor: The executor to fetch the chunks in instead of a new one
+    of `max_workers` threads, e.g. one shared by fetches running at the same
+    time, so that together they do not exceed the connections of the session.
+    :return: The merged results of all the chunks.
+    """
+    if executor is None:
+        with ThreadPoolExecutor(
+            max_workers=max_workers or settings.POOL_SIZE
+        ) as executor:
+            return fetch_in_chunks(fetch, ids, name, executor=executor)
+
+    ids = list(ids)
+    chunk_sizes = get_chunk_sizes()
+    chunk_size = chunk_sizes.get(name, settings.ASSIGNMENT_CHUNK_SIZE)
+    working_chunk_size = chunk_size
+    results = {}
+
+    pending = {
+        executor.submit(fetch, chunk): chunk for chunk in _split(ids, chunk_size)
+    }
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk = pending.pop(future)
+            try:
+                results.update(future.result())
+            except MoodleAPITimeoutException:
+                if len(chunk) == 1:
+                    for other_future in pending:
+                        other_future.cancel()
+                    raise
+
+                half_size = (len(chunk) + 1) // 2
+                working_chunk_size = min(working_chunk_size, half_size)
+                logger.info(
+                    "Fetching %s timed out for %s IDs, retrying with %s",
+                    name,
+                    len(chunk),
+                    half_size,
+                )
+                for smaller_chunk in _split(chunk, half_size):
+                    pending[executor.submit(fetch, smaller_chunk)] = smaller_chunk
+
+    if working_chunk_size < chunk_size:
+        chunk_sizes.set(name, working_chunk_size)
+
+    return results
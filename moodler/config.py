@@ -1,14 +1,165 @@
-from environs import Env
+"""
+The settings of moodler, read from the environment and the .env file.
 
-env = Env()
-env.read_env()
+Nothing is read when this module is imported: every setting is resolved on
+first access through `settings`, e.g. `settings.TOKEN`. Importing a setting
+by name (`from moodler.config import TOKEN`) still works, and resolves it at
+that point.
+"""
+
+from functools import cached_property
 
-TOKEN = env("TOKEN")
-URL = env("URL")
 LOGIN_PAGE = "login/index.php"
 
-MOODLE_USERNAME = env("MOODLE_USERNAME")
-MOODLE_PASSWORD = env("MOODLE_PASSWORD")
 
-# List of names of students to not grade
-STUDENTS_TO_IGNORE = env.dict("STUDENTS_TO_IGNORE", subcast_key=int, default={})
+class Settings(object):
+    """
+    The settings of moodler, each one read from the environment on first
+    access and kept for the rest of the process.
+    """
+
+    @cached_property
+    def env(self):
+        # environs is slow to import, so only import it once a setting is read
+        from environs import Env
+
+        env = Env()
+        env.read_env()
+        return env
+
+    @cached_property
+    def TOKEN(self) -> str:
+        return self.env("TOKEN")
+
+    @cached_property
+    def URL(self) -> str:
+        return self.env("URL")
+
+    @cached_property
+    def MOODLE_USERNAME(self) -> str:
+        return self.env("MOODLE_USERNAME")
+
+    @cached_property
+    def MOODLE_PASSWORD(self) -> str:
+        return self.env("MOODLE_PASSWORD")
+
+    # List of names of students to not grade
+    @cached_property
+    def STUDENTS_TO_IGNORE(self) -> dict[int, str]:
+        return self.env.dict("STUDENTS_TO_IGNORE", subcast_key=int, default={})
+
+    # Connection pool and timeouts (in seconds) for the Moodle web service client
+    @cached_property
+    def POOL_SIZE(self) -> int:
+        return self.env.int("POOL_SIZE", default=10)
+
+    @cached_property
+    def CONNECT_TIMEOUT(self) -> float:
+        return self.env.float("CONNECT_TIMEOUT", default=10)
+
+    @cached_property
+    def READ_TIMEOUT(self) -> float:
+        return self.env.float("READ_TIMEOUT", default=300)
+
+    # Amount of calls to send in one request through tool_mobile_call_external_functions
+    # when fanning out calls (0 disables batching)
+    @cached_property
+    def BATCH_SIZE(self) -> int:
+        return self.env.int("BATCH_SIZE", default=0)
+
+    # In-process cache of read-only web service responses (a TTL of 0 disables it)
+    @cached_property
+    def CACHE_TTL(self) -> float:
+        return self.env.float("CACHE_TTL", default=300)
+
+    @cached_property
+    def CACHE_MAX_SIZE(self) -> int:
+        return self.env.int("CACHE_MAX_SIZE", default=256)
+
+    # Optional SQLite file keeping rarely changing responses between runs
+    @cached_property
+    def DISK_CACHE_PATH(self) -> str:
+        return self.env("DISK_CACHE_PATH", default="")
+
+    @cached_property
+    def DISK_CACHE_MAX_SIZE(self) -> int:
+        return self.env.int("DISK_CACHE_MAX_SIZE", default=100 * 1024 * 1024)
+
+    # Amount of assignments to fetch submissions and grades for in one request, and
+    # the file remembering smaller chunk sizes that avoided timeouts per course
+    @cached_property
+    def ASSIGNMENT_CHUNK_SIZE(self) -> int:
+        return self.env.int("ASSIGNMENT_CHUNK_SIZE", default=10)
+
+    @cached_property
+    def CHUNK_SIZES_PATH(self) -> str:
+        return self.env("CHUNK_SIZES_PATH", default="~/.cache/moodler/chunk_sizes.json")
+
+    # Amount of enrolled users to fetch in one request (0 fetches all of them at once)
+    @cached_property
+    def ENROLMENT_PAGE_SIZE(self) -> int:
+        return self.env.int("ENROLMENT_PAGE_SIZE", default=1000)
+
+    # Decode large responses (submissions, grades, course contents) while they are
+    # received instead of after, and the amount of bytes read at a time
+    @cached_property
+    def STREAM_RESPONSES(self) -> bool:
+        return self.env.bool("STREAM_RESPONSES", default=False)
+
+    @cached_property
+    def STREAM_CHUNK_SIZE(self) -> int:
+        return self.env.int("STREAM_CHUNK_SIZE", default=64 * 1024)
+
+    # Amount of files downloaded at the same time by exports, the amount of times
+    # a failed file download is retried and the amount of bytes written at a time
+    @cached_property
+    def DOWNLOAD_WORKERS(self) -> int:
+        return self.env.int("DOWNLOAD_WORKERS", default=8)
+
+    @cached_property
+    def DOWNLOAD_RETRIES(self) -> int:
+        return self.env.int("DOWNLOAD_RETRIES", default=3)
+
+    @cached_property
+    def DOWNLOAD_CHUNK_SIZE(self) -> int:
+        return self.env.int("DOWNLOAD_CHUNK_SIZE", default=1024 * 1024)
+
+    # Keep a snapshot of the submissions and grades of every course in
+    # SYNC_SNAPSHOT_PATH and only fetch the changes since the previous run
+    @cached_property
+    def SYNC_SUBMISSIONS(self) -> bool:
+        return self.env.bool("SYNC_SUBMISSIONS", default=False)
+
+    @cached_property
+    def SYNC_SNAPSHOT_PATH(self) -> str:
+        return self.env("SYNC_SNAPSHOT_PATH", default="~/.cache/moodler/snapshots")
+
+    # Optional folder storing every exported material once, by its content, and
+    # how the exported files are made from the stored ones
+    @cached_property
+    def BLOB_STORE_PATH(self) -> str:
+        return self.env("BLOB_STORE_PATH", default="")
+
+    @cached_property
+    def BLOB_STORE_LINK(self) -> str:
+        return self.env("BLOB_STORE_LINK", default="hardlink")
+
+    # Keep the source JSON of parsed submissions, grades and files for debugging
+    @cached_property
+    def KEEP_RAW_JSON(self) -> bool:
+        return self.env.bool("KEEP_RAW_JSON", default=False)
+
+    # The web service endpoint under URL
+    @cached_property
+    def WEBSERVICE_URL(self) -> str:
+        return "{}/webservice/rest/server.php".format(self.URL)
+
+
+settings = Settings()
+
+
+def __getattr__(name):
+    # Keeps `from moodler.config import TOKEN` working
+    if name.isupper() and isinstance(getattr(Settings, name, None), cached_property):
+        return getattr(settings, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
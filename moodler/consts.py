@@ -1,4 +1,10 @@
-from moodler import config
+from moodler.config import settings
 
-URL = "{}/webservice/rest/server.php".format(config.URL)
-TOKEN = config.TOKEN
+
+def __getattr__(name):
+    # Resolved on first access, see moodler.config
+    if name == "URL":
+        return settings.WEBSERVICE_URL
+    if name == "TOKEN":
+        return settings.TOKEN
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
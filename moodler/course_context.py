@@ -0,0 +1,132 @@
+"""
+Data of a course shared by several operations.
+
+Operations such as the submissions statistics and the exports need the same
+enrolled users, groups, contents and assignments. A `CourseContext` fetches
+each of them once, when first needed, and hands the same objects to every
+operation it is passed to.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from moodler import assignment, groups, sections, students, sync
+from moodler.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATASETS = (
+    "enrolled_users",
+    "students",
+    "groups",
+    "user_group_map",
+    "contents",
+    "assignments",
+)
+
+
+class CourseContext(object):
+    """
+    Lazily fetched and memoized data of a course.
+
+    Usage:
+        context = CourseContext(course_id).prefetch()
+        submissions_statistics(course_id, context=context)
+        status_report(course_id, context=context)
+
+    The enrolled users only have the fields in `STUDENT_FIELDS`. The
+    assignments are lazy, their submissions are parsed on first access.
+    They come from the snapshot of `AssignmentSync` if SYNC_SUBMISSIONS is
+    set.
+    The data is not refreshed, create a new context to see later changes.
+    """
+
+    def __init__(self, course_id):
+        self.course_id = course_id
+        self._values: dict = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "CourseContext(course_id={}, loaded={})".format(
+            self.course_id, list(self._values)
+        )
+
+    def _get(self, name, load):
+        # Every dataset has its own lock, so a prefetch loads them together
+        # while two threads asking for the same one fetch it only once
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        with lock:
+            if name not in self._values:
+                logger.debug("Fetching %s of course %s", name, self.course_id)
+                self._values[name] = load()
+            return self._values[name]
+
+    @property
+    def enrolled_users(self) -> list[dict]:
+        return self._get(
+            "enrolled_users",
+            lambda: students.core_enrol_get_enrolled_users(
+                self.course_id, students.STUDENT_FIELDS
+            ),
+        )
+
+    @property
+    def students(self) -> dict[int, str]:
+        return self._get(
+            "students",
+            lambda: students.get_students(self.course_id, self.enrolled_users),
+        )
+
+    @property
+    def groups(self) -> list[groups.Group]:
+        return self._get("groups", lambda: groups.get_course_groups(self.course_id))
+
+    @property
+    def user_group_map(self) -> dict:
+        return self._get(
+            "user_group_map",
+            lambda: groups.get_user_group_map(self.course_id, self.groups),
+        )
+
+    @property
+    def contents(self) -> list[dict]:
+        return self._get(
+            "contents", lambda: sections.core_course_get_contents(self.course_id)
+        )
+
+    @property
+    def assignments(self) -> list[assignment.Assignment]:
+        return self._get("assignments", self._load_assignments)
+
+    def _load_assignments(self):
+        if settings.SYNC_SUBMISSIONS:
+            snapshot_folder = Path(settings.SYNC_SNAPSHOT_PATH).expanduser()
+            return sync.AssignmentSync(self.course_id, snapshot_folder).sync(
+                lazy=True, user_names=self.students
+            )
+        return (
+            assignment.get_assignments(
+                self.course_id, lazy=True, user_names=self.students
+            )
+            or []
+        )
+
+    def prefetch(self, datasets=DATASETS, max_workers=None):
+        """
+        Fetches the given datasets at the same time.
+
+        :param datasets: Names of the properties to fetch.
+        :param max_workers: The maximum amount of fetches at the same time, by
+        default POOL_SIZE.
+        :return: The context itself.
+        """
+        max_workers = max_workers or settings.POOL_SIZE
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(lambda name: getattr(self, name), datasets):
+                pass
+        return self
@@ -1,14 +1,26 @@
+import hashlib
+import itertools
 import logging
+import os
 import re
+import tempfile
+import time
 import urllib.parse
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import NamedTuple, Optional
 
-from moodler.config import TOKEN, URL
+import requests
+
+from moodler.config import settings
+from moodler.moodle_api import create_session, get_client
 from moodler.moodle_exception import MoodlerException
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait before retrying a failed file download, doubled on every retry
+RETRY_DELAY = 1
 
 ASSIGNMENT_WORKSHEET_EXT = ".csv"
 ASSIGNMENT_ALL_SUBMISSIONS_EXT = ".zip"
@@ -23,7 +35,9 @@ REPORT_TICK_ITEM_PATTERN = (
 REPORT_DOWNLOAD_SESSKEY_PATTERN = (
     r'<input name="sesskey" type="hidden" ' r'value="([\w\d]+)"'
 )
-INVALID_REPORT_DOWNLOAD_PATTERN = "<b>Warning</b>"
+INVALID_REPORT_DOWNLOAD_PATTERN = b"<b>Warning</b>"
+# Amount of bytes at the beginning of a report checked for the pattern above
+REPORT_VALIDATION_SIZE = 64 * 1024
 REPORT_OPTIONS_TO_IGNORE = ["Course total", "Deletion in progress"]
 REPORT_DIGITS_AFTER_DECIMAL_POINT = 2
 
@@ -42,21 +56,303 @@ class InvalidReportDownload(DownloadException):
     pass
 
 
-def download_file(url, folder):
+def file_name_from_url(url):
     file_name = url.split("/")[-1]
     if -1 != file_name.find("?"):
         file_name = file_name.split("?")[0]
-    file_path = Path(folder) / Path(file_name)
+    return file_name
+
 
+def _token_url(url):
     # Add token to url
     parsed_url = urllib.parse.urlparse(url)
     query_parameters = dict(urllib.parse.parse_qsl(parsed_url.query))
-    query_parameters.update({"token": TOKEN})
+    query_parameters.update({"token": settings.TOKEN})
     parsed_url = parsed_url._replace(query=urllib.parse.urlencode(query_parameters))
+    return urllib.parse.urlunparse(parsed_url)
+
+
+def _is_retryable(error):
+    # Client errors such as a missing file would fail again
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(
+        error,
+        (
+            requests.ConnectionError,
+            requests.Timeout,
+            requests.exceptions.ChunkedEncodingError,
+        ),
+    )
+
+
+class DownloadedFile(NamedTuple):
+    path: Path
+    size: int
+    # SHA-256 hex digest of the content
+    digest: str
+
+
+class QueuedFile(NamedTuple):
+    url: str
+    folder: Path
+    # The size and modification time Moodle reports, if known
+    size: Optional[int] = None
+    timestamp: Optional[int] = None
 
-    urllib.request.urlretrieve(
-        urllib.parse.urlunparse(parsed_url), file_path.as_posix()
+
+def write_chunks(chunks, file_path) -> DownloadedFile:
+    """
+    Writes the chunks to a temporary file next to `file_path` and renames it
+    into place once complete, so an interrupted download never leaves a
+    partial file behind. The content is hashed while it is written.
+    """
+    file_path = Path(file_path)
+    temp_file = tempfile.NamedTemporaryFile(
+        dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".part", delete=False
     )
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with temp_file:
+            for chunk in chunks:
+                temp_file.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        os.replace(temp_file.name, file_path)
+    except BaseException:
+        Path(temp_file.name).unlink(missing_ok=True)
+        raise
+    return DownloadedFile(file_path, size, digest.hexdigest())
+
+
+def write_response(response, file_path, chunk_size=None) -> DownloadedFile:
+    """
+    Writes the body of a streamed response to `file_path` with
+    `write_chunks`, without holding all of it in memory.
+
+    :param chunk_size: The amount of bytes to read at a time, by default
+    DOWNLOAD_CHUNK_SIZE.
+    """
+    chunk_size = chunk_size or settings.DOWNLOAD_CHUNK_SIZE
+    return write_chunks(response.iter_content(chunk_size=chunk_size), file_path)
+
+
+def download_file(url, folder, session=None, retries=None) -> DownloadedFile:
+    """
+    Downloads a file of the Moodle web service to the given folder, keeping
+    its name.
+
+    :param session: The session to download through, by default the one of
+    the web service client.
+    :param retries: The amount of times to retry a failed download, by
+    default DOWNLOAD_RETRIES.
+    """
+    session = session or get_client().session
+    retries = settings.DOWNLOAD_RETRIES if retries is None else retries
+    file_path = Path(folder) / file_name_from_url(url)
+    timeout = (settings.CONNECT_TIMEOUT, settings.READ_TIMEOUT)
+
+    for attempt in range(retries + 1):
+        try:
+            with session.get(_token_url(url), stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                return write_response(response, file_path)
+        except requests.RequestException as e:
+            if attempt == retries or not _is_retryable(e):
+                raise DownloadException(f"Failed downloading '{url}'") from e
+            logger.warning("Retrying the download of '%s' after: %s", url, e)
+            time.sleep(RETRY_DELAY * 2**attempt)
+
+
+@dataclass
+class DownloadReport:
+    files: int = 0
+    size: int = 0
+    seconds: float = 0
+    failed: list[str] = field(default_factory=list)
+    # Files left as they are since they did not change
+    unchanged: int = 0
+    # Files linked from a BlobStore instead of being downloaded
+    linked: int = 0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.size / 1024**2 / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            "Downloaded {} files ({:.1f}MB) in {:.1f}s, {:.1f} files/s, "
+            "{:.2f}MB/s, {} unchanged, {} linked, {} failed".format(
+                self.files,
+                self.size / 1024**2,
+                self.seconds,
+                self.files_per_second,
+                self.megabytes_per_second,
+                self.unchanged,
+                self.linked,
+                len(self.failed),
+            )
+        )
+
+
+class Downloader(object):
+    """
+    Queues files and downloads them `max_workers` at a time through a pooled
+    session. A file that fails to download is logged and reported, the other
+    files are still downloaded.
+
+    Usage:
+        downloader = Downloader()
+        for submission_file in submission.submission_files:
+            downloader.add(submission_file.url, folder)
+        report = downloader.run()
+    """
+
+    def __init__(
+        self, max_workers=None, retries=None, session=None, manifest=None, store=None
+    ):
+        """
+        :param max_workers: The maximum amount of files to download at the
+        same time, by default DOWNLOAD_WORKERS.
+        :param retries: The amount of times to retry a failed download, by
+        default DOWNLOAD_RETRIES.
+        :param session: The session to download through, by default a new
+        one keeping `max_workers` connections alive.
+        :param manifest: An ExportManifest, to skip the files that did not
+        change since they were downloaded and record the downloaded ones.
+        :param store: A BlobStore, to link the files it holds instead of
+        downloading them and store the downloaded ones.
+        """
+        self.max_workers = max_workers or settings.DOWNLOAD_WORKERS
+        self.retries = retries
+        self.session = session
+        self.manifest = manifest
+        self.store = store
+        self._files: list[QueuedFile] = []
+
+    def __len__(self):
+        return len(self._files)
+
+    def add(self, url, folder, size=None, timestamp=None):
+        """
+        Queues a file to be downloaded to the folder with the next `run()`.
+
+        :param size: The size Moodle reports for the file, if known.
+        :param timestamp: The modification time Moodle reports for the file,
+        if known.
+        """
+        self._files.append(QueuedFile(url, Path(folder), size, timestamp))
+
+    def _is_current(self, file: QueuedFile):
+        path = file.folder / file_name_from_url(file.url)
+        return self.manifest.is_current(file.url, path, file.size, file.timestamp)
+
+    def _download(self, session, file: QueuedFile):
+        try:
+            return download_file(file.url, file.folder, session, self.retries)
+        except DownloadException:
+            logger.exception("Failed downloading '%s' to '%s'", file.url, file.folder)
+            return None
+
+    @staticmethod
+    def _hint(file: QueuedFile):
+        # Files are found in the store by name, size and timestamp
+        if file.size is None or file.timestamp is None:
+            return None
+        return file_name_from_url(file.url), file.size, file.timestamp
+
+    def _link_stored(self, file: QueuedFile, report: DownloadReport):
+        hint = self._hint(file)
+        digest = None if hint is None else self.store.find(*hint)
+        if digest is None:
+            return False
+
+        linked = self.store.link(digest, file.folder / file_name_from_url(file.url))
+        report.linked += 1
+        self._record(file, linked)
+        return True
+
+    def _record(self, file: QueuedFile, downloaded: DownloadedFile):
+        if self.manifest is not None:
+            self.manifest.record(
+                file.url,
+                downloaded.path,
+                downloaded.size,
+                downloaded.digest,
+                file.timestamp,
+            )
+
+    def run(self) -> DownloadReport:
+        """
+        Downloads all the queued files and empties the queue.
+
+        :return: The DownloadReport of the queued files.
+        """
+        files, self._files = self._files, []
+        report = DownloadReport()
+        if not files:
+            return report
+
+        if self.manifest is not None:
+            queued = files
+            files = [file for file in queued if not self._is_current(file)]
+            report.unchanged = len(queued) - len(files)
+
+        # Files with the hint of an earlier file in the queue, linked to its
+        # content once it was downloaded
+        copies = []
+        if self.store is not None:
+            queued, files = files, []
+            hints = set()
+            for file in queued:
+                hint = self._hint(file)
+                if self._link_stored(file, report):
+                    continue
+                if hint is not None and hint in hints:
+                    copies.append(file)
+                    continue
+                hints.add(hint)
+                files.append(file)
+
+        if files:
+            self._download_all(files, report)
+
+        for file in copies:
+            if not self._link_stored(file, report):
+                report.failed.append(file.url)
+
+        logger.info("%s", report)
+        return report
+
+    def _download_all(self, files: list[QueuedFile], report: DownloadReport):
+        session = self.session or create_session(self.max_workers)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                downloads = executor.map(
+                    lambda file: self._download(session, file), files
+                )
+                for file, downloaded in zip(files, downloads):
+                    if downloaded is None:
+                        report.failed.append(file.url)
+                        continue
+
+                    report.files += 1
+                    report.size += downloaded.size
+                    if self.store is not None:
+                        hint = self._hint(file) or (None, None, None)
+                        downloaded = self.store.add(downloaded, *hint)
+                    self._record(file, downloaded)
+        finally:
+            if self.session is None:
+                session.close()
+
+        report.seconds = time.perf_counter() - start
 
 
 def generate_assignment_folder_path(
@@ -75,10 +371,19 @@ def generate_assignment_folder_path(
 
 
 def download_submission(
-    assignment_name, username, submission, download_folder, priority=None
+    assignment_name,
+    username,
+    submission,
+    download_folder,
+    priority=None,
+    downloader=None,
 ):
     """
     Download the given submission, while creating the appropriate subfolders
+
+    :param downloader: A Downloader to queue the files of the submission in,
+    to download them later with the files of other submissions. By default
+    they are downloaded before returning.
     """
     # Create subfolders
     submission_folder = generate_assignment_folder_path(
@@ -87,9 +392,12 @@ def download_submission(
 
     submission_folder.mkdir(parents=True, exist_ok=True)
 
+    queue = downloader if downloader is not None else Downloader()
     for sf in submission.submission_files:
-        # Download the file
-        download_file(sf.url, submission_folder)
+        queue.add(sf.url, submission_folder, sf.size, sf.timestamp)
+
+    if downloader is None:
+        queue.run()
 
 
 def download_all_submissions(assignment_id, assignment_name, output_path, session):
@@ -105,20 +413,21 @@ def download_all_submissions(assignment_id, assignment_name, output_path, sessio
     """
     # Build the get request.
     params = {"id": assignment_id, "action": "downloadall"}
-    try:
-        response = session.get(URL + "/mod/assign/view.php", params=params)
-    except ConnectionError:
-        msg = f'Failed to download submissions for "{assignment_name}"'
-        logger.exception(msg)
-        raise DownloadException(msg)
-
     all_submissions_file_name = Path(output_path) / Path(
         assignment_name + ASSIGNMENT_ALL_SUBMISSIONS_EXT
     )
 
-    # Writing the content from the get response into a file.
-    with all_submissions_file_name.open(mode="wb") as all_submissions_file:
-        all_submissions_file.write(response.content)
+    # Writing the content from the get response into a file as it is received,
+    # the ZIP can be larger than the available memory.
+    try:
+        with session.get(
+            settings.URL + "/mod/assign/view.php", params=params, stream=True
+        ) as response:
+            write_response(response, all_submissions_file_name)
+    except requests.ConnectionError:
+        msg = f'Failed to download submissions for "{assignment_name}"'
+        logger.exception(msg)
+        raise DownloadException(msg)
 
     return all_submissions_file_name
 
@@ -142,21 +451,21 @@ def download_grading_worksheet(assignment_id, assignment_name, output_path, sess
         "action": "viewpluginpage",
         "pluginaction": "downloadgrades",
     }
+    grading_worksheet_file_name = Path(output_path) / Path(
+        assignment_name + ASSIGNMENT_WORKSHEET_EXT
+    )
+
     try:
-        response = session.get(URL + "/mod/assign/view.php", params=params)
-    except ConnectionError as exc:
+        with session.get(
+            settings.URL + "/mod/assign/view.php", params=params, stream=True
+        ) as response:
+            write_response(response, grading_worksheet_file_name)
+    except requests.ConnectionError as exc:
         logger.exception(exc)
         raise DownloadException(
             f'Failed to download grading worksheet for "{assignment_name}"'
         )
 
-    grading_worksheet_file_name = Path(output_path) / Path(
-        assignment_name + ASSIGNMENT_WORKSHEET_EXT
-    )
-
-    with grading_worksheet_file_name.open(mode="wb") as grading_worksheet_file:
-        grading_worksheet_file.write(response.content)
-
     return grading_worksheet_file_name
 
 
@@ -178,7 +487,7 @@ def download_course_grades_report(
     """
     params = {"id": course_id}
     report_download_page_response = session.get(
-        URL + "/grade/export/txt/index.php", params=params
+        settings.URL + "/grade/export/txt/index.php", params=params
     )
 
     # Decoding and retrieving the content of the download page
@@ -248,26 +557,33 @@ def download_course_grades_report(
     body_params["separator"] = "comma"
     body_params["submitbutton"] = "Download"
 
-    # Executing the POST request.
-    report_download_response = session.post(
-        URL + "/grade/export/txt/export.php", data=body_params
-    )
-
-    report_content = report_download_response.content
-
-    # Validating the returned report is valid.
-    if INVALID_REPORT_DOWNLOAD_PATTERN in str(report_content):
-        raise InvalidReportDownload(
-            "There has been a problem with the "
-            "received parameters for the download "
-            "POST request."
-        )
-
     report_file_name = Path(output_path) / Path(
         REPORT_FILE_NAME_FORMAT.format(course_name)
     )
 
-    with report_file_name.open(mode="wb") as report_file:
-        report_file.write(report_content)
+    # Executing the POST request, the report is written as it is received.
+    with session.post(
+        settings.URL + "/grade/export/txt/export.php", data=body_params, stream=True
+    ) as report_download_response:
+        chunks = report_download_response.iter_content(
+            chunk_size=settings.DOWNLOAD_CHUNK_SIZE
+        )
+
+        # Validating the returned report is valid. Moodle prints its warnings
+        # before the report, so only its beginning is checked.
+        report_prefix = b""
+        for chunk in chunks:
+            report_prefix += chunk
+            if len(report_prefix) >= REPORT_VALIDATION_SIZE:
+                break
+
+        if INVALID_REPORT_DOWNLOAD_PATTERN in report_prefix[:REPORT_VALIDATION_SIZE]:
+            raise InvalidReportDownload(
+                "There has been a problem with the "
+                "received parameters for the download "
+                "POST request."
+            )
+
+        write_chunks(itertools.chain([report_prefix], chunks), report_file_name)
 
     return report_file_name
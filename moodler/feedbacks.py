@@ -1,6 +1,6 @@
 from typing import List
 
-from moodler.moodle_api import call_moodle_api
+from moodler.moodle_api import call_moodle_api, call_moodle_api_many
 
 
 class Feedback(object):
@@ -46,8 +46,14 @@ def feedbacks(course_id) -> List[Feedback]:
     """
     Retrieve the feedbacks for a given course
     """
-    fbs = []
-    for feedback in mod_feedback_get_feedbacks_by_courses(course_id):
-        answers = mod_feedback_get_analysis(feedback["id"])
-        fbs.append(Feedback(feedback["id"], feedback["name"], answers))
-    return fbs
+    course_feedbacks = mod_feedback_get_feedbacks_by_courses(course_id)
+    results = call_moodle_api_many(
+        "mod_feedback_get_analysis",
+        [{"feedbackid": feedback["id"]} for feedback in course_feedbacks],
+        raise_errors=True,
+    )
+
+    return [
+        Feedback(feedback["id"], feedback["name"], result.response)
+        for feedback, result in zip(course_feedbacks, results)
+    ]
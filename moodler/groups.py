@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from moodler.moodle_api import call_moodle_api
 from moodler.students import Student, get_students
@@ -39,7 +39,9 @@ def get_group_users(groupids: List[int]) -> List[Dict[str, Any]]:
     return response
 
 
-def get_user_group_map(course_id: int) -> Dict[str, List[str]]:
+def get_user_group_map(
+    course_id: int, course_groups: Optional[List[Group]] = None
+) -> Dict[str, List[str]]:
     """
     Maps the user to their groups, returns an empty dictionary if there are no
     groups in the course
@@ -47,10 +49,14 @@ def get_user_group_map(course_id: int) -> Dict[str, List[str]]:
     {
         "User ID": ["Group Name"]
     }
+
+    :param course_groups: The groups of the course, if already fetched.
     """
+    if course_groups is None:
+        course_groups = get_course_groups(course_id)
+
     groups = {
-        course_group.group_id: course_group.name
-        for course_group in get_course_groups(course_id)
+        course_group.group_id: course_group.name for course_group in course_groups
     }
 
     if not groups:
@@ -66,16 +72,24 @@ def get_user_group_map(course_id: int) -> Dict[str, List[str]]:
     return mapping
 
 
-def get_students_with_groups(course_id: int) -> List[Student]:
+def get_students_with_groups(course_id: int, context=None) -> List[Student]:
     """
     Retrieve the students with their group in the course
+
+    :param context: A CourseContext holding the data of the course.
     """
-    group_map = get_user_group_map(course_id)
+    if context is not None:
+        group_map = context.user_group_map
+        students = context.students
+    else:
+        group_map = get_user_group_map(course_id)
+        students = get_students(course_id)
+
     return [
         Student(
             id,
             name,
             "" if not group_map else group_map[id],
         )
-        for id, name in get_students(course_id).items()
+        for id, name in students.items()
     ]
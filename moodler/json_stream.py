@@ -0,0 +1,246 @@
+"""
+Incremental decoding of large JSON documents.
+
+`JSONStreamParser` is fed the text of a document piece by piece and returns
+the items of one array in it as soon as each of them is complete, e.g. every
+assignment of a `mod_assign_get_submissions` response. Only the text of the
+item being read is kept, so the whole document never has to be in memory.
+"""
+
+import json
+import re
+from typing import Any, Iterable, Iterator, Optional
+
+# Marks an array in the path of the items to yield
+ITEM = object()
+
+_STRUCTURAL = re.compile(r'[{}\[\],:"]')
+# The characters changing the nesting inside a captured value
+_NESTING = re.compile(r'[{}\[\]"]')
+# The rest of a string after its opening quote
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+
+class JSONStreamError(ValueError):
+    pass
+
+
+class _Frame(object):
+    __slots__ = ("is_object", "key")
+
+    def __init__(self, is_object):
+        self.is_object = is_object
+        self.key: Any = None if is_object else ITEM
+
+
+class JSONStreamParser(object):
+    """
+    Parses a JSON document fed in pieces, returning the values found at
+    `path`.
+
+    The path is made of object keys and `ITEM` for array elements, e.g.
+    `("assignments", ITEM)` for every element of the "assignments" array of
+    the top level object, or `(ITEM,)` for every element of a top level
+    array.
+
+    The other members of a top level object (e.g. "warnings" or "exception")
+    are kept in `members`.
+    """
+
+    def __init__(self, path):
+        self.path = tuple(path)
+        self.members: dict[str, Any] = {}
+        self._buffer = ""
+        self._position = 0
+        self._frames: list[_Frame] = []
+        self._expect_key = False
+        # Start of the value being captured and the depth it started at. The
+        # text of the value parsed by earlier pieces is kept in `_captured`
+        self._capture_start: Optional[int] = None
+        self._captured: list[str] = []
+        # Open objects and arrays in the value being captured
+        self._nesting = 0
+        self._capture_depth = 0
+        self._capture_key: Any = None
+        self._items: list = []
+
+    def feed(self, text) -> list:
+        """
+        Parses the next piece of the document.
+
+        :return: The items completed by this piece.
+        """
+        self._buffer += text
+        self._scan()
+
+        # Move the parsed text of the value being captured aside, so the
+        # buffer only keeps the text that was not parsed yet and the next
+        # piece does not copy the whole value again
+        if self._capture_start is not None:
+            self._captured.append(self._buffer[self._capture_start : self._position])
+            self._capture_start = 0
+        self._buffer = self._buffer[self._position :]
+        self._position = 0
+
+        items, self._items = self._items, []
+        return items
+
+    def close(self):
+        """
+        Checks that the whole document was parsed.
+        """
+        if self._frames or self._nesting or self._buffer[self._position :].strip():
+            raise JSONStreamError("The JSON document ended unexpectedly")
+
+    def _current_path(self):
+        return tuple(frame.key for frame in self._frames)
+
+    def _start_value(self, index):
+        if self._capture_start is not None:
+            return
+
+        path = self._current_path()
+        if path == self.path:
+            self._capture_key = ITEM
+        elif len(path) == 1 and self._frames[0].is_object and path != self.path[:1]:
+            self._capture_key = path[0]
+        else:
+            return
+
+        self._capture_start = index
+        self._capture_depth = len(self._frames)
+
+    def _end_value(self, end):
+        if self._capture_start is None or len(self._frames) != self._capture_depth:
+            return
+
+        text = self._buffer[self._capture_start : end]
+        if self._captured:
+            self._captured.append(text)
+            text = "".join(self._captured)
+            self._captured = []
+
+        value = json.loads(text)
+        if self._capture_key is ITEM:
+            self._items.append(value)
+        else:
+            self.members[self._capture_key] = value
+        self._capture_start = None
+
+    def _scalar(self, end):
+        # A number, true, false or null ends at the next structural character
+        text = self._buffer[self._position : end]
+        stripped = text.strip()
+        if not stripped:
+            return
+
+        start = self._position + len(text) - len(text.lstrip())
+        self._start_value(start)
+        self._end_value(start + len(stripped))
+
+    def _skip_captured(self):
+        """
+        Advances to the end of the object or array being captured, only
+        following its nesting, since its content is decoded at once.
+
+        :return: Whether the value ended in the buffer.
+        """
+        buffer = self._buffer
+        position = self._position
+        nesting = self._nesting
+        while nesting:
+            match = _NESTING.search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+
+            index = match.start()
+            if buffer[index] == '"':
+                rest = _STRING_REST.match(buffer, index + 1)
+                if rest is None:
+                    # The string continues in the next piece
+                    position = index
+                    break
+                position = rest.end()
+            else:
+                nesting += 1 if buffer[index] in "{[" else -1
+                position = index + 1
+
+        self._position = position
+        self._nesting = nesting
+        if nesting:
+            return False
+
+        self._end_value(position)
+        return True
+
+    def _scan(self):
+        buffer = self._buffer
+        if self._nesting and not self._skip_captured():
+            return
+
+        while True:
+            match = _STRUCTURAL.search(buffer, self._position)
+            if match is None:
+                return
+
+            index = match.start()
+            char = buffer[index]
+
+            if char == '"':
+                rest = _STRING_REST.match(buffer, index + 1)
+                if rest is None:
+                    # The string continues in the next piece
+                    return
+                end = rest.end()
+                if self._expect_key:
+                    self._frames[-1].key = json.loads(buffer[index:end])
+                    self._expect_key = False
+                else:
+                    self._start_value(index)
+                    self._end_value(end)
+                self._position = end
+            elif char in "{[":
+                self._start_value(index)
+                if self._capture_start is not None:
+                    self._nesting = 1
+                    self._position = index + 1
+                    if not self._skip_captured():
+                        return
+                    continue
+
+                self._frames.append(_Frame(char == "{"))
+                self._expect_key = char == "{"
+                self._position = index + 1
+            elif char == ":":
+                self._position = index + 1
+            elif char == ",":
+                self._scalar(index)
+                self._expect_key = self._frames[-1].is_object
+                self._position = index + 1
+            else:
+                self._scalar(index)
+                if not self._frames:
+                    raise JSONStreamError(f"Unexpected '{char}' in JSON document")
+                self._frames.pop()
+                self._expect_key = False
+                self._end_value(index + 1)
+                self._position = index + 1
+
+
+def iter_json_items(pieces: Iterable[str], path, members=None) -> Iterator:
+    """
+    Yields the values at `path` of the JSON document made of `pieces`.
+
+    :param pieces: The text of the document, in pieces.
+    :param path: The path of the values to yield, see `JSONStreamParser`.
+    :param members: A dict to fill with the other members of a top level
+    object, once the document was parsed.
+    """
+    parser = JSONStreamParser(path)
+    for piece in pieces:
+        yield from parser.feed(piece)
+    parser.close()
+
+    if members is not None:
+        members.update(parser.members)
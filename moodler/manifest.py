@@ -0,0 +1,135 @@
+"""
+Manifest of the files downloaded to an export folder.
+
+The manifest keeps the URL, size, timestamp and hash of every file an export
+downloaded, by its path in the folder. The next export to the same folder
+skips the files Moodle still reports with the same size and timestamp, and
+can prune the files that were removed from the course since.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from moodler.download import write_chunks
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = ".moodler_manifest.json"
+MANIFEST_VERSION = 1
+
+
+class ExportManifest(object):
+    """
+    The files downloaded to an export folder, stored in `MANIFEST_FILE_NAME`
+    in that folder.
+
+    Usage:
+        manifest = ExportManifest.load(folder)
+        downloader = Downloader(manifest=manifest)
+        ...
+        downloader.run()
+        manifest.prune()
+        manifest.save()
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.path = self.root / MANIFEST_FILE_NAME
+        # Entries by the path of the file relative to the root
+        self.entries: dict[str, dict] = {}
+        # Paths of the files that are part of the current export
+        self._seen: set[str] = set()
+
+    def __repr__(self):
+        return "ExportManifest(root={}, files={})".format(self.root, len(self.entries))
+
+    @classmethod
+    def load(cls, root) -> "ExportManifest":
+        """
+        Loads the manifest of the given folder, an empty one if the folder was
+        not exported to yet.
+        """
+        manifest = cls(root)
+        try:
+            data = json.loads(manifest.path.read_text())
+        except FileNotFoundError:
+            return manifest
+        except ValueError:
+            logger.warning("Ignoring the invalid export manifest '%s'", manifest.path)
+            return manifest
+
+        if data.get("version") == MANIFEST_VERSION:
+            manifest.entries = data["files"]
+        return manifest
+
+    def _key(self, path):
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def is_current(
+        self, url, path, size: Optional[int] = None, timestamp: Optional[int] = None
+    ) -> bool:
+        """
+        Checks whether the file at `path` was downloaded from `url` and is
+        unchanged, according to the size and timestamp Moodle reports for it.
+        Files without a size nor a timestamp are never considered unchanged.
+
+        The file is kept by `prune` either way.
+        """
+        key = self._key(path)
+        self._seen.add(key)
+
+        entry = self.entries.get(key)
+        if entry is None or entry["url"] != url or (size is None and timestamp is None):
+            return False
+        if size is not None and entry["size"] != size:
+            return False
+        if timestamp is not None and entry["timestamp"] != timestamp:
+            return False
+
+        # The local file was deleted or changed since
+        try:
+            return Path(path).stat().st_size == entry["size"]
+        except FileNotFoundError:
+            return False
+
+    def record(self, url, path, size, digest, timestamp: Optional[int] = None):
+        """
+        Records a file downloaded to `path`.
+
+        :param size: The size of the downloaded file.
+        :param digest: The SHA-256 hex digest of the downloaded file.
+        :param timestamp: The modification time Moodle reports for the file.
+        """
+        key = self._key(path)
+        self._seen.add(key)
+        self.entries[key] = {
+            "url": url,
+            "size": size,
+            "timestamp": timestamp,
+            "sha256": digest,
+        }
+
+    def prune(self) -> list[Path]:
+        """
+        Deletes the files of earlier exports that were not checked nor
+        recorded since the manifest was loaded, i.e. were removed from the
+        course.
+
+        :return: The paths of the deleted files.
+        """
+        removed = []
+        for key in sorted(set(self.entries) - self._seen):
+            path = self.root / key
+            path.unlink(missing_ok=True)
+            del self.entries[key]
+            removed.append(path)
+            logger.info("Pruned '%s', it was removed from the course", path)
+        return removed
+
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = {"version": MANIFEST_VERSION, "files": self.entries}
+        write_chunks([json.dumps(data, indent=1).encode()], self.path)
@@ -2,25 +2,22 @@ import csv
 import logging
 from collections import Counter, defaultdict
 from dataclasses import dataclass
+from itertools import compress
 from pathlib import Path
-from typing import NamedTuple
-
-from moodler.assignment import Assignment, get_assignments
-from moodler.config import MOODLE_PASSWORD, MOODLE_USERNAME, STUDENTS_TO_IGNORE
-from moodler.download import (
-    DownloadException,
-    download_course_grades_report,
-    download_file,
-    download_submission,
-)
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from moodler.config import settings
 from moodler.enums import SubmissionStatus
-from moodler.feedbacks import feedbacks
-from moodler.groups import Group, get_user_group_map
-from moodler.moodle_connect import connect_to_server
-from moodler.sections import core_course_get_contents, get_course_by_id
-from moodler.students import get_students
 from moodler.utilities import safe_path
 
+# The subsystems are imported by the functions using them, so importing this
+# module does not load the HTTP stack
+if TYPE_CHECKING:
+    from moodler.assignment import Assignment
+    from moodler.course_context import CourseContext
+    from moodler.download import Downloader
+    from moodler.groups import Group
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,8 +40,10 @@ class ExerciseStatistics:
                 if submission.resubmitted:
                     self.resubmissions += 1
 
-                if submission.user_id in STUDENTS_TO_IGNORE.keys():
-                    ungraded_ignored.append(STUDENTS_TO_IGNORE[submission.user_id])
+                if submission.user_id in settings.STUDENTS_TO_IGNORE.keys():
+                    ungraded_ignored.append(
+                        settings.STUDENTS_TO_IGNORE[submission.user_id]
+                    )
                     self.ungraded -= 1
 
             if submission.status == SubmissionStatus.SUBMITTED.value and not any(
@@ -90,8 +89,130 @@ class SubmissionTuple(NamedTuple):
     timestamp: int
 
 
+def _submission_table(assignments):
+    """
+    Returns the SubmissionTable of the submissions of the assignments, or None
+    if NumPy, which it needs, is not installed.
+    """
+    try:
+        from moodler.submission_table import SubmissionTable
+    except ImportError:
+        logger.debug("NumPy is not installed, counting submissions one by one")
+        return None
+
+    return SubmissionTable(assignments)
+
+
+def _log_exercise_statistics(assignment, exercise_stats, ungraded_ignored, is_verbose):
+    if is_verbose and len(ungraded_ignored) != 0:
+        logger.info(
+            "Ignored %s submissions for assignment '%s' (CMID %s, ID %s): %s",
+            len(ungraded_ignored),
+            assignment.name,
+            assignment.cmid,
+            assignment.uid,
+            ungraded_ignored,
+        )
+
+    if exercise_stats.ungraded != 0:
+        logger.info(
+            "Total ungraded for assignment [%s] (CMID %s, ID %s): %s/%s",
+            assignment.name,
+            assignment.cmid,
+            assignment.uid,
+            exercise_stats.ungraded,
+            len(assignment.submissions),
+        )
+
+
+def _count_submissions(stats, assignments, user_group_map, is_verbose) -> list[bool]:
+    """
+    Counts the submissions of every group and assignment one by one.
+
+    :param user_group_map: Dict mapping user ID to group name, or None to
+    count everyone in the 'null' group.
+    :return: Whether every submission needs grading, in the order of the
+    assignments and of their submissions.
+    """
+    needs_grading = []
+    for assignment in assignments:
+        submissions_by_group = defaultdict(list)
+        for submission in assignment.submissions:
+            group_name = (
+                user_group_map[submission.user_id]
+                if user_group_map is not None
+                else "null"
+            )
+            submissions_by_group[group_name].append(submission)
+            needs_grading.append(submission.needs_grading())
+
+        for group in submissions_by_group:
+            group_assignment_stats = stats[group].exercises[assignment.name]
+            ungraded_ignored = group_assignment_stats.process(
+                submissions_by_group[group]
+            )
+            stats[group].calculate(assignment.name)
+            _log_exercise_statistics(
+                assignment, group_assignment_stats, ungraded_ignored, is_verbose
+            )
+
+    return needs_grading
+
+
+def _count_table(stats, table, assignments, user_group_map, is_verbose):
+    """
+    Counts the submissions of every group and assignment with the masks of
+    `table`, grouped by assignment and group.
+
+    :param user_group_map: Dict mapping user ID to group name, or None to
+    count everyone in the 'null' group.
+    :return: The needs grading mask of the table.
+    """
+    from moodler.submission_table import GroupBy
+
+    needs_grading = table.needs_grading()
+    ignored = table.of_users(settings.STUDENTS_TO_IGNORE)
+    if user_group_map is None:
+        user_group_map = dict.fromkeys(table.user_ids.tolist(), "null")
+    group_names, group_codes = table.map_users(user_group_map)
+    by_exercise = GroupBy(table.assignment_ids, group_codes)
+
+    submissions = by_exercise.count()
+    ungraded = by_exercise.count(needs_grading & ~ignored)
+    resubmissions = by_exercise.count(needs_grading & table.resubmitted())
+    unreleased = by_exercise.count(
+        table.submitted() & ~(needs_grading | table.released())
+    )
+
+    ungraded_ignored = defaultdict(list)
+    for row in (needs_grading & ignored).nonzero()[0].tolist():
+        ungraded_ignored[by_exercise.groups[row]].append(
+            settings.STUDENTS_TO_IGNORE[int(table.user_ids[row])]
+        )
+
+    assignments_by_id = {assignment.uid: assignment for assignment in assignments}
+    for index, (assignment_id, group_code) in enumerate(by_exercise.keys):
+        assignment = assignments_by_id[assignment_id]
+        group = group_names[group_code]
+        group_assignment_stats = stats[group].exercises[assignment.name]
+        group_assignment_stats.submissions = int(submissions[index])
+        group_assignment_stats.ungraded = int(ungraded[index])
+        group_assignment_stats.resubmissions = int(resubmissions[index])
+        group_assignment_stats.unreleased = int(unreleased[index])
+        stats[group].calculate(assignment.name)
+        _log_exercise_statistics(
+            assignment, group_assignment_stats, ungraded_ignored[index], is_verbose
+        )
+
+    return needs_grading
+
+
 def submissions_statistics(
-    course_id: int, groups: list[Group], is_verbose=False, download_folder=None
+    course_id: int,
+    groups: Optional[list["Group"]] = None,
+    is_verbose=False,
+    download_folder=None,
+    context: Optional["CourseContext"] = None,
 ):
     """
     Returns a dictionary describing the status of ungraded exercises in the course.
@@ -119,14 +240,19 @@ def submissions_statistics(
     If no groups, the group name will be 'null'.
     ```
 
-    If download_folder is set, downloads the ungraded exercises
+    If download_folder is set, downloads the ungraded exercises.
+    The course data is taken from `context` if given.
     """
+    from moodler.course_context import CourseContext
+    from moodler.download import Downloader, download_submission
+
     logger.info("Showing ungraded submissions for course %s", course_id)
 
-    assignments = get_assignments(course_id) or []
+    context = context or CourseContext(course_id)
+    users_map = context.students
+    assignments = context.assignments
     group_names = [group.name for group in groups] if groups else ["null"]
-    user_group_map = get_user_group_map(course_id)
-    users_map = get_students(course_id)
+    user_group_map = context.user_group_map if groups else {}
 
     stats = {
         group_name: SubmissionStatistics(
@@ -147,47 +273,29 @@ def submissions_statistics(
         for group_name in group_names
     }
 
-    for assignment in assignments:
-        submissions_by_group = defaultdict(list)
-        for submission in assignment.submissions:
-            group_name = user_group_map[submission.user_id] if groups else "null"
-            submissions_by_group[group_name].append(submission)
-
-            if submission.needs_grading() and download_folder is not None:
-                download_submission(
-                    assignment.name,
-                    users_map[submission.user_id],
-                    submission,
-                    download_folder,
-                )
-
-        for group in submissions_by_group:
-            group_assignment_stats = stats[group].exercises[assignment.name]
-            ungraded_ignored = group_assignment_stats.process(
-                submissions_by_group[group]
+    table = _submission_table(assignments)
+    group_map = user_group_map if groups else None
+    if table is None:
+        needs_grading = _count_submissions(stats, assignments, group_map, is_verbose)
+    else:
+        needs_grading = _count_table(stats, table, assignments, group_map, is_verbose)
+
+    if download_folder is not None:
+        downloader = Downloader()
+        submissions = (
+            (assignment, submission)
+            for assignment in assignments
+            for submission in assignment.submissions
+        )
+        for assignment, submission in compress(submissions, needs_grading):
+            download_submission(
+                assignment.name,
+                users_map[submission.user_id],
+                submission,
+                download_folder,
+                downloader=downloader,
             )
-            stats[group].calculate(assignment.name)
-
-            # Print assignment stats
-            if is_verbose and len(ungraded_ignored) != 0:
-                logger.info(
-                    "Ignored %s submissions for assignment '%s' (CMID %s, ID %s): %s",
-                    len(ungraded_ignored),
-                    assignment.name,
-                    assignment.cmid,
-                    assignment.uid,
-                    ungraded_ignored,
-                )
-
-            if group_assignment_stats.ungraded != 0:
-                logger.info(
-                    "Total ungraded for assignment [%s] (CMID %s, ID %s): %s/%s",
-                    assignment.name,
-                    assignment.cmid,
-                    assignment.uid,
-                    group_assignment_stats.ungraded,
-                    len(assignment.submissions),
-                )
+        downloader.run()
 
     return stats
 
@@ -196,6 +304,8 @@ def export_feedbacks(course_id: int, folder: Path):
     """
     Exports the feedbacks of a course, in csv format, to a speicifed folder.
     """
+    from moodler.feedbacks import feedbacks
+
     folder.mkdir(parents=True, exist_ok=True)
     for feedback in feedbacks(course_id):
         if feedback.responses_count == 0:
@@ -208,12 +318,23 @@ def export_feedbacks(course_id: int, folder: Path):
             writer.writerows(zip(*feedback.answers.values()))
 
 
-def export_submissions(course_id, download_folder):
+def export_submissions(course_id, download_folder, context=None, prune=False):
     """
-    Downloads all submissions from a given course
+    Downloads all submissions from a given course. Files that did not change
+    since the last export to the folder are not downloaded again.
+
+    :param prune: Delete the files of earlier exports that were removed from
+    the course.
     """
-    assignments = get_assignments(course_id)
-    users_map = get_students(course_id)
+    from moodler.course_context import CourseContext
+    from moodler.download import Downloader, download_submission
+    from moodler.manifest import ExportManifest
+
+    context = context or CourseContext(course_id)
+    users_map = context.students
+    assignments = context.assignments
+    manifest = ExportManifest.load(download_folder)
+    downloader = Downloader(manifest=manifest)
     for assignment in assignments:
         for submission in assignment.submissions:
             download_submission(
@@ -221,10 +342,18 @@ def export_submissions(course_id, download_folder):
                 users_map[submission.user_id],
                 submission,
                 download_folder,
+                downloader=downloader,
             )
+    downloader.run()
+
+    if prune:
+        manifest.prune()
+    manifest.save()
 
 
-def _export_assignment(assignment: Assignment, folder: Path):
+def _export_assignment(
+    assignment: "Assignment", folder: Path, downloader: "Downloader"
+):
     assign_folder = folder / safe_path(assignment.name)
     assign_folder.mkdir(parents=True, exist_ok=True)
 
@@ -233,26 +362,53 @@ def _export_assignment(assignment: Assignment, folder: Path):
             ".txt"
         )
         description_file.write_text(assignment.description)
-    for attachment in assignment.attachments:
-        download_file(attachment, assign_folder)
+    for attachment in assignment.attachment_files:
+        _add_content(downloader, attachment, assign_folder)
 
 
-def _export_page(page_module: dict, folder: Path):
+def _export_page(page_module: dict, folder: Path, downloader: "Downloader"):
     page_folder = folder / safe_path(page_module["name"])
     page_folder.mkdir(parents=True, exist_ok=True)
 
     # Assuming a page can module will have only 1 content
     assert len(page_module["contents"]) == 1
-    download_file(page_module["contents"][0]["fileurl"], page_folder)
+    # The size of the page content is not reported, only its timestamp
+    content = page_module["contents"][0]
+    downloader.add(
+        content["fileurl"], page_folder, timestamp=content.get("timemodified")
+    )
 
 
-def export_materials(course_id, folder):
+def _add_content(downloader: "Downloader", content: dict, folder: Path):
+    downloader.add(
+        content["fileurl"],
+        folder,
+        content.get("filesize"),
+        content.get("timemodified"),
+    )
+
+
+def export_materials(course_id, folder, context=None, prune=False):
     """
-    Downloads all the materials from a course to a given folder
+    Downloads all the materials from a course to a given folder. Files that
+    did not change since the last export to the folder, or that are held by
+    the blob store of BLOB_STORE_PATH, are not downloaded again.
+
+    :param prune: Delete the files of earlier exports that were removed from
+    the course.
     """
+    from moodler.blob_store import get_blob_store
+    from moodler.course_context import CourseContext
+    from moodler.download import Downloader
+    from moodler.manifest import ExportManifest
+
+    context = context or CourseContext(course_id)
     # Put assignments into a dict to find easily
-    assigns = {assign.uid: assign for assign in get_assignments(course_id)}
-    sections = core_course_get_contents(course_id)
+    assigns = {assign.uid: assign for assign in context.assignments}
+    sections = context.contents
+    manifest = ExportManifest.load(folder)
+    store = get_blob_store()
+    downloader = Downloader(manifest=manifest, store=store)
 
     for section in sections:
         safe_section_name = section["name"].replace("/", ".")
@@ -287,29 +443,41 @@ def export_materials(course_id, folder):
                     download_folder.mkdir(parents=True, exist_ok=True)
 
                 for resource in module["contents"]:
-                    download_file(resource["fileurl"], download_folder)
+                    _add_content(downloader, resource, download_folder)
             elif module_type == "assign":
                 # If module is an assignment - download attachments and description
                 assign = assigns[module["instance"]]
-                _export_assignment(assign, section_folder)
+                _export_assignment(assign, section_folder, downloader)
             elif module_type == "url":
                 url_file = section_folder / safe_path(f"{module_name}_url.txt")
                 # Assuming a url module can only have 1 url inside
                 assert len(module["contents"]) == 1
                 url_file.write_text(module["contents"][0]["fileurl"])
             elif module_type == "page":
-                _export_page(module, section_folder)
+                _export_page(module, section_folder, downloader)
+
+    downloader.run()
+    if store is not None:
+        store.save()
+
+    if prune:
+        manifest.prune()
+    manifest.save()
 
 
 def export_grades(course_id, output_path, should_export_feedback=False):
     """
     Exports the complete grade file to the given folder in csv format
     """
+    from moodler.download import DownloadException, download_course_grades_report
+    from moodler.moodle_connect import connect_to_server
+    from moodler.sections import get_course_by_id
+
     course = get_course_by_id(course_id)
     if not course:
         raise ValueError(f"Course with ID {course_id} not found.")
 
-    session = connect_to_server(MOODLE_USERNAME, MOODLE_PASSWORD)
+    session = connect_to_server(settings.MOODLE_USERNAME, settings.MOODLE_PASSWORD)
 
     try:
         grades_spreadsheet_file = download_course_grades_report(
@@ -324,28 +492,35 @@ def export_grades(course_id, output_path, should_export_feedback=False):
         logger.exception("Failed downloading grade report")
 
 
-def export_all(course_id, folder: Path):
+def export_all(course_id, folder: Path, prune=False):
     """
     Exports submissions, materials, and grades for the given course
+
+    :param prune: Delete the submissions and materials of earlier exports that
+    were removed from the course.
     """
+    from moodler.course_context import CourseContext
+
+    # Shared by the exports, so every dataset is fetched once
+    context = CourseContext(course_id).prefetch(("students", "contents", "assignments"))
+
     logger.info("Exporting grades...")
     export_grades(course_id, folder)
     logger.info("Exporting materials...")
-    export_materials(course_id, Path(folder) / "Materials")
+    export_materials(course_id, Path(folder) / "Materials", context, prune)
     logger.info("Exporting submissions...")
-    export_submissions(course_id, Path(folder) / "Submissions")
+    export_submissions(course_id, Path(folder) / "Submissions", context, prune)
     logger.info("Exporting feedbacks...")
     export_feedbacks(course_id, Path(folder) / "Feedbacks")
 
 
-def status_report(course_id):
-    """
-    Generates a short report of the students for a specific course.
-    Returns a list of StudentStatus tuples.
+def _count_user_submissions(assignments, users_map):
     """
-    assignments = get_assignments(course_id)
-    users_map = get_students(course_id)
+    Counts the submissions of every user one by one.
 
+    :return: Dicts mapping user name to the amount of submissions, and to the
+    name of the assignment submitted last.
+    """
     submissions_by_user = Counter()
     last_submission_by_user = defaultdict(
         lambda: SubmissionTuple(name="Nothing", timestamp=0)
@@ -361,10 +536,67 @@ def status_report(course_id):
                     name=assignment.name, timestamp=submission.timestamp
                 )
 
+    return submissions_by_user, {
+        user: last_submission_by_user[user].name for user in submissions_by_user
+    }
+
+
+def _count_user_table(table, assignments, users_map):
+    """
+    Counts the submissions of every user with `table`, grouped by user.
+
+    :return: Dicts mapping user name to the amount of submissions, and to the
+    name of the assignment submitted last.
+    """
+    from moodler.submission_table import GroupBy
+
+    user_names, user_codes = table.map_users(users_map)
+    by_user = GroupBy(user_codes)
+    # Like in `_count_user_submissions`, a submission with a timestamp of 0 is
+    # never the last one
+    last_rows = by_user.last(table.timestamps, table.timestamps > 0)
+    assignment_names = {assignment.uid: assignment.name for assignment in assignments}
+
+    submissions_by_user = {}
+    last_submission_by_user = {}
+    for (user_code,), count, row in zip(
+        by_user.keys, by_user.count().tolist(), last_rows.tolist()
+    ):
+        user = user_names[user_code]
+        submissions_by_user[user] = count
+        last_submission_by_user[user] = (
+            assignment_names[int(table.assignment_ids[row])] if row >= 0 else "Nothing"
+        )
+
+    return submissions_by_user, last_submission_by_user
+
+
+def status_report(course_id, context=None):
+    """
+    Generates a short report of the students for a specific course.
+    Returns a list of StudentStatus tuples.
+    The course data is taken from `context` if given.
+    """
+    from moodler.course_context import CourseContext
+
+    context = context or CourseContext(course_id)
+    users_map = context.students
+    assignments = context.assignments
+
+    table = _submission_table(assignments)
+    if table is None:
+        submissions_by_user, last_submission_by_user = _count_user_submissions(
+            assignments, users_map
+        )
+    else:
+        submissions_by_user, last_submission_by_user = _count_user_table(
+            table, assignments, users_map
+        )
+
     student_statuses = []
     for user, submission_count in submissions_by_user.items():
         student_statuses.append(
-            StudentStatus(user, submission_count, last_submission_by_user[user].name)
+            StudentStatus(user, submission_count, last_submission_by_user[user])
         )
 
     student_statuses = sorted(
@@ -2,12 +2,22 @@
 This file should contain general logic for every Moodle API call.
 """
 
+import codecs
+import functools
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, NamedTuple, Optional
 
 import requests
-from requests.exceptions import HTTPError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ConnectTimeout, HTTPError, ReadTimeout
 
-from moodler.consts import TOKEN, URL
+from moodler.cache import MISSING, DiskCache, ResponseCache
+from moodler.config import settings
+from moodler.json_stream import iter_json_items
 from moodler.moodle_exception import MoodlerException
 from moodler.urlencode import urlencode
 
@@ -19,6 +29,12 @@ RESPONSE_MESSAGE_KEY = "message"
 RESPONSE_EXCEPTION_KEY = "exception"
 RESPONSE_WARNINGS_KEY = "warnings"
 
+HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+# Moodle function that runs several web service functions in one request
+BATCH_FUNCTION = "tool_mobile_call_external_functions"
+DEFAULT_BATCH_SIZE = 25
+
 
 class MoodleAPIException(MoodlerException):
     pass
@@ -64,52 +80,425 @@ def validate_response(function_name, response):
         )
 
 
-def prepare_data(moodle_function, **kwargs):
-    """
-    Generic function for building urlencoded data for Moodle API.
-    """
+@functools.lru_cache(maxsize=None)
+def _static_data(moodle_function):
+    # The part of the data that is the same for every call of a function
     return urlencode(
         {
-            **kwargs,
-            "wstoken": TOKEN,
+            "wstoken": settings.TOKEN,
             "wsfunction": moodle_function,
             "moodlewsrestformat": "json",
         }
     )
 
 
-def call_moodle_api(moodle_function, **kwargs):
+def prepare_data(moodle_function, as_bytes=False, **kwargs):
     """
-    Utility function that will wrap a Moodle function.
+    Generic function for building urlencoded data for Moodle API.
+
+    :param as_bytes: Return ASCII bytes instead of a string.
     """
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = prepare_data(moodle_function, **kwargs)
+    static_data = _static_data(moodle_function)
+    data = urlencode(kwargs)
+    data = f"{data}&{static_data}" if data else static_data
+    return data.encode("ascii") if as_bytes else data
 
-    try:
-        response = requests.post(URL, data, headers=headers)
-        response.raise_for_status()
-    except HTTPError as e:
-        if response.status_code == 504:
+
+class CallResult(NamedTuple):
+    """
+    The outcome of one call made by `call_moodle_api_many`.
+    """
+
+    kwargs: dict
+    response: Any = None
+    error: Optional[Exception] = None
+
+
+class MoodleClient(object):
+    """
+    Client for the Moodle web service API.
+
+    Keeps a pooled `requests.Session` so consecutive calls reuse the same
+    keep-alive TCP/TLS connection instead of opening a new one per call.
+    """
+
+    def __init__(
+        self,
+        url=None,
+        pool_size=None,
+        timeout=None,
+        session=None,
+        cache=None,
+        disk_cache=None,
+    ):
+        """
+        :param url: The URL of the Moodle web service REST endpoint, by
+        default the one of the settings.
+        :param pool_size: The maximum amount of connections kept alive, by
+        default POOL_SIZE.
+        :param timeout: A (connect, read) timeout tuple in seconds, by default
+        CONNECT_TIMEOUT and READ_TIMEOUT.
+        :param session: An existing session to use instead of creating one.
+        :param cache: A ResponseCache for the responses of read-only functions.
+        :param disk_cache: A DiskCache keeping responses between runs, checked
+        after `cache`.
+        """
+        self.url = url or settings.WEBSERVICE_URL
+        self.timeout = timeout or (settings.CONNECT_TIMEOUT, settings.READ_TIMEOUT)
+        self.session = session or create_session(pool_size)
+        self.cache = cache
+        self.disk_cache = disk_cache
+
+    def call(self, moodle_function, **kwargs):
+        """
+        Calls a Moodle function and returns its validated JSON response.
+        """
+        caches = [cache for cache in (self.cache, self.disk_cache) if cache is not None]
+        if not caches:
+            return self._call(moodle_function, **kwargs)
+
+        for index, cache in enumerate(caches):
+            response_json = cache.get(moodle_function, kwargs)
+            if response_json is not MISSING:
+                # Keep the response in the faster caches as well
+                for faster_cache in caches[:index]:
+                    faster_cache.put(moodle_function, kwargs, response_json)
+                break
+        else:
+            response_json = self._call(moodle_function, **kwargs)
+            for cache in caches:
+                cache.put(moodle_function, kwargs, response_json)
+
+        for cache in caches:
+            cache.invalidate(moodle_function, kwargs)
+        return response_json
+
+    def _call(self, moodle_function, **kwargs):
+        data = prepare_data(moodle_function, **kwargs)
+        response = self.post(moodle_function, data)
+
+        try:
+            response_json = response.json()
+        except ValueError as e:
+            raise ValueError(
+                f"Failed calling api with the data ({data}) with status code "
+                f"{response.status_code}\nMake sure the URL is correct"
+            ) from e
+
+        validate_response(moodle_function, response_json)
+        return response_json
+
+    def stream(self, moodle_function, path, **kwargs) -> Iterator:
+        """
+        Calls a Moodle function and yields the items at `path` of its JSON
+        response as they are received, e.g. `("assignments", ITEM)`. See
+        `JSONStreamParser` for the path format.
+
+        The response is validated like in `call` once it was read, and is not
+        cached.
+        """
+        data = prepare_data(moodle_function, **kwargs)
+        response = self.post(moodle_function, data, stream=True)
+        members: dict = {}
+
+        try:
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            pieces = (
+                decoder.decode(chunk)
+                for chunk in response.iter_content(
+                    chunk_size=settings.STREAM_CHUNK_SIZE
+                )
+            )
+            yield from iter_json_items(pieces, path, members)
+        except RequestsConnectionError as e:
+            raise MoodleAPIException(
+                f"Connection lost while reading the response of '{moodle_function}'"
+            ) from e
+        except ValueError as e:
+            raise ValueError(
+                f"Failed calling api with the data ({data}) with status code "
+                f"{response.status_code}\nMake sure the URL is correct"
+            ) from e
+        finally:
+            response.close()
+
+        validate_response(moodle_function, members)
+
+    def post(self, moodle_function, data, **kwargs):
+        """
+        Posts the urlencoded data to the web service and returns the raw
+        response, translating HTTP failures into Moodle API exceptions.
+        """
+        try:
+            response = self.session.post(
+                self.url, data, headers=HEADERS, timeout=self.timeout, **kwargs
+            )
+        except ConnectTimeout as e:
+            raise MoodleAPIException(
+                f"Failed connecting to the Moodle API for '{moodle_function}' "
+                f"within {self.timeout[0]} seconds"
+            ) from e
+        except ReadTimeout as e:
             raise MoodleAPITimeoutException(
-                f"Request to Moodle API '{moodle_function}' timed out with status code {response.status_code}. "
-                "This may be due to a large amount of data being requested. "
+                f"Request to Moodle API '{moodle_function}' got no response "
+                f"within {self.timeout[1]} seconds. "
                 "Consider fetching data in smaller chunks."
             ) from e
 
-        raise MoodleAPIException(
-            f"Failed calling api '{moodle_function}' with status code {response.status_code}"
-        ) from e
+        try:
+            response.raise_for_status()
+        except HTTPError as e:
+            if response.status_code == 504:
+                raise MoodleAPITimeoutException(
+                    f"Request to Moodle API '{moodle_function}' timed out with status code {response.status_code}. "
+                    "This may be due to a large amount of data being requested. "
+                    "Consider fetching data in smaller chunks."
+                ) from e
+
+            raise MoodleAPIException(
+                f"Failed calling api '{moodle_function}' with status code {response.status_code}"
+            ) from e
+
+        return response
+
+    def close(self):
+        self.session.close()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+
+def create_session(pool_size=None):
+    """
+    Creates a session that keeps up to `pool_size` connections alive, by
+    default POOL_SIZE.
+    """
+    pool_size = pool_size or settings.POOL_SIZE
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
 
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the module-level client used by `call_moodle_api`, creating it on
+    first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MoodleClient(
+                cache=ResponseCache() if settings.CACHE_TTL > 0 else None,
+                disk_cache=(
+                    DiskCache(settings.DISK_CACHE_PATH, settings.WEBSERVICE_URL)
+                    if settings.DISK_CACHE_PATH
+                    else None
+                ),
+            )
+        return _client
+
+
+def set_client(client):
+    """
+    Replaces the module-level client used by `call_moodle_api`, e.g. to use a
+    different pool size or timeout. Returns the previous client.
+    """
+    global _client
+    with _client_lock:
+        previous_client, _client = _client, client
+    return previous_client
+
+
+def call_moodle_api(moodle_function, **kwargs):
+    """
+    Utility function that will wrap a Moodle function.
+    """
+    return get_client().call(moodle_function, **kwargs)
+
+
+def call_moodle_api_stream(moodle_function, path, **kwargs) -> Iterator:
+    """
+    Streaming version of `call_moodle_api`, see `MoodleClient.stream`.
+    """
+    return get_client().stream(moodle_function, path, **kwargs)
+
+
+def call_moodle_api_many(
+    moodle_function,
+    list_of_kwargs,
+    max_workers=None,
+    raise_errors=False,
+    batch_size=None,
+) -> list[CallResult]:
+    """
+    Calls the same Moodle function once for every kwargs in `list_of_kwargs`,
+    running up to `max_workers` calls at the same time.
+
+    A failing call does not stop the others - its exception is logged and
+    kept in the `error` of its result.
+
+    :param moodle_function: The Moodle function to call.
+    :param list_of_kwargs: The arguments of every call.
+    :param max_workers: The maximum amount of calls in flight, by default
+    POOL_SIZE.
+    :param raise_errors: Raise the first error once all the calls are done.
+    :param batch_size: If above 1, send this many calls in every HTTP request
+    (see `MoodleBatch`), by default BATCH_SIZE.
+    :return: List of CallResult, in the same order as `list_of_kwargs`.
+    """
+    max_workers = max_workers or settings.POOL_SIZE
+    if batch_size is None:
+        batch_size = settings.BATCH_SIZE
+
+    if batch_size > 1:
+        batch = MoodleBatch(batch_size=batch_size, max_workers=max_workers)
+        for kwargs in list_of_kwargs:
+            batch.add(moodle_function, **kwargs)
+        results = batch.send()
+    else:
+
+        def call(kwargs):
+            try:
+                return CallResult(
+                    kwargs, response=call_moodle_api(moodle_function, **kwargs)
+                )
+            except Exception as e:
+                logger.warning(
+                    'API function "%s" failed for %s: %s', moodle_function, kwargs, e
+                )
+                return CallResult(kwargs, error=e)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(call, list_of_kwargs))
+
+    if raise_errors:
+        for result in results:
+            if result.error is not None:
+                raise result.error
+
+    return results
+
+
+class MoodleBatch(object):
+    """
+    Queues Moodle calls and sends them `batch_size` at a time through Moodle's
+    `tool_mobile_call_external_functions`, turning N round-trips into about
+    N / batch_size. The token must be allowed to call that function.
+
+    Usage:
+        batch = MoodleBatch()
+        for feedback_id in feedback_ids:
+            batch.add("mod_feedback_get_analysis", feedbackid=feedback_id)
+        results = batch.send()
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, max_workers=None):
+        self.batch_size = batch_size
+        self.max_workers = max_workers or settings.POOL_SIZE
+        self._calls = []
+
+    def __len__(self):
+        return len(self._calls)
+
+    def add(self, moodle_function, **kwargs):
+        """
+        Queues a call to be sent with the next `send()`.
+        """
+        self._calls.append((moodle_function, kwargs))
+
+    def send(self) -> list[CallResult]:
+        """
+        Sends all the queued calls and empties the queue. Every response is
+        validated separately, so a failing call does not fail the others.
+
+        Moodle stops answering a batch at its first failing call, the calls
+        after it are sent again in the next batches.
+
+        :return: List of CallResult, in the same order the calls were queued.
+        """
+        calls, self._calls = self._calls, []
+        results: dict[int, CallResult] = {}
+        pending = list(enumerate(calls))
+        while pending:
+            pending = self._send_batches(pending, results)
+
+        return [results[index] for index in range(len(calls))]
+
+    def _send_batches(self, calls, results) -> list:
+        """
+        Sends the (index, call) pairs in batches and fills `results` by index.
+
+        :return: The pairs of the calls that were not answered.
+        """
+        batches = [
+            calls[i : i + self.batch_size]
+            for i in range(0, len(calls), self.batch_size)
+        ]
+
+        batch_results = call_moodle_api_many(
+            BATCH_FUNCTION,
+            [
+                {
+                    "requests": [
+                        {"function": moodle_function, "arguments": json.dumps(kwargs)}
+                        for _, (moodle_function, kwargs) in batch
+                    ]
+                }
+                for batch in batches
+            ],
+            max_workers=self.max_workers,
+            batch_size=0,
+        )
+
+        unanswered = []
+        for batch, batch_result in zip(batches, batch_results):
+            if batch_result.error is not None:
+                for index, (_, kwargs) in batch:
+                    results[index] = CallResult(kwargs, error=batch_result.error)
+                continue
+
+            responses = batch_result.response["responses"]
+            if not responses:
+                # Nothing was answered, sending the calls again would not help
+                error = MoodleAPIException(f"No responses from '{BATCH_FUNCTION}'")
+                for index, (_, kwargs) in batch:
+                    results[index] = CallResult(kwargs, error=error)
+                continue
+
+            for (index, (moodle_function, kwargs)), response in zip(batch, responses):
+                results[index] = _batched_call_result(moodle_function, kwargs, response)
+            unanswered.extend(batch[len(responses) :])
+
+        return unanswered
+
+
+def _batched_call_result(moodle_function, kwargs, response) -> CallResult:
+    """
+    Unpacks a single response of `tool_mobile_call_external_functions`, in
+    which both the data and the exception are JSON encoded strings.
+    """
     try:
-        response_json = response.json()
-    except ValueError as e:
-        raise ValueError(
-            f"Failed calling api with the data ({data}) with status code "
-            f"{response.status_code}\nMake sure the URL is correct"
-        ) from e
-
-    validate_response(moodle_function, response_json)
-    return response_json
+        if response["error"]:
+            exception = json.loads(response["exception"])
+            exception.setdefault(RESPONSE_EXCEPTION_KEY, exception.get("errorcode"))
+            exception.setdefault(RESPONSE_MESSAGE_KEY, "")
+            validate_response(moodle_function, exception)
+
+        response_json = json.loads(response["data"])
+        validate_response(moodle_function, response_json)
+    except Exception as e:
+        logger.warning(
+            'API function "%s" failed for %s: %s', moodle_function, kwargs, e
+        )
+        return CallResult(kwargs, error=e)
+
+    return CallResult(kwargs, response=response_json)
 
 
 def check_api_permissions(required_permissions: list[str]) -> None:
@@ -15,7 +15,7 @@ import re
 
 import requests
 
-from moodler.config import LOGIN_PAGE, URL
+from moodler.config import LOGIN_PAGE, settings
 from moodler.moodle_exception import MoodlerException
 
 logger = logging.getLogger(__name__)
@@ -50,7 +50,7 @@ def connect_to_server(username, password):
 
     # Using this get request in order to retrieve the login token for the
     # login request.
-    login_page_response = session.get("{}/{}".format(URL, LOGIN_PAGE))
+    login_page_response = session.get("{}/{}".format(settings.URL, LOGIN_PAGE))
 
     # Looking for the login token within the login page using regex.
     login_token_match = re.search(
@@ -78,7 +78,9 @@ def connect_to_server(username, password):
     }
 
     # Sending the login request.
-    login_post_response = session.post("{}/{}".format(URL, LOGIN_PAGE), data=params)
+    login_post_response = session.post(
+        "{}/{}".format(settings.URL, LOGIN_PAGE), data=params
+    )
 
     # Check if the login has failed due to invalid credentials
     failed_login_match = re.search(
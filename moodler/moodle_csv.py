@@ -5,7 +5,7 @@ from collections import OrderedDict
 from datetime import datetime
 from typing import Sequence
 
-from moodler.config import STUDENTS_TO_IGNORE
+from moodler.config import settings
 from moodler.moodle_exception import MoodlerException
 
 logger = logging.getLogger(__name__)
@@ -62,7 +62,7 @@ def is_resubmission(status, last_modified_grade: str, last_modified_sub: str) ->
 
 
 def should_skip_student(student_name):
-    return student_name.strip() in STUDENTS_TO_IGNORE.values()
+    return student_name.strip() in settings.STUDENTS_TO_IGNORE.values()
 
 
 def parse_datetime(value: str):
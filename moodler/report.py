@@ -1,5 +1,9 @@
 from moodler.groups import get_course_groups
-from moodler.moodle_api import MoodleAPITimeoutException, call_moodle_api
+from moodler.moodle_api import (
+    MoodleAPITimeoutException,
+    call_moodle_api,
+    call_moodle_api_many,
+)
 from moodler.students import get_students
 
 
@@ -15,6 +19,45 @@ def _validate(gradereport):
         raise GradeReportException(gradereport["warnings"])
 
 
+def _merge_gradereports(gradereports):
+    gradereport = {"usergrades": [], "warnings": []}
+
+    for partial_gradereport in gradereports:
+        gradereport["usergrades"].extend(partial_gradereport.get("usergrades", []))
+        gradereport["warnings"].extend(partial_gradereport.get("warnings", []))
+
+    return gradereport
+
+
+def _merge_results(results, id_field):
+    """
+    Merges the grade reports of the successful calls of a fan-out, keeping
+    them when other calls failed.
+
+    :param results: The CallResults of the fan-out.
+    :param id_field: The argument identifying every call, e.g. "userid".
+    :return: The merged grade report, with the ids of the failed calls in
+    its "failed" list.
+    """
+    failed = [result for result in results if result.error is not None]
+    if failed and len(failed) == len(results):
+        # Nothing to keep, so a timeout can still make the next strategy run
+        raise failed[0].error
+
+    gradereport = _merge_gradereports(
+        result.response for result in results if result.error is None
+    )
+    gradereport["failed"] = []
+    for result in failed:
+        print(
+            f"Failed fetching gradereport for {id_field} "
+            f"{result.kwargs[id_field]}: {result.error}"
+        )
+        gradereport["failed"].append(result.kwargs[id_field])
+
+    return gradereport
+
+
 def fetch_all(courseid: int):
     """
     Get the grade report by all users
@@ -27,40 +70,28 @@ def fetch_by_group(courseid: int):
     """
     Get the grade report by groups
     """
-    gradereport = {"usergrades": [], "warnings": []}
+    groups = get_course_groups(courseid)
+    print(f"Fetching gradereport for {len(groups)} groups...")
+    results = call_moodle_api_many(
+        "gradereport_user_get_grade_items",
+        [{"courseid": courseid, "groupid": group.group_id} for group in groups],
+    )
 
-    for group in get_course_groups(courseid):
-        print(f"Fetching gradereport for group {group.name}...")
-        group_gradereport = call_moodle_api(
-            "gradereport_user_get_grade_items",
-            courseid=courseid,
-            groupid=group.group_id,
-        )
-        gradereport["usergrades"].extend(group_gradereport.get("usergrades", []))
-        gradereport["warnings"].extend(group_gradereport.get("warnings", []))
-
-    return gradereport
+    return _merge_results(results, "groupid")
 
 
 def fetch_by_user(courseid: int):
     """
     Get the grade report by individual users
     """
-    gradereport = {"usergrades": [], "warnings": []}
-
     student_ids = list(get_students(courseid).keys())
     print(f"Fetching gradereport for {len(student_ids)} students individually...")
-    for userid in student_ids:
-        # TODO: Consider using threading to speed this up
-        student_gradereport = call_moodle_api(
-            "gradereport_user_get_grade_items",
-            courseid=courseid,
-            userid=userid,
-        )
-        gradereport["usergrades"].extend(student_gradereport.get("usergrades", []))
-        gradereport["warnings"].extend(student_gradereport.get("warnings", []))
+    results = call_moodle_api_many(
+        "gradereport_user_get_grade_items",
+        [{"courseid": courseid, "userid": userid} for userid in student_ids],
+    )
 
-    return gradereport
+    return _merge_results(results, "userid")
 
 
 def gradereport_user_get_grade_items(courseid: int):
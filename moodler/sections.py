@@ -5,7 +5,13 @@ from typing import Dict, Iterable, List, NamedTuple, Optional
 from parse import parse
 
 from moodler.assignment import get_assignments
-from moodler.moodle_api import MoodleAPIException, call_moodle_api
+from moodler.config import settings
+from moodler.json_stream import ITEM
+from moodler.moodle_api import (
+    MoodleAPIException,
+    call_moodle_api,
+    call_moodle_api_stream,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +42,23 @@ def core_course_get_courses():
     return response
 
 
-def core_course_get_contents(course_id):
+def core_course_get_contents(course_id, stream=None):
     """
     Returns the structure of the course with all resources and topics in a list
+
+    If `stream` is set (by default STREAM_RESPONSES), the response is decoded
+    section by section while it is received.
     """
+    if stream is None:
+        stream = settings.STREAM_RESPONSES
+
+    if stream:
+        return list(
+            call_moodle_api_stream(
+                "core_course_get_contents", (ITEM,), courseid=course_id
+            )
+        )
+
     response = call_moodle_api("core_course_get_contents", courseid=course_id)
     if not isinstance(response, list):
         raise MoodleAPIException("core_course_get_contents does not return a list.")
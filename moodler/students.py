@@ -1,11 +1,19 @@
 import logging
-from typing import NamedTuple
+from collections import defaultdict
+from typing import Iterator, NamedTuple
 
+from moodler.config import settings
 from moodler.moodle_api import MoodleAPIException, call_moodle_api
 from moodler.moodle_exception import MoodlerException
 
 logger = logging.getLogger(__name__)
 
+# The user fields used to find the students of a course
+STUDENT_FIELDS = ("id", "fullname", "roles")
+
+# Length of the substrings by which names are indexed
+NGRAM_SIZE = 3
+
 
 class TwoStudentsFoundConflict(MoodlerException):
     pass
@@ -17,19 +25,134 @@ class Student(NamedTuple):
     group: str
 
 
-def core_enrol_get_enrolled_users(course_id):
+def enrolment_options(
+    userfields=None, onlyactive=False, groupid=None, limitfrom=0, limitnumber=0
+) -> list[dict]:
+    """
+    Builds the `options` of core_enrol_get_enrolled_users.
+
+    :param userfields: The user fields to return, e.g. STUDENT_FIELDS. All the
+    fields are returned if None.
+    :param onlyactive: Return only the users with an active enrolment.
+    :param groupid: Return only the members of this group.
+    :param limitfrom: The index of the first user to return.
+    :param limitnumber: The maximum amount of users to return, 0 for all.
+    """
+    options = []
+    if userfields is not None:
+        options.append({"name": "userfields", "value": ", ".join(userfields)})
+    if onlyactive:
+        options.append({"name": "onlyactive", "value": 1})
+    if groupid is not None:
+        options.append({"name": "groupid", "value": groupid})
+    if limitnumber:
+        options.append({"name": "limitfrom", "value": limitfrom})
+        options.append({"name": "limitnumber", "value": limitnumber})
+    return options
+
+
+def iter_enrolled_users(
+    course_id,
+    userfields=None,
+    onlyactive=False,
+    groupid=None,
+    page_size=None,
+) -> Iterator[dict]:
     """
-    Get enrolled users by course id, returns a list of enrolled users
+    Yields the enrolled users of a course, fetching `page_size` users per
+    request (all of them in one request if 0, ENROLMENT_PAGE_SIZE by
+    default). See `enrolment_options` for the other parameters.
     """
-    response = call_moodle_api("core_enrol_get_enrolled_users", courseid=course_id)
-    if not isinstance(response, list):
-        raise MoodleAPIException(
-            "core_enrol_get_enrolled_users does not return a list."
+    if page_size is None:
+        page_size = settings.ENROLMENT_PAGE_SIZE
+
+    limitfrom = 0
+    while True:
+        kwargs = {"courseid": course_id}
+        options = enrolment_options(
+            userfields, onlyactive, groupid, limitfrom, page_size
         )
-    return response
+        if options:
+            kwargs["options"] = options
+
+        page = call_moodle_api("core_enrol_get_enrolled_users", **kwargs)
+        if not isinstance(page, list):
+            raise MoodleAPIException(
+                "core_enrol_get_enrolled_users does not return a list."
+            )
+        yield from page
+
+        if not page_size or len(page) < page_size:
+            return
+        limitfrom += page_size
+
+
+def core_enrol_get_enrolled_users(course_id, userfields=None, **kwargs):
+    """
+    Get enrolled users by course id, returns a list of enrolled users.
+    See `iter_enrolled_users` for the other parameters.
+
+    :param userfields: The user fields to return, all of them if None.
+    """
+    return list(iter_enrolled_users(course_id, userfields, **kwargs))
+
+
+class StudentNameIndex(object):
+    """
+    Case-insensitive substring lookup of students by name.
+
+    Every name is indexed by its n-grams, so a lookup only checks the names
+    containing all the n-grams of the searched name instead of all of them.
+    """
+
+    def __init__(self, students: dict[int, str], ngram_size=NGRAM_SIZE):
+        """
+        :param students: Dict mapping user ID to full name.
+        """
+        self.ngram_size = ngram_size
+        self._ids = list(students)
+        self._names = list(students.values())
+        self._lower_names = [name.lower() for name in self._names]
+        self._postings: dict[str, set[int]] = defaultdict(set)
+
+        for position, name in enumerate(self._lower_names):
+            for ngram in self._ngrams(name):
+                self._postings[ngram].add(position)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _ngrams(self, text):
+        return {
+            text[i : i + self.ngram_size]
+            for i in range(len(text) - self.ngram_size + 1)
+        }
 
+    def find(self, name) -> list[tuple[int, str]]:
+        """
+        Returns the (ID, full name) of every student whose name contains
+        `name`, in the order the students were given.
+        """
+        query = name.lower()
+        ngrams = self._ngrams(query)
 
-def get_students_ids_by_name(course_id, students_names: list):
+        if ngrams:
+            postings = sorted(
+                (self._postings.get(ngram, set()) for ngram in ngrams), key=len
+            )
+            candidates = sorted(postings[0].intersection(*postings[1:]))
+        else:
+            # Too short to have n-grams, check all the names
+            candidates = range(len(self._names))
+
+        return [
+            (self._ids[position], self._names[position])
+            for position in candidates
+            if query in self._lower_names[position]
+        ]
+
+
+def get_students_ids_by_name(course_id, students_names: list, enrolled_users=None):
     """
     The function is locating students IDs according to their name. The function
     receives a list of names to search in the enrolled students of the course
@@ -37,51 +160,59 @@ def get_students_ids_by_name(course_id, students_names: list):
     IDs of all of the students it has found.
     :param course_id: The ID of the course in which to locate the students.
     :param students_names: The list of students to search in the course.
+    :param enrolled_users: The enrolled users of the course, if already fetched.
     """
+    if enrolled_users is None:
+        enrolled_users = core_enrol_get_enrolled_users(course_id, STUDENT_FIELDS)
+
+    index = StudentNameIndex(
+        {
+            enrolled["id"]: enrolled["fullname"]
+            for enrolled in enrolled_users
+            if enrolled.get("roles") and enrolled["roles"][0]["shortname"] == "student"
+        }
+    )
     students_names_to_ids_dict = {}
 
     for student_name in students_names:
-        for enrolled in core_enrol_get_enrolled_users(course_id):
-            if enrolled["roles"][0]["shortname"] != "student":
-                continue
-
-            # Trying to locate a student that has a similar name to one of
-            # the names received in the input list.
-            if student_name.lower() not in enrolled["fullname"].lower():
-                continue
-
-            # At this point, we have found a student in the course that has a
-            # similar name to one of the names in the input list students_names
+        # Trying to locate a student that has a similar name to one of
+        # the names received in the input list.
+        found = index.find(student_name)
+        for _, fullname in found:
             logger.info(
                 "Found student '%s' for the received name '%s'",
-                enrolled["fullname"],
+                fullname,
                 student_name,
             )
 
-            if student_name not in students_names_to_ids_dict:
-                students_names_to_ids_dict[student_name] = enrolled["id"]
+        # If more than one student in the course has this name, the specified
+        # name in the list is not specific enough.
+        # We do not want duplications!
+        if len(found) > 1:
+            logger.error(
+                "Found more than one student containing this name. You should be more indicative with the name you specify. "
+                "For example, if you specify 'Tan', it is not indicative enough to understand who you are talking about since it is a very common surname!"
+            )
+            continue
 
-            # If we have already found this student in the course, that means
-            # that the specified name in the list is not specific enough and
-            # fits more than one names in the course.
-            # We do not want duplications!
-            else:
-                logger.error(
-                    "Found more than one student containing this name. You should be more indicative with the name you specify. "
-                    "For example, if you specify 'Tan', it is not indicative enough to understand who you are talking about since it is a very common surname!"
-                )
-                del students_names_to_ids_dict[student_name]
+        if found:
+            students_names_to_ids_dict[student_name] = found[0][0]
 
     return list(students_names_to_ids_dict.values())
 
 
-def get_students(course_id):
+def get_students(course_id, enrolled_users=None):
     """
     Get only the students enrolled in a course
+
+    :param enrolled_users: The enrolled users of the course, if already fetched.
     """
+    if enrolled_users is None:
+        enrolled_users = core_enrol_get_enrolled_users(course_id, STUDENT_FIELDS)
+
     output_enrolled_students: dict[int, str] = {}
 
-    for enrolled in core_enrol_get_enrolled_users(course_id):
+    for enrolled in enrolled_users:
         # Users might be enrolled into the course without any roles
         roles = enrolled.get("roles", [])
         shortnames = [role.get("shortname") for role in roles]
@@ -120,13 +251,55 @@ def get_user_name(user_id):
     return response_json["firstname"] + " " + response_json["lastname"]
 
 
-def get_students_raw(courseid: int):
+def get_user_names(user_ids, known_names=None) -> dict[int, str]:
+    """
+    Resolves the names of several users with a single request. Users whose
+    name could not be retrieved are mapped to their ID.
+
+    :param user_ids: The IDs of the users.
+    :param known_names: Dict mapping user ID to name that the caller already
+    has, e.g. from `get_students`. Only the other users are requested.
+    """
+    known_names = known_names or {}
+    user_names = {
+        user_id: known_names[user_id] for user_id in user_ids if user_id in known_names
+    }
+    unknown_ids = sorted(set(user_ids).difference(user_names))
+    if not unknown_ids:
+        return user_names
+
+    try:
+        response = call_moodle_api(
+            "core_user_get_users_by_field", field="id", values=unknown_ids
+        )
+    except MoodlerException as e:
+        logger.warning("Failed retrieving the names of %s users: %s", unknown_ids, e)
+        response = []
+
+    for user_json in response:
+        user_names[user_json["id"]] = (
+            user_json["firstname"] + " " + user_json["lastname"]
+        )
+
+    for user_id in unknown_ids:
+        user_names.setdefault(user_id, str(user_id))
+
+    return user_names
+
+
+def get_students_raw(courseid: int, userfields=None):
     """
     Get the raw data of students in the course
+
+    :param userfields: The user fields to return, all of them if None. The
+    roles are always requested to tell the students apart.
     """
+    if userfields is not None and "roles" not in userfields:
+        userfields = [*userfields, "roles"]
+
     students = [
         user
-        for user in core_enrol_get_enrolled_users(courseid)
+        for user in iter_enrolled_users(courseid, userfields)
         if any(role.get("shortname") == "student" for role in user["roles"])
     ]
     return students
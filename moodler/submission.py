@@ -1,5 +1,8 @@
+from moodler.chunking import fetch_in_chunks
+from moodler.config import settings
 from moodler.enums import SubmissionStatus, WorkflowState
-from moodler.moodle_api import call_moodle_api
+from moodler.json_stream import ITEM
+from moodler.moodle_api import call_moodle_api, call_moodle_api_stream
 from moodler.moodle_exception import MoodlerException
 
 # See https://github.com/moodle/moodle/blob/7c3188b/mod/assign/classes/output/renderer.php#L547-L548
@@ -11,34 +14,61 @@ class MissingGrade(MoodlerException):
 
 
 class Grade(object):
-    def __init__(self, grade_json):
+    __slots__ = ("timestamp", "grade", "_json_data")
+
+    def __init__(self, grade_json, keep_json=None):
+        if keep_json is None:
+            keep_json = settings.KEEP_RAW_JSON
         self.timestamp = grade_json["timemodified"]
         try:
             self.grade = float(grade_json["grade"])
         except ValueError:
             raise MissingGrade()
-        self._json_data = grade_json
+        self._json_data = grade_json if keep_json else None
 
     def __repr__(self):
         return "Grade(grade={}, timestamp={})".format(self.grade, self.timestamp)
 
 
 class SubmissionFile(object):
-    def __init__(self, submission_file_json):
+    __slots__ = ("url", "size", "timestamp", "_json_data")
+
+    def __init__(self, submission_file_json, keep_json=None):
+        if keep_json is None:
+            keep_json = settings.KEEP_RAW_JSON
         self.url = submission_file_json["fileurl"]
+        self.size = submission_file_json.get("filesize")
         self.timestamp = submission_file_json["timemodified"]
-        self._json_data = submission_file_json
+        self._json_data = submission_file_json if keep_json else None
 
     def __repr__(self):
         return "SubmissionFile(url={}, timestamp={})".format(self.url, self.timestamp)
 
 
 class Submission(object):
-    def __init__(self, user_id, grade_json, submission_json):
+    __slots__ = (
+        "user_id",
+        "grade",
+        "status",
+        "attemptnumber",
+        "gradingstatus",
+        "submission_files",
+        "timestamp",
+        "_submission_json",
+    )
+
+    def __init__(self, user_id, grade_json, submission_json, keep_json=None):
+        """
+        :param keep_json: Keep the source JSON of the submission, its grade and
+        files in the `_submission_json`/`_json_data` attributes for debugging,
+        by default KEEP_RAW_JSON.
+        """
+        if keep_json is None:
+            keep_json = settings.KEEP_RAW_JSON
         self.user_id = user_id
 
         if grade_json is not None:
-            self.grade = Grade(grade_json)
+            self.grade = Grade(grade_json, keep_json)
         else:
             self.grade = None
 
@@ -53,10 +83,10 @@ class Submission(object):
                 continue
             for filearea in plugin["fileareas"]:
                 for f in filearea["files"]:
-                    self.submission_files.append(SubmissionFile(f))
+                    self.submission_files.append(SubmissionFile(f, keep_json))
 
         # Useful for debugging
-        self._submission_json = submission_json
+        self._submission_json = submission_json if keep_json else None
 
     @property
     def released(self):
@@ -76,22 +106,14 @@ class Submission(object):
         Does this by checking the grading status and the grading timestamp vs the last modification timestamp
         # See https://github.com/moodle/moodle/blob/master/mod/assign/locallib.php#L2467
         """
-        return all(
-            [
-                self.timestamp is not None,
-                self.status == SubmissionStatus.SUBMITTED.value,
-                any(
-                    [
-                        self.grade is None,
-                        self.resubmitted,
-                        self.grade is not None
-                        and (
-                            self.grade.timestamp is None
-                            or (self.grade.grade is not None and self.grade.grade < 0)
-                        ),
-                    ]
-                ),
-            ]
+        if self.timestamp is None or self.status != SubmissionStatus.SUBMITTED.value:
+            return False
+
+        return (
+            self.grade is None
+            or self.grade.timestamp is None
+            or self.resubmitted
+            or self.grade.grade < 0
         )
 
     def __repr__(self):
@@ -106,22 +128,50 @@ class Submission(object):
         )
 
 
-def mod_assign_get_submissions(assignment_ids, **kwargs):
+def mod_assign_get_submissions(
+    assignment_ids, course_id=None, stream=None, executor=None, **kwargs
+):
     """
     Returns the submissions for the given assignments in a dict
     mapping assignment id to submissions
     {id: [..]}
+
+    The assignments are fetched in chunks, in `executor` if given, see
+    `fetch_in_chunks`.
+    If `stream` is set (by default STREAM_RESPONSES), every response is
+    decoded assignment by assignment while it is received.
     """
-    response = call_moodle_api(
-        "mod_assign_get_submissions", assignmentids=assignment_ids, **kwargs
+    if stream is None:
+        stream = settings.STREAM_RESPONSES
+
+    def fetch(assignment_ids_chunk):
+        if stream:
+            assignments = call_moodle_api_stream(
+                "mod_assign_get_submissions",
+                ("assignments", ITEM),
+                assignmentids=assignment_ids_chunk,
+                **kwargs,
+            )
+        else:
+            assignments = call_moodle_api(
+                "mod_assign_get_submissions",
+                assignmentids=assignment_ids_chunk,
+                **kwargs,
+            )["assignments"]
+
+        submissions = {}
+        for assign in assignments:
+            submissions[assign["assignmentid"]] = assign["submissions"]
+
+        return submissions
+
+    return fetch_in_chunks(
+        fetch,
+        assignment_ids,
+        f"mod_assign_get_submissions:{course_id}",
+        executor=executor,
     )
 
-    submissions = {}
-    for assign in response["assignments"]:
-        submissions[assign["assignmentid"]] = assign["submissions"]
-
-    return submissions
-
 
 def mod_assign_get_submission_status(assignment_id, user_id=None):
     """
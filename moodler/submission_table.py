@@ -0,0 +1,263 @@
+"""
+Columnar view of the submissions of several assignments, backed by NumPy.
+
+Instead of asking every `Submission` object whether it needs grading, the
+fields the statistics depend on are copied once into NumPy arrays, one per
+field, and the checks are computed for a whole column at a time.
+
+NumPy is optional, installed with the `columnar` extra (see the README).
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+from moodler.enums import SubmissionStatus
+from moodler.submission import SUBMISSION_RELEASED_STATUSES
+
+NAN = float("nan")
+
+
+def _encode(values):
+    """
+    Replaces every value by the index of its first appearance.
+
+    :return: The distinct values in order of appearance, and the array of the
+    codes of the values.
+    """
+    values = list(values)
+    distinct = list(dict.fromkeys(values))
+    codes = {value: code for code, value in enumerate(distinct)}
+    encoded = np.fromiter(
+        map(codes.__getitem__, values), dtype=np.intp, count=len(values)
+    )
+    return distinct, encoded
+
+
+class GroupBy(object):
+    """
+    Groups the rows of a table by one or more key columns, the groups being
+    in the order of their first row.
+    """
+
+    def __init__(self, *keys):
+        """
+        :param keys: Sequences aligned with the rows of the table, e.g. its
+        columns or the group name of every row.
+        """
+        values, codes = zip(
+            *(np.unique(np.asarray(key), return_inverse=True) for key in keys)
+        )
+        combined = np.ravel_multi_index(
+            [code.reshape(-1) for code in codes],
+            [max(len(key_values), 1) for key_values in values],
+        )
+        unique, first_rows, inverse = np.unique(
+            combined, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first_rows)
+        # Renumber the groups by their first row
+        ranks = np.empty_like(order)
+        ranks[order] = np.arange(len(order))
+        # The index in `keys` of the group of every row
+        self.groups = ranks[inverse.reshape(-1)]
+
+        key_codes = np.unravel_index(
+            unique[order], [max(len(key_values), 1) for key_values in values]
+        )
+        self.keys = list(
+            zip(
+                *(
+                    key_values[key_code].tolist()
+                    for key_values, key_code in zip(values, key_codes)
+                )
+            )
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return "GroupBy(groups={})".format(len(self))
+
+    def count(self, mask=None) -> np.ndarray:
+        """
+        Counts the rows of every group selected by `mask`, all of them if None.
+        """
+        return np.bincount(self.groups, weights=mask, minlength=len(self.keys)).astype(
+            np.int64
+        )
+
+    def last(self, values, mask) -> np.ndarray:
+        """
+        Finds the row with the greatest value of every group among the rows
+        selected by `mask`, the first such row on ties.
+
+        :return: The row of every group, -1 for groups without selected rows.
+        """
+        rows = np.flatnonzero(mask)
+        # Sorted by group, value and descending row, so the wanted row of
+        # every group is its last one
+        rows = rows[np.lexsort((-rows, values[rows], self.groups[rows]))]
+        groups = self.groups[rows]
+        is_last = np.append(groups[1:] != groups[:-1], True)[: len(rows)]
+
+        last = np.full(len(self.keys), -1, dtype=np.intp)
+        last[groups[is_last]] = rows[is_last]
+        return last
+
+
+class SubmissionTable(object):
+    """
+    The submissions of several assignments, stored as columns:
+    `assignment_ids`, `user_ids`, `statuses`, `timestamps`, `grades`,
+    `grade_timestamps` and `gradingstatuses`. Every column is built on first
+    access, so only the columns in use are copied.
+
+    Missing timestamps and grades are stored as NaN. Statuses and grading
+    statuses are stored as codes into `status_names` and
+    `gradingstatus_names`.
+    """
+
+    def __init__(self, assignments):
+        """
+        :param assignments: The assignments whose submissions make the rows,
+        in the order of the assignments and of their submissions.
+        """
+        assignment_ids = []
+        self._submissions = []
+        for assignment in assignments:
+            submissions = assignment.submissions
+            assignment_ids += [assignment.uid] * len(submissions)
+            self._submissions += submissions
+        self.assignment_ids = np.array(assignment_ids, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._submissions)
+
+    def __repr__(self):
+        return "SubmissionTable(rows={})".format(len(self))
+
+    @cached_property
+    def user_ids(self) -> np.ndarray:
+        return np.array(
+            [submission.user_id for submission in self._submissions], dtype=np.int64
+        )
+
+    @cached_property
+    def timestamps(self) -> np.ndarray:
+        # NaN rather than None keeps the conversion to an array fast
+        return np.array(
+            [
+                NAN if submission.timestamp is None else submission.timestamp
+                for submission in self._submissions
+            ],
+            dtype=np.float64,
+        )
+
+    @cached_property
+    def grades(self) -> np.ndarray:
+        return np.array(
+            [
+                NAN if submission.grade is None else submission.grade.grade
+                for submission in self._submissions
+            ],
+            dtype=np.float64,
+        )
+
+    @cached_property
+    def grade_timestamps(self) -> np.ndarray:
+        return np.array(
+            [
+                (
+                    NAN
+                    if submission.grade is None or submission.grade.timestamp is None
+                    else submission.grade.timestamp
+                )
+                for submission in self._submissions
+            ],
+            dtype=np.float64,
+        )
+
+    @cached_property
+    def _statuses(self):
+        return _encode(submission.status for submission in self._submissions)
+
+    @property
+    def status_names(self) -> list[str]:
+        return self._statuses[0]
+
+    @property
+    def statuses(self) -> np.ndarray:
+        return self._statuses[1]
+
+    @cached_property
+    def _gradingstatuses(self):
+        return _encode(submission.gradingstatus for submission in self._submissions)
+
+    @property
+    def gradingstatus_names(self) -> list[str]:
+        return self._gradingstatuses[0]
+
+    @property
+    def gradingstatuses(self) -> np.ndarray:
+        return self._gradingstatuses[1]
+
+    @staticmethod
+    def _isin(codes, names, wanted) -> np.ndarray:
+        return np.isin(
+            codes, [code for code, name in enumerate(names) if name in wanted]
+        )
+
+    def submitted(self) -> np.ndarray:
+        return self._isin(
+            self.statuses, self.status_names, (SubmissionStatus.SUBMITTED.value,)
+        )
+
+    def resubmitted(self) -> np.ndarray:
+        """
+        Mask of `Submission.resubmitted`: edited after the last grading.
+        """
+        return self.grade_timestamps <= self.timestamps
+
+    def released(self) -> np.ndarray:
+        """
+        Mask of `Submission.released`.
+        """
+        return self._isin(
+            self.gradingstatuses,
+            self.gradingstatus_names,
+            SUBMISSION_RELEASED_STATUSES,
+        )
+
+    def needs_grading(self) -> np.ndarray:
+        """
+        Mask of `Submission.needs_grading()`.
+        """
+        return (
+            self.submitted()
+            & ~np.isnan(self.timestamps)
+            & (
+                # Not graded, also covers a grade without a timestamp
+                np.isnan(self.grade_timestamps)
+                | self.resubmitted()
+                | (self.grades < 0)
+            )
+        )
+
+    def of_users(self, user_ids) -> np.ndarray:
+        """
+        Mask of the submissions of the given users.
+        """
+        return np.isin(self.user_ids, list(user_ids))
+
+    def map_users(self, mapping):
+        """
+        Looks up the user of every submission in `mapping`, once per user.
+
+        :return: The distinct values, and the array of the index of the value
+        of every row, to group the rows by.
+        """
+        users, inverse = np.unique(self.user_ids, return_inverse=True)
+        values, codes = _encode(mapping[user_id] for user_id in users.tolist())
+        return values, codes[inverse.reshape(-1)]
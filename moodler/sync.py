@@ -0,0 +1,185 @@
+"""
+Incremental sync of the submissions and grades of a course.
+
+Instead of downloading all the submissions and grades of every assignment on
+every run, a local snapshot is kept and only the records modified since the
+last sync are fetched, using the `since` parameter of
+`mod_assign_get_submissions` and `mod_assign_get_grades`.
+
+Changes that do not modify a submission nor its grade are not fetched by an
+incremental sync, e.g. a marker releasing grades through the marking
+workflow only changes `gradingstatus`. The released and unreleased counts
+may be stale until a full sync, see `reset()`.
+
+`CourseContext` uses the snapshot in SYNC_SNAPSHOT_PATH for the assignments
+when SYNC_SUBMISSIONS is set (`--sync` in the command line).
+"""
+
+import json
+import logging
+from pathlib import Path
+
+from moodler.assignment import (
+    Assignment,
+    build_assignments,
+    mod_assign_get_assignments,
+    mod_assign_get_grades,
+)
+from moodler.submission import mod_assign_get_submissions
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE_NAME_FORMAT = "course_{}.json"
+
+
+def _submission_key(submission_json):
+    # Team submissions have no user, only a group
+    return "{}:{}".format(submission_json["userid"], submission_json.get("groupid", 0))
+
+
+class AssignmentSync(object):
+    """
+    A local snapshot of the assignments, submissions and grades of a course.
+
+    Every `sync()` fetches only the submissions and grades modified since the
+    newest record in the snapshot and merges them in. If `snapshot_folder` is
+    given, the snapshot is saved there and reused by later runs.
+    """
+
+    def __init__(self, course_id, snapshot_folder=None):
+        self.course_id = course_id
+        self.snapshot_path = None
+        if snapshot_folder is not None:
+            file_name = SNAPSHOT_FILE_NAME_FORMAT.format(course_id)
+            self.snapshot_path = Path(snapshot_folder) / file_name
+
+        # The newest `timemodified` seen, sent as `since` on the next sync
+        self.since = 0
+        self.assignments: dict[int, dict] = {}
+        # Assignment id to the submissions by user and the grades by user
+        self.submissions: dict[int, dict[str, dict]] = {}
+        self.grades: dict[int, dict[int, dict]] = {}
+
+        if self.snapshot_path is not None and self.snapshot_path.exists():
+            self._load()
+
+    def __repr__(self):
+        return "AssignmentSync(course_id={}, since={}, assignments={})".format(
+            self.course_id, self.since, len(self.assignments)
+        )
+
+    def reset(self):
+        """
+        Forgets the snapshot, so the next sync fetches everything again.
+        """
+        self.since = 0
+        self.assignments = {}
+        self.submissions = {}
+        self.grades = {}
+        if self.snapshot_path is not None:
+            self.snapshot_path.unlink(missing_ok=True)
+
+    def sync(self, lazy=False, user_names=None) -> list[Assignment]:
+        """
+        Brings the snapshot up to date and returns its assignments.
+
+        :param lazy: Parse the submissions of the assignments on first access.
+        :param user_names: Dict mapping user ID to name, see `Assignment`.
+        """
+        assignment_jsons = mod_assign_get_assignments(self.course_id)
+        self.assignments = {assign["id"]: assign for assign in assignment_jsons}
+
+        # Forget assignments that were deleted from the course
+        for snapshot in (self.submissions, self.grades):
+            for assignment_id in set(snapshot).difference(self.assignments):
+                del snapshot[assignment_id]
+
+        known_ids = [uid for uid in self.assignments if uid in self.submissions]
+        new_ids = [uid for uid in self.assignments if uid not in self.submissions]
+
+        if known_ids:
+            logger.info(
+                "Fetching changes of %s assignments since %s",
+                len(known_ids),
+                self.since,
+            )
+            self._merge(
+                mod_assign_get_submissions(known_ids, self.course_id, since=self.since),
+                mod_assign_get_grades(known_ids, self.course_id, since=self.since),
+            )
+
+        # Records of new assignments may be older than the last sync
+        if new_ids:
+            logger.info("Fetching %s new assignments", len(new_ids))
+            for assignment_id in new_ids:
+                self.submissions[assignment_id] = {}
+                self.grades[assignment_id] = {}
+            self._merge(
+                mod_assign_get_submissions(new_ids, self.course_id),
+                mod_assign_get_grades(new_ids, self.course_id),
+            )
+
+        if self.snapshot_path is not None:
+            self._save()
+
+        return self.get_assignments(lazy, user_names)
+
+    def get_assignments(self, lazy=False, user_names=None) -> list[Assignment]:
+        """
+        Builds the Assignment objects from the snapshot, without fetching.
+        """
+        return build_assignments(
+            self.assignments.values(),
+            {uid: list(subs.values()) for uid, subs in self.submissions.items()},
+            {uid: list(grades.values()) for uid, grades in self.grades.items()},
+            lazy=lazy,
+            user_names=user_names,
+        )
+
+    def _merge(self, submissions, grades):
+        for assignment_id, submissions_json in submissions.items():
+            assignment_submissions = self.submissions.setdefault(assignment_id, {})
+            for submission in submissions_json:
+                assignment_submissions[_submission_key(submission)] = submission
+                self.since = max(self.since, submission["timemodified"])
+
+        for assignment_id, grades_json in grades.items():
+            assignment_grades = self.grades.setdefault(assignment_id, {})
+            for grade in grades_json:
+                current = assignment_grades.get(grade["userid"])
+                if current is None or current.get("attemptnumber", 0) <= grade.get(
+                    "attemptnumber", 0
+                ):
+                    assignment_grades[grade["userid"]] = grade
+                self.since = max(self.since, grade["timemodified"])
+
+    def _load(self):
+        snapshot = json.loads(self.snapshot_path.read_text())
+        self.since = snapshot["since"]
+        # JSON object keys are always strings
+        self.assignments = {
+            int(uid): assign for uid, assign in snapshot["assignments"].items()
+        }
+        self.submissions = {
+            int(uid): subs for uid, subs in snapshot["submissions"].items()
+        }
+        self.grades = {
+            int(uid): {int(user_id): grade for user_id, grade in grades.items()}
+            for uid, grades in snapshot["grades"].items()
+        }
+
+    def _save(self):
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.snapshot_path.with_suffix(".tmp")
+        temp_path.write_text(
+            json.dumps(
+                {
+                    "course_id": self.course_id,
+                    "since": self.since,
+                    "assignments": self.assignments,
+                    "submissions": self.submissions,
+                    "grades": self.grades,
+                }
+            )
+        )
+        temp_path.replace(self.snapshot_path)
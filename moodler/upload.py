@@ -7,7 +7,7 @@ from typing import Tuple
 import requests
 
 from moodler.assignment import Assignment
-from moodler.config import URL
+from moodler.config import settings
 from moodler.moodle_exception import MoodlerException
 
 logger = logging.getLogger(__name__)
@@ -42,7 +42,7 @@ def get_params_from_grading_page(
     """
     # Build the get request to the grading page.
     params = {"id": assignment_id, "action": "grading"}
-    response = session.get(URL + "/mod/assign/view.php", params=params)
+    response = session.get(settings.URL + "/mod/assign/view.php", params=params)
 
     grading_page_content = response.text
     contextid_match = re.search(
@@ -76,7 +76,7 @@ def get_params_from_upload_grading_worksheet_page(
         "action": "viewpluginpage",
         "pluginaction": "uploadgrades",
     }
-    response = session.get(URL + "/mod/assign/view.php", params=params)
+    response = session.get(settings.URL + "/mod/assign/view.php", params=params)
 
     upload_grading_worksheet_page_content = response.text
     gradesfile_match = re.search(
@@ -117,7 +117,9 @@ def upload_file_to_moodle(
 
     params = {"action": "upload"}
     session.post(
-        URL + "/repository/repository_ajax.php", params=params, files=multipart_params
+        settings.URL + "/repository/repository_ajax.php",
+        params=params,
+        files=multipart_params,
     )
 
 
@@ -143,7 +145,7 @@ def get_params_from_submitting_uploaded_grading_worksheet(
         "separator": "comma",
         "submitbutton": "Upload+grading+worksheet",
     }
-    response = session.post(URL + "/mod/assign/view.php", data=data)
+    response = session.post(settings.URL + "/mod/assign/view.php", data=data)
 
     confirmation_page_content = response.text
     importid_match = re.search(
@@ -196,7 +198,7 @@ def confirm_grading_with_uploaded_worksheet(
         "mform_isexpanded_id_importgrades": "1",
         "submitbutton": "Confirm",
     }
-    response = session.post(URL + "/mod/assign/view.php", data=data)
+    response = session.post(settings.URL + "/mod/assign/view.php", data=data)
     result_page_content = response.text
     success_match = re.search(
         r"Updated [^\d]*(\d+)[^\d]* grades and .* feedback instances.",
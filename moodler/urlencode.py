@@ -1,18 +1,37 @@
+import functools
+import re
 import urllib.parse
 
+# Strings made only of these characters are left as is by `quote_plus`
+_SAFE_VALUE = re.compile(r"[A-Za-z0-9_.~-]*\Z")
+
 
 def encode(s):
     """
     Encode string.
     """
-    return urllib.parse.quote_plus(str(s))
+    # Integers and most keys and values need no quoting, skip it for them
+    if type(s) is int:
+        return str(s)
+    s = str(s)
+    if _SAFE_VALUE.match(s):
+        return s
+    return urllib.parse.quote_plus(s)
+
+
+@functools.lru_cache(maxsize=1024)
+def encode_key(key):
+    """
+    Encode a key, the same few keys are encoded over and over.
+    """
+    return encode(key)
 
 
 def get_prefix(path, key):
     """
     Get current prefix for the query string.
     """
-    return f"{path}[{encode(key)}]" if path else encode(key)
+    return f"{path}[{encode_key(key)}]" if path else encode_key(key)
 
 
 def iterate(obj):
@@ -21,14 +40,26 @@ def iterate(obj):
     return enumerate(obj)
 
 
-def urlencode(input, path="", delimiter="&"):
-    def build(input, path):
-        str_list = []
-        for key, value in iterate(input):
+def urlencode(input, path="", delimiter="&", as_bytes=False):
+    """
+    Encodes nested dicts and lists in the bracketed format PHP expects,
+    e.g. `grades[0][userid]=1`. None values are left out.
+
+    :param as_bytes: Return ASCII bytes instead of a string.
+    """
+    str_list = []
+    # The containers being encoded, with their prefix and remaining items
+    stack = [(path, iter(iterate(input)))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, value in items:
             if isinstance(value, (list, dict)):
-                str_list.extend(build(value, get_prefix(path, key)))
-            elif value is not None:
-                str_list.append(f"{get_prefix(path, key)}={encode(value)}")
-        return str_list
+                stack.append((get_prefix(prefix, key), iter(iterate(value))))
+                break
+            if value is not None:
+                str_list.append(f"{get_prefix(prefix, key)}={encode(value)}")
+        else:
+            stack.pop()
 
-    return delimiter.join(build(input, path))
+    encoded = delimiter.join(str_list)
+    return encoded.encode("ascii") if as_bytes else encoded
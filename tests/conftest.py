@@ -0,0 +1,80 @@
+import pytest
+import requests
+
+from moodler.download import Downloader
+
+
+class FakeResponse(object):
+    # Has no `content`, so reading the whole body at once fails
+    def __init__(self, url, status_code=200, chunks=()):
+        self.url = url
+        self.status_code = status_code
+        self.chunks = chunks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+class FakeSession(object):
+    # Answers the streamed requests with the given responses, in order
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        assert kwargs["stream"]
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+    post = get
+
+
+@pytest.fixture
+def fake_response():
+    return FakeResponse
+
+
+@pytest.fixture
+def fake_session():
+    return FakeSession
+
+
+@pytest.fixture
+def export():
+    """
+    Returns a function downloading the given (url, size, timestamp) files to
+    a folder with one worker and no retries, saving the manifest and the
+    store it is given afterwards.
+    """
+
+    def export(folder, session, files, manifest=None, store=None, prune=False):
+        folder.mkdir(parents=True, exist_ok=True)
+        downloader = Downloader(
+            max_workers=1, retries=0, session=session, manifest=manifest, store=store
+        )
+        for url, size, timestamp in files:
+            downloader.add(url, folder, size, timestamp)
+        report = downloader.run()
+
+        if manifest is not None:
+            if prune:
+                manifest.prune()
+            manifest.save()
+        if store is not None:
+            store.save()
+        return report
+
+    return export
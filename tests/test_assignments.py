@@ -1,4 +1,14 @@
-from moodler.assignment import Assignment
+import threading
+import time
+
+from moodler.assignment import (
+    Assignment,
+    build_assignments,
+    get_assignments,
+    get_assignments_by_names,
+)
+from moodler.chunking import ChunkSizes
+from moodler.config import settings
 from moodler.submission import Submission, SubmissionStatus
 
 ASSIGNMENT_JSON = {
@@ -329,3 +339,148 @@ def test_submission_ungraded():
     assert submission.released
     assert submission.resubmitted
     assert submission.needs_grading()
+
+
+def test_assignment_uses_latest_attempt_grade():
+    grades_json = [
+        {**GRADES_JSON[1], "attemptnumber": 1, "grade": "80.00000"},
+        GRADES_JSON[1],
+    ]
+    assignment = Assignment(ASSIGNMENT_JSON, [SUBMISSIONS_JSON[1]], grades_json)
+
+    assert assignment.submissions[0].grade.grade == 80.0
+
+
+def test_only_requested_assignments_are_fetched(mocker):
+    other_assignment_json = {**ASSIGNMENT_JSON, "id": 2, "cmid": 2, "name": "Other"}
+    mocker.patch(
+        "moodler.assignment.mod_assign_get_assignments",
+        return_value=[ASSIGNMENT_JSON, other_assignment_json],
+    )
+    get_grades = mocker.patch(
+        "moodler.assignment.mod_assign_get_grades", return_value={2: []}
+    )
+    get_submissions = mocker.patch(
+        "moodler.assignment.mod_assign_get_submissions", return_value={2: []}
+    )
+
+    assignments = get_assignments_by_names(1, ["Other", "Missing"])
+
+    assert [assignment.uid for assignment in assignments] == [2]
+    get_grades.assert_called_once_with([2], 1, executor=mocker.ANY)
+    get_submissions.assert_called_once_with([2], 1, executor=mocker.ANY)
+
+
+def test_grades_and_submissions_are_fetched_together(mocker):
+    # Both fetchers have to be in flight together to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_grades(assignment_ids, course_id, executor):
+        barrier.wait()
+        return {ASSIGNMENT_JSON["id"]: GRADES_JSON}
+
+    def fake_submissions(assignment_ids, course_id, executor):
+        barrier.wait()
+        return {ASSIGNMENT_JSON["id"]: SUBMISSIONS_JSON}
+
+    mocker.patch(
+        "moodler.assignment.mod_assign_get_assignments", return_value=[ASSIGNMENT_JSON]
+    )
+    mocker.patch("moodler.assignment.mod_assign_get_grades", fake_grades)
+    mocker.patch("moodler.assignment.mod_assign_get_submissions", fake_submissions)
+
+    (assignment,) = get_assignments(1)
+
+    expected = Assignment(ASSIGNMENT_JSON, SUBMISSIONS_JSON, GRADES_JSON)
+    assert repr(assignment.submissions) == repr(expected.submissions)
+
+
+def test_grades_and_submissions_share_the_pool_size(mocker, monkeypatch):
+    monkeypatch.setattr(settings, "POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "ASSIGNMENT_CHUNK_SIZE", 1)
+    monkeypatch.setattr(settings, "STREAM_RESPONSES", False)
+    mocker.patch("moodler.chunking._chunk_sizes", ChunkSizes(None))
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+
+    def fake_call(moodle_function, assignmentids):
+        with lock:
+            in_flight.append(moodle_function)
+            max_in_flight.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(moodle_function)
+        key = "grades" if "mod_assign_get_grades" == moodle_function else "submissions"
+        return {
+            "assignments": [
+                {"assignmentid": assignment_id, key: []}
+                for assignment_id in assignmentids
+            ]
+        }
+
+    mocker.patch(
+        "moodler.assignment.mod_assign_get_assignments",
+        return_value=[{**ASSIGNMENT_JSON, "id": uid} for uid in range(1, 9)],
+    )
+    mocker.patch("moodler.assignment.call_moodle_api", fake_call)
+    mocker.patch("moodler.submission.call_moodle_api", fake_call)
+
+    assignments = get_assignments(1)
+
+    assert [assignment.uid for assignment in assignments] == list(range(1, 9))
+    assert max(max_in_flight) == 2
+
+
+def test_lazy_assignment_parses_submissions_on_access(mocker):
+    submission_init = mocker.spy(Submission, "__init__")
+    assignment = Assignment(ASSIGNMENT_JSON, SUBMISSIONS_JSON, GRADES_JSON, lazy=True)
+
+    assert assignment.attachments == [ASSIGNMENT_JSON["introattachments"][0]["fileurl"]]
+    assert submission_init.call_count == 0
+
+    # Iterating does not keep the parsed submissions
+    assert len(list(assignment.iter_submissions())) == 3
+    assert len(list(assignment.iter_submissions())) == 3
+    assert submission_init.call_count == 6
+
+    assert len(assignment.submissions) == 3
+    assert len(assignment.ungraded()) == 1
+    assert submission_init.call_count == 9
+
+
+def test_submission_raw_json_is_opt_in():
+    submission = Submission(32, GRADES_JSON[1], SUBMISSIONS_JSON[1])
+    assert not hasattr(submission, "__dict__")
+    assert submission._submission_json is None
+    assert submission.grade._json_data is None
+
+    submission = Submission(32, GRADES_JSON[1], SUBMISSIONS_JSON[1], keep_json=True)
+    assert submission._submission_json is SUBMISSIONS_JSON[1]
+    assert submission.submission_files[0]._json_data is not None
+
+
+def test_missing_grade_names_are_resolved_together(mocker):
+    # A blank grade raises MissingGrade
+    grades_json = [{**grade, "grade": ""} for grade in GRADES_JSON]
+    other_assignment_json = {**ASSIGNMENT_JSON, "id": 2, "cmid": 2, "name": "Other"}
+    call_moodle_api = mocker.patch(
+        "moodler.students.call_moodle_api",
+        return_value=[{"id": 33, "firstname": "Jane", "lastname": "Doe"}],
+    )
+
+    assignments = build_assignments(
+        [ASSIGNMENT_JSON, other_assignment_json],
+        {1: SUBMISSIONS_JSON, 2: SUBMISSIONS_JSON},
+        {1: grades_json, 2: grades_json},
+        user_names={1: "John Doe", 32: "Jack Doe"},
+    )
+
+    assert [assignment.missing_grades for assignment in assignments] == [
+        [1, 32, 33],
+        [1, 32, 33],
+    ]
+    # Only the user without a known name is requested, once for both
+    call_moodle_api.assert_called_once_with(
+        "core_user_get_users_by_field", field="id", values=[33]
+    )
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from moodler.async_moodle_api import AsyncMoodleClient
+
+ASSIGNMENT_JSONS = [
+    {"id": 1, "cmid": 11, "name": "Assignment 1"},
+    {"id": 2, "cmid": 12, "name": "Assignment 2"},
+]
+SUBMISSIONS = {
+    1: [
+        {
+            "userid": 5,
+            "status": "submitted",
+            "attemptnumber": 0,
+            "gradingstatus": "notgraded",
+            "timemodified": 1718254280,
+            "plugins": [],
+        }
+    ]
+}
+
+
+def test_get_assignments_by_field_fetches_concurrently(mocker):
+    # Both fetchers have to be in flight together to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_grades(assignment_ids, course_id):
+        assert assignment_ids == [1]
+        barrier.wait()
+        return {}
+
+    def fake_submissions(assignment_ids, course_id):
+        barrier.wait()
+        return SUBMISSIONS
+
+    mocker.patch(
+        "moodler.async_moodle_api.mod_assign_get_assignments",
+        return_value=ASSIGNMENT_JSONS,
+    )
+    mocker.patch("moodler.async_moodle_api.mod_assign_get_grades", fake_grades)
+    mocker.patch(
+        "moodler.async_moodle_api.mod_assign_get_submissions", fake_submissions
+    )
+
+    async def fetch():
+        async with AsyncMoodleClient(max_concurrency=2) as client:
+            return await client.get_assignments_by_field(
+                1, field="cmid", assignments_fields=[11]
+            )
+
+    assignments = asyncio.run(fetch())
+
+    assert [assignment.uid for assignment in assignments] == [1]
+    assert assignments[0].submissions[0].user_id == 5
+
+
+def test_get_all_glossary_entries_pages(mocker):
+    def fake_search(glossary_id, query, _from=0, limit=1000):
+        return {"count": 5, "entries": list(range(_from, min(_from + 2, 5)))}
+
+    mocker.patch(
+        "moodler.async_moodle_api.mod_glossary_get_entries_by_search", fake_search
+    )
+
+    async def fetch():
+        async with AsyncMoodleClient() as client:
+            return await client.get_all_glossary_entries(1)
+
+    assert asyncio.run(fetch()) == [0, 1, 2, 3, 4]
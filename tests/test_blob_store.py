@@ -0,0 +1,64 @@
+import pytest
+
+from moodler.blob_store import BlobStore
+
+URL = "http://moodle/webservice/pluginfile.php/{}/mod_resource/content/0/lecture.pdf"
+
+
+def stored_files(store):
+    return [path for path in (store.root / "objects").rglob("*") if path.is_file()]
+
+
+def test_course_copies_are_linked_without_downloading(
+    tmp_path, fake_session, fake_response, export
+):
+    store = BlobStore(tmp_path / "store", "hardlink")
+    session = fake_session(fake_response(URL.format(1), chunks=[b"%PDF"]))
+    # The copy in the same export is linked once the first one was downloaded
+    report = export(
+        tmp_path / "2025",
+        session,
+        [(URL.format(1), 4, 100), (URL.format(2), 4, 100)],
+        store=store,
+    )
+    assert (report.files, report.linked) == (1, 1)
+
+    # A new store instance reads the hints saved by the previous one
+    store = BlobStore(tmp_path / "store", "hardlink")
+    report = export(
+        tmp_path / "2026", fake_session(), [(URL.format(3), 4, 100)], store=store
+    )
+    assert (report.files, report.linked) == (0, 1)
+
+    [blob] = stored_files(store)
+    for folder in ("2025", "2026"):
+        exported = tmp_path / folder / "lecture.pdf"
+        assert exported.read_bytes() == b"%PDF"
+        assert exported.stat().st_ino == blob.stat().st_ino
+
+
+@pytest.mark.parametrize("link_mode", ["reflink", "copy"])
+def test_same_content_is_stored_once(
+    tmp_path, link_mode, fake_session, fake_response, export
+):
+    store = BlobStore(tmp_path / "store", link_mode)
+    session = fake_session(
+        fake_response(URL.format(1), chunks=[b"%PDF"]),
+        fake_response(URL.format(2), chunks=[b"%PDF"]),
+    )
+
+    # Different timestamps, so the second file is downloaded as well
+    report = export(
+        tmp_path / "export",
+        session,
+        [(URL.format(1), 4, 100), (URL.format(2).replace("lecture", "copy"), 4, 200)],
+        store=store,
+    )
+
+    assert report.files == 2
+    assert len(stored_files(store)) == 1
+    assert (tmp_path / "export" / "copy.pdf").read_bytes() == b"%PDF"
+    assert sorted(path.name for path in (tmp_path / "export").iterdir()) == [
+        "copy.pdf",
+        "lecture.pdf",
+    ]
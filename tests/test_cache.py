@@ -0,0 +1,121 @@
+import zlib
+from unittest.mock import MagicMock
+
+from moodler.cache import (
+    CACHEABLE_FUNCTIONS,
+    MISSING,
+    VOLATILE_FUNCTIONS,
+    DiskCache,
+    ResponseCache,
+)
+from moodler.moodle_api import MoodleClient
+
+
+def test_hit_and_miss():
+    cache = ResponseCache(ttl=60, max_size=10)
+    kwargs = {"courseid": 1, "options": [{"name": "a", "value": 1}]}
+
+    assert cache.get("core_enrol_get_enrolled_users", kwargs) is MISSING
+    cache.put("core_enrol_get_enrolled_users", kwargs, [{"id": 1}])
+
+    # The order of the kwargs does not matter
+    same_kwargs = {"options": [{"name": "a", "value": 1}], "courseid": 1}
+    assert cache.get("core_enrol_get_enrolled_users", same_kwargs) == [{"id": 1}]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_only_allowed_functions_are_cached():
+    cache = ResponseCache()
+    cache.put("mod_assign_save_grades", {"assignmentid": 1}, None)
+
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_dropped():
+    cache = ResponseCache(ttl=-1)
+    cache.put("core_course_get_courses", {}, [])
+
+    assert cache.get("core_course_get_courses", {}) is MISSING
+    assert len(cache) == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_size=2)
+    cache.put("core_course_get_contents", {"courseid": 1}, 1)
+    cache.put("core_course_get_contents", {"courseid": 2}, 2)
+    cache.get("core_course_get_contents", {"courseid": 1})
+    cache.put("core_course_get_contents", {"courseid": 3}, 3)
+
+    assert cache.get("core_course_get_contents", {"courseid": 1}) == 1
+    assert cache.get("core_course_get_contents", {"courseid": 2}) is MISSING
+    assert cache.get("core_course_get_contents", {"courseid": 3}) == 3
+
+
+def test_submissions_are_not_cached_by_default():
+    cache = ResponseCache()
+    cache.put("mod_assign_get_submissions", {"assignmentids": [1]}, "1")
+
+    assert cache.get("mod_assign_get_submissions", {"assignmentids": [1]}) is MISSING
+
+
+def test_mutations_invalidate_their_assignment():
+    cache = ResponseCache(functions=CACHEABLE_FUNCTIONS | VOLATILE_FUNCTIONS)
+    cache.put("mod_assign_get_submissions", {"assignmentids": [1, 2]}, "1, 2")
+    cache.put("mod_assign_get_submissions", {"assignmentids": [3]}, "3")
+    cache.put("mod_assign_get_assignments", {"courseids": [1]}, "course")
+
+    cache.invalidate("mod_assign_lock_submissions", {"assignmentid": 2})
+
+    assert cache.get("mod_assign_get_submissions", {"assignmentids": [1, 2]}) is MISSING
+    assert cache.get("mod_assign_get_submissions", {"assignmentids": [3]}) == "3"
+    assert cache.get("mod_assign_get_assignments", {"courseids": [1]}) == "course"
+
+
+def test_client_uses_cache():
+    response = MagicMock(status_code=200)
+    response.json.return_value = []
+    session = MagicMock()
+    session.post.return_value = response
+    client = MoodleClient(url="http://moodle", session=session, cache=ResponseCache())
+
+    client.call("core_course_get_contents", courseid=1)
+    client.call("core_course_get_contents", courseid=1)
+    client.call("core_course_get_contents", courseid=2)
+
+    assert session.post.call_count == 2
+    assert client.cache.hits == 1
+
+
+def test_disk_cache_persists_between_instances(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = DiskCache(path, "http://moodle")
+    cache.put("core_course_get_contents", {"courseid": 1}, [{"name": "Section"}])
+    cache.put("mod_assign_get_grades", {"assignmentids": [1]}, {"assignments": []})
+    cache.close()
+
+    cache = DiskCache(path, "http://moodle")
+    assert cache.get("core_course_get_contents", {"courseid": 1}) == [
+        {"name": "Section"}
+    ]
+    # Grades change too often to be kept between runs
+    assert cache.get("mod_assign_get_grades", {"assignmentids": [1]}) is MISSING
+
+    # Another server does not share the responses
+    other_cache = DiskCache(path, "http://other-moodle")
+    assert other_cache.get("core_course_get_contents", {"courseid": 1}) is MISSING
+
+    cache.refresh = True
+    assert cache.get("core_course_get_contents", {"courseid": 1}) is MISSING
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    # Room for two of the compressed responses
+    max_size = 2 * len(zlib.compress(b"0"))
+    cache = DiskCache(tmp_path / "cache.sqlite3", "http://moodle", max_size=max_size)
+    for course_id in range(3):
+        cache.put("core_course_get_contents", {"courseid": course_id}, course_id)
+        cache.get("core_course_get_contents", {"courseid": 0})
+
+    assert cache.get("core_course_get_contents", {"courseid": 0}) == 0
+    assert cache.get("core_course_get_contents", {"courseid": 1}) is MISSING
+    assert cache.get("core_course_get_contents", {"courseid": 2}) == 2
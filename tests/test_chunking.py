@@ -0,0 +1,45 @@
+import pytest
+
+from moodler.chunking import ChunkSizes, fetch_in_chunks
+from moodler.moodle_api import MoodleAPITimeoutException
+
+
+@pytest.fixture
+def chunk_sizes(mocker, tmp_path):
+    chunk_sizes = ChunkSizes(tmp_path / "chunk_sizes.json")
+    mocker.patch("moodler.chunking._chunk_sizes", chunk_sizes)
+    return chunk_sizes
+
+
+def test_timeouts_are_bisected_and_remembered(chunk_sizes, tmp_path):
+    requested_chunks = []
+
+    def fetch(ids):
+        requested_chunks.append(ids)
+        if len(ids) > 3:
+            raise MoodleAPITimeoutException()
+        return {uid: [uid] for uid in ids}
+
+    results = fetch_in_chunks(fetch, range(20), "mod_assign_get_submissions:1")
+
+    assert results == {uid: [uid] for uid in range(20)}
+    assert max(len(chunk) for chunk in requested_chunks) == 10
+    assert (
+        ChunkSizes(tmp_path / "chunk_sizes.json").get(
+            "mod_assign_get_submissions:1", None
+        )
+        == 3
+    )
+
+    # The next fetch starts with the chunk size that worked
+    requested_chunks.clear()
+    fetch_in_chunks(fetch, range(20), "mod_assign_get_submissions:1")
+    assert max(len(chunk) for chunk in requested_chunks) == 3
+
+
+def test_single_id_timeout_is_raised(chunk_sizes):
+    def fetch(ids):
+        raise MoodleAPITimeoutException()
+
+    with pytest.raises(MoodleAPITimeoutException):
+        fetch_in_chunks(fetch, [1, 2], "mod_assign_get_grades:1")
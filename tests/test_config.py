@@ -0,0 +1,22 @@
+import pytest
+
+from moodler import config
+from moodler.config import Settings
+
+
+def test_settings_are_read_on_first_access(monkeypatch):
+    settings = Settings()
+    monkeypatch.setenv("BATCH_SIZE", "7")
+
+    assert settings.BATCH_SIZE == 7
+
+    monkeypatch.setenv("BATCH_SIZE", "8")
+    assert settings.BATCH_SIZE == 7
+
+
+def test_module_attributes_resolve_settings():
+    assert config.POOL_SIZE == config.settings.POOL_SIZE
+    assert config.LOGIN_PAGE == "login/index.php"
+
+    with pytest.raises(AttributeError):
+        config.env
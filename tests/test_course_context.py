@@ -0,0 +1,58 @@
+from moodler.config import settings
+from moodler.course_context import CourseContext
+from moodler.moodle import status_report
+from moodler.students import STUDENT_FIELDS
+
+ENROLLED_USERS = [
+    {"id": 1, "fullname": "Lee Tan", "roles": [{"shortname": "student"}]},
+    {"id": 2, "fullname": "Noa Teacher", "roles": [{"shortname": "teacher"}]},
+]
+
+
+def test_datasets_are_fetched_once(mocker):
+    get_enrolled_users = mocker.patch(
+        "moodler.students.core_enrol_get_enrolled_users",
+        return_value=ENROLLED_USERS,
+    )
+    get_assignments_by_field = mocker.patch(
+        "moodler.assignment.get_assignments_by_field", return_value=[]
+    )
+    get_course_groups = mocker.patch(
+        "moodler.groups.get_course_groups", return_value=[]
+    )
+    mocker.patch("moodler.sections.core_course_get_contents", return_value=[])
+
+    context = CourseContext(1).prefetch()
+
+    assert context.students == {1: "Lee Tan"}
+    assert context.user_group_map == {}
+    assert status_report(1, context) == []
+    assert status_report(1, context) == []
+
+    get_enrolled_users.assert_called_once_with(1, STUDENT_FIELDS)
+    get_assignments_by_field.assert_called_once()
+    get_course_groups.assert_called_once_with(1)
+
+
+def test_assignments_come_from_the_snapshot_when_syncing(mocker, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "SYNC_SUBMISSIONS", True)
+    monkeypatch.setattr(settings, "SYNC_SNAPSHOT_PATH", str(tmp_path))
+    mocker.patch(
+        "moodler.students.core_enrol_get_enrolled_users",
+        return_value=ENROLLED_USERS,
+    )
+    get_assignments_by_field = mocker.patch(
+        "moodler.assignment.get_assignments_by_field"
+    )
+    mocker.patch(
+        "moodler.sync.mod_assign_get_assignments",
+        return_value=[{"id": 1, "cmid": 11, "name": "Assignment 1"}],
+    )
+    mocker.patch("moodler.sync.mod_assign_get_submissions", return_value={1: []})
+    mocker.patch("moodler.sync.mod_assign_get_grades", return_value={})
+
+    assignments = CourseContext(1).assignments
+
+    assert [assignment.name for assignment in assignments] == ["Assignment 1"]
+    assert (tmp_path / "course_1.json").exists()
+    get_assignments_by_field.assert_not_called()
@@ -0,0 +1,136 @@
+import pytest
+import requests
+
+from moodler.download import (
+    Downloader,
+    DownloadException,
+    InvalidReportDownload,
+    download_all_submissions,
+    download_course_grades_report,
+    download_file,
+    download_submission,
+)
+
+REPORT_PAGE = """
+<input name="sesskey" type="hidden" value="abc123">
+<label>
+    <input type="hidden" name="itemids[7]" value="0">
+    Exercise 1
+</label>
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(mocker):
+    mocker.patch("moodler.download.RETRY_DELAY", 0)
+
+
+def test_download_file_retries_and_writes_atomically(
+    tmp_path, fake_session, fake_response
+):
+    url = "http://moodle/webservice/pluginfile.php/1/ex1.py?forcedownload=1"
+    session = fake_session(
+        fake_response(url, chunks=[b"partial", requests.ConnectionError()]),
+        fake_response(url, status_code=503),
+        fake_response(url, chunks=[b"print(", b"1)"]),
+    )
+
+    assert download_file(url, tmp_path, session, retries=2).size == 8
+
+    assert (tmp_path / "ex1.py").read_bytes() == b"print(1)"
+    # The partial files of the failed attempts were removed
+    assert [path.name for path in tmp_path.iterdir()] == ["ex1.py"]
+    assert all("token=" in url for url in session.urls)
+
+
+def test_download_file_does_not_retry_client_errors(
+    tmp_path, fake_session, fake_response
+):
+    url = "http://moodle/webservice/pluginfile.php/1/missing.py"
+    session = fake_session(fake_response(url, status_code=404))
+
+    with pytest.raises(DownloadException):
+        download_file(url, tmp_path, session, retries=3)
+
+    assert len(session.urls) == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_downloader_reports_downloaded_and_failed_files(
+    tmp_path, fake_session, fake_response
+):
+    session = fake_session(
+        fake_response("a", chunks=[b"a" * 10]),
+        fake_response("b", status_code=404),
+    )
+    downloader = Downloader(max_workers=1, retries=0, session=session)
+    downloader.add("http://moodle/pluginfile.php/a.py", tmp_path)
+    downloader.add("http://moodle/pluginfile.php/b.py", tmp_path)
+
+    report = downloader.run()
+
+    assert (report.files, report.size) == (1, 10)
+    assert report.failed == ["http://moodle/pluginfile.php/b.py"]
+    assert len(downloader) == 0
+    assert (tmp_path / "a.py").read_bytes() == b"a" * 10
+
+
+def test_download_all_submissions_streams_to_file(
+    tmp_path, fake_session, fake_response
+):
+    session = fake_session(fake_response("zip", chunks=[b"PK", b"\x03\x04"]))
+
+    path = download_all_submissions(3, "Exercise 1", tmp_path, session)
+
+    assert path == tmp_path / "Exercise 1.zip"
+    assert path.read_bytes() == b"PK\x03\x04"
+
+
+def test_download_course_grades_report_checks_prefix(
+    tmp_path, mocker, fake_session, fake_response
+):
+    mocker.patch("moodler.download.REPORT_VALIDATION_SIZE", 16)
+    page = mocker.Mock(content=REPORT_PAGE.encode())
+    session = fake_session(
+        fake_response("report", chunks=[b"id,grade\n", b"1,90\n2,80\n", b"3,70\n"])
+    )
+    session.get = lambda url, params: page
+
+    path = download_course_grades_report(1, "Course", False, tmp_path, session)
+
+    assert path.read_bytes() == b"id,grade\n1,90\n2,80\n3,70\n"
+
+    session = fake_session(fake_response("report", chunks=[b"<b>Warning</b> ..."]))
+    session.get = lambda url, params: page
+    with pytest.raises(InvalidReportDownload):
+        download_course_grades_report(2, "Invalid", False, tmp_path, session)
+    assert not (tmp_path / "Invalid Report.csv").exists()
+
+
+def test_download_submission_queues_in_shared_downloader(
+    tmp_path, mocker, fake_session, fake_response
+):
+    def submission(url):
+        return mocker.Mock(
+            submission_files=[mocker.Mock(url=url, size=None, timestamp=None)]
+        )
+
+    session = fake_session(
+        fake_response("a", chunks=[b"a"]), fake_response("b", chunks=[b"b"])
+    )
+    downloader = Downloader(max_workers=1, retries=0, session=session)
+    download_submission(
+        "Ex1",
+        "Alice",
+        submission("http://moodle/a.py"),
+        tmp_path,
+        downloader=downloader,
+    )
+    download_submission(
+        "Ex1", "Bob", submission("http://moodle/b.py"), tmp_path, downloader=downloader
+    )
+
+    assert len(downloader) == 2
+    assert downloader.run().files == 2
+    assert (tmp_path / "Ex1" / "Alice" / "a.py").read_bytes() == b"a"
+    assert (tmp_path / "Ex1" / "Bob" / "b.py").read_bytes() == b"b"
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from moodler.json_stream import ITEM, JSONStreamError, iter_json_items
+
+DOCUMENT = {
+    "assignments": [
+        {
+            "assignmentid": assignment_id,
+            "submissions": [
+                {
+                    "userid": user_id,
+                    "status": 'sub"mit\\ted, [é]',
+                    "timemodified": 1.5e3,
+                    "grade": None,
+                    "locked": True,
+                    "plugins": [{"fileareas": []}],
+                }
+                for user_id in range(3)
+            ],
+        }
+        for assignment_id in range(5)
+    ],
+    "warnings": [{"item": "assignment", "message": "No access"}],
+}
+
+
+def split(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", (1, 2, 7, 100, 100000))
+def test_items_and_members_in_pieces(size):
+    members = {}
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+
+    items = list(iter_json_items(split(text, size), ("assignments", ITEM), members))
+
+    assert items == DOCUMENT["assignments"]
+    assert members == {"warnings": DOCUMENT["warnings"]}
+
+
+def test_nested_path_and_top_level_list():
+    text = json.dumps(DOCUMENT)
+    path = ("assignments", ITEM, "submissions", ITEM)
+    assert len(list(iter_json_items(split(text, 3), path))) == 15
+
+    values = [1, {"a": [2, 3]}, "x", None, -2.5e-3]
+    assert list(iter_json_items(split(json.dumps(values), 2), (ITEM,))) == values
+
+
+def test_truncated_document():
+    text = json.dumps(DOCUMENT)
+
+    with pytest.raises(JSONStreamError):
+        list(iter_json_items(split(text[:-10], 5), ("assignments", ITEM)))
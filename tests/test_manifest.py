@@ -0,0 +1,92 @@
+import hashlib
+
+from moodler.manifest import ExportManifest
+
+URL = "http://moodle/webservice/pluginfile.php/1/lecture.pdf"
+OLD_URL = "http://moodle/webservice/pluginfile.php/1/old.pdf"
+
+
+def test_export_skips_unchanged_files(tmp_path, fake_session, fake_response, export):
+    session = fake_session(
+        fake_response(URL, chunks=[b"v1"]), fake_response(OLD_URL, chunks=[b"old"])
+    )
+    export(
+        tmp_path,
+        session,
+        [(URL, 2, 100), (OLD_URL, 3, 100)],
+        manifest=ExportManifest.load(tmp_path),
+    )
+
+    entry = ExportManifest.load(tmp_path).entries["lecture.pdf"]
+    assert entry == {
+        "url": URL,
+        "size": 2,
+        "timestamp": 100,
+        "sha256": hashlib.sha256(b"v1").hexdigest(),
+    }
+
+    # Unchanged, nothing is downloaded
+    report = export(
+        tmp_path,
+        fake_session(),
+        [(URL, 2, 100), (OLD_URL, 3, 100)],
+        manifest=ExportManifest.load(tmp_path),
+    )
+    assert (report.files, report.unchanged) == (0, 2)
+
+    # A newer timestamp downloads the file again
+    session = fake_session(fake_response(URL, chunks=[b"v2"]))
+    report = export(
+        tmp_path,
+        session,
+        [(URL, 2, 200), (OLD_URL, 3, 100)],
+        manifest=ExportManifest.load(tmp_path),
+    )
+    assert (report.files, report.unchanged) == (1, 1)
+    assert (tmp_path / "lecture.pdf").read_bytes() == b"v2"
+
+
+def test_export_downloads_deleted_files_again(
+    tmp_path, fake_session, fake_response, export
+):
+    export(
+        tmp_path,
+        fake_session(fake_response(URL, chunks=[b"v1"])),
+        [(URL, 2, 100)],
+        manifest=ExportManifest.load(tmp_path),
+    )
+    (tmp_path / "lecture.pdf").unlink()
+
+    session = fake_session(fake_response(URL, chunks=[b"v1"]))
+    report = export(
+        tmp_path, session, [(URL, 2, 100)], manifest=ExportManifest.load(tmp_path)
+    )
+    assert report.files == 1
+
+
+def test_export_prunes_removed_files(tmp_path, fake_session, fake_response, export):
+    session = fake_session(
+        fake_response(URL, chunks=[b"v1"]), fake_response(OLD_URL, chunks=[b"old"])
+    )
+    export(
+        tmp_path,
+        session,
+        [(URL, 2, 100), (OLD_URL, 3, 100)],
+        manifest=ExportManifest.load(tmp_path),
+    )
+    (tmp_path / "notes.txt").write_text("Not exported")
+
+    export(
+        tmp_path,
+        fake_session(),
+        [(URL, 2, 100)],
+        manifest=ExportManifest.load(tmp_path),
+        prune=True,
+    )
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        ".moodler_manifest.json",
+        "lecture.pdf",
+        "notes.txt",
+    ]
+    assert list(ExportManifest.load(tmp_path).entries) == ["lecture.pdf"]
@@ -0,0 +1,183 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from requests.exceptions import ConnectTimeout, HTTPError, ReadTimeout
+
+from moodler.json_stream import ITEM
+from moodler.moodle_api import (
+    MoodleAPIException,
+    MoodleAPITimeoutException,
+    MoodleBatch,
+    MoodleClient,
+    call_moodle_api_many,
+)
+
+
+def make_response(status_code=200, json_data=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = json_data
+    if status_code >= 400:
+        response.raise_for_status.side_effect = HTTPError(status_code)
+    return response
+
+
+def make_client(response=None, side_effect=None):
+    session = MagicMock()
+    session.post.return_value = response
+    session.post.side_effect = side_effect
+    return MoodleClient(url="http://moodle", timeout=(1, 2), session=session)
+
+
+def test_call_reuses_session_with_timeout():
+    client = make_client(make_response(json_data={"courses": []}))
+
+    assert client.call("core_course_get_courses") == {"courses": []}
+    assert client.call("core_course_get_courses") == {"courses": []}
+
+    assert client.session.post.call_count == 2
+    _, kwargs = client.session.post.call_args
+    assert kwargs["timeout"] == (1, 2)
+
+
+def test_call_raises_on_exception_response():
+    client = make_client(
+        make_response(json_data={"exception": "moodle_exception", "message": "x"})
+    )
+
+    with pytest.raises(MoodleAPIException):
+        client.call("core_course_get_courses")
+
+
+@pytest.mark.parametrize(
+    "response, side_effect, expected",
+    (
+        (make_response(504), None, MoodleAPITimeoutException),
+        (make_response(500), None, MoodleAPIException),
+        (None, ReadTimeout(), MoodleAPITimeoutException),
+        (None, ConnectTimeout(), MoodleAPIException),
+    ),
+)
+def test_call_http_failures(response, side_effect, expected):
+    client = make_client(response, side_effect)
+
+    with pytest.raises(expected):
+        client.call("core_course_get_courses")
+
+
+def test_call_moodle_api_many_keeps_order_and_errors(mocker):
+    def fake_call(moodle_function, userid):
+        if userid == 2:
+            raise MoodleAPIException("failed")
+        return {"userid": userid}
+
+    mocker.patch("moodler.moodle_api.call_moodle_api", fake_call)
+
+    results = call_moodle_api_many(
+        "gradereport_user_get_grade_items",
+        [{"userid": userid} for userid in range(5)],
+        max_workers=3,
+    )
+
+    assert [result.kwargs["userid"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result.response for result in results] == [
+        {"userid": 0},
+        {"userid": 1},
+        None,
+        {"userid": 3},
+        {"userid": 4},
+    ]
+    assert isinstance(results[2].error, MoodleAPIException)
+
+    with pytest.raises(MoodleAPIException):
+        call_moodle_api_many(
+            "gradereport_user_get_grade_items",
+            [{"userid": userid} for userid in range(5)],
+            raise_errors=True,
+        )
+
+
+def test_batch_splits_responses(mocker):
+    def fake_call(moodle_function, requests):
+        assert moodle_function == "tool_mobile_call_external_functions"
+        responses = []
+        for request in requests:
+            feedback_id = json.loads(request["arguments"])["feedbackid"]
+            if feedback_id == 3:
+                exception = {"errorcode": "invalidrecord", "message": "Not found"}
+                responses.append({"error": True, "exception": json.dumps(exception)})
+                # Moodle does not answer the calls after a failing one
+                break
+            else:
+                data = {"completedcount": feedback_id}
+                responses.append({"error": False, "data": json.dumps(data)})
+        return {"responses": responses}
+
+    mock_call = mocker.patch(
+        "moodler.moodle_api.call_moodle_api", side_effect=fake_call
+    )
+
+    batch = MoodleBatch(batch_size=3)
+    for feedback_id in range(6):
+        batch.add("mod_feedback_get_analysis", feedbackid=feedback_id)
+    results = batch.send()
+
+    # The call after the failing one in [3, 4, 5] is sent again
+    assert mock_call.call_count == 3
+    assert len(batch) == 0
+    assert [result.response for result in results] == [
+        {"completedcount": 0},
+        {"completedcount": 1},
+        {"completedcount": 2},
+        None,
+        {"completedcount": 4},
+        {"completedcount": 5},
+    ]
+    assert isinstance(results[3].error, MoodleAPIException)
+
+
+def test_batch_without_responses_fails_its_calls(mocker):
+    mocker.patch("moodler.moodle_api.call_moodle_api", return_value={"responses": []})
+
+    batch = MoodleBatch(batch_size=2)
+    batch.add("mod_feedback_get_analysis", feedbackid=1)
+    batch.add("mod_feedback_get_analysis", feedbackid=2)
+    results = batch.send()
+
+    assert len(results) == 2
+    assert all(isinstance(result.error, MoodleAPIException) for result in results)
+
+
+def make_stream_response(json_data, chunk_size=7):
+    body = json.dumps(json_data, ensure_ascii=False).encode()
+    response = make_response()
+    response.iter_content.return_value = [
+        body[i : i + chunk_size] for i in range(0, len(body), chunk_size)
+    ]
+    return response
+
+
+def test_stream_yields_items():
+    assignments = [
+        {"assignmentid": 1, "submissions": [{"userid": 5, "status": "נשלח"}]},
+        {"assignmentid": 2, "submissions": []},
+    ]
+    client = make_client(
+        make_stream_response({"assignments": assignments, "warnings": []})
+    )
+
+    items = client.stream("mod_assign_get_submissions", ("assignments", ITEM))
+
+    assert list(items) == assignments
+    _, kwargs = client.session.post.call_args
+    assert kwargs["stream"]
+
+
+def test_stream_raises_on_exception_response():
+    client = make_client(
+        make_stream_response({"exception": "moodle_exception", "message": "x"})
+    )
+
+    with pytest.raises(MoodleAPIException):
+        list(client.stream("mod_assign_get_submissions", ("assignments", ITEM)))
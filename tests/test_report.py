@@ -0,0 +1,45 @@
+import pytest
+
+from moodler.groups import Group
+from moodler.moodle_api import MoodleAPITimeoutException
+from moodler.report import fetch_by_group, fetch_by_user
+
+
+def fake_gradereport(moodle_function, courseid, groupid=None, userid=None):
+    if 2 in (groupid, userid):
+        raise MoodleAPITimeoutException("Timed out")
+    return {"usergrades": [{"courseid": courseid, "id": groupid or userid}]}
+
+
+def test_fetch_by_group_keeps_the_successful_groups(mocker):
+    mocker.patch(
+        "moodler.report.get_course_groups",
+        return_value=[Group({"id": group_id, "name": "g"}) for group_id in (1, 2, 3)],
+    )
+    mocker.patch("moodler.moodle_api.call_moodle_api", side_effect=fake_gradereport)
+
+    gradereport = fetch_by_group(5)
+
+    assert gradereport["usergrades"] == [
+        {"courseid": 5, "id": 1},
+        {"courseid": 5, "id": 3},
+    ]
+    assert gradereport["failed"] == [2]
+
+
+def test_fetch_by_user_keeps_the_successful_users(mocker):
+    mocker.patch("moodler.report.get_students", return_value={1: "a", 2: "b"})
+    mocker.patch("moodler.moodle_api.call_moodle_api", side_effect=fake_gradereport)
+
+    gradereport = fetch_by_user(5)
+
+    assert gradereport["usergrades"] == [{"courseid": 5, "id": 1}]
+    assert gradereport["failed"] == [2]
+
+
+def test_fetch_by_user_raises_when_every_user_failed(mocker):
+    mocker.patch("moodler.report.get_students", return_value={2: "b"})
+    mocker.patch("moodler.moodle_api.call_moodle_api", side_effect=fake_gradereport)
+
+    with pytest.raises(MoodleAPITimeoutException):
+        fetch_by_user(5)
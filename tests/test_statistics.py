@@ -1,6 +1,6 @@
 import pytest
 
-from moodler.moodle import submissions_statistics
+from moodler.moodle import status_report, submissions_statistics
 from moodler.assignment import Assignment
 from moodler.groups import Group
 
@@ -164,3 +164,51 @@ class TestSubmissionStatistics:
         mocker.patch("moodler.students.core_enrol_get_enrolled_users", return_value={})
 
         assert submissions_statistics(1, groups) == expected_result
+
+
+def test_no_groups_counts_everyone_as_null(mocker):
+    assignment_json = {"id": 1, "cmid": 1, "name": "Assignment 1"}
+    submission_json = {
+        "userid": 3,
+        "status": "submitted",
+        "attemptnumber": 0,
+        "gradingstatus": "notgraded",
+        "timemodified": 1718254280,
+        "plugins": [],
+    }
+    mocker.patch(
+        "moodler.assignment.get_assignments_by_field",
+        return_value=[Assignment(assignment_json, [submission_json], [])],
+    )
+    get_course_groups = mocker.patch("moodler.groups.get_course_groups")
+    mocker.patch("moodler.students.core_enrol_get_enrolled_users", return_value={})
+
+    stats = submissions_statistics(1)
+
+    assert list(stats) == ["null"]
+    assert stats["null"].total_ungraded == 1
+    get_course_groups.assert_not_called()
+
+
+def test_status_report_ignores_unmodified_submissions(mocker):
+    assignment_json = {"id": 1, "cmid": 1, "name": "Assignment 1"}
+    submission_json = {
+        "userid": 1,
+        "status": "draft",
+        "attemptnumber": 0,
+        "gradingstatus": "notgraded",
+        "timemodified": 0,
+        "plugins": [],
+    }
+    mocker.patch(
+        "moodler.assignment.get_assignments_by_field",
+        return_value=[Assignment(assignment_json, [submission_json], [])],
+    )
+    mocker.patch(
+        "moodler.students.core_enrol_get_enrolled_users",
+        return_value=[
+            {"id": 1, "fullname": "Student One", "roles": [{"shortname": "student"}]}
+        ],
+    )
+
+    assert status_report(1) == [("Student One", 1, "Nothing")]
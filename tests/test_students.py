@@ -0,0 +1,52 @@
+from moodler.students import (
+    STUDENT_FIELDS,
+    StudentNameIndex,
+    get_students_ids_by_name,
+    iter_enrolled_users,
+)
+
+ENROLLED_USERS = [
+    {"id": 1, "fullname": "Lee Tan", "roles": [{"shortname": "student"}]},
+    {"id": 2, "fullname": "Mia Tan", "roles": [{"shortname": "student"}]},
+    {"id": 3, "fullname": "Noa Levi", "roles": [{"shortname": "student"}]},
+    {"id": 4, "fullname": "Noa Teacher", "roles": [{"shortname": "teacher"}]},
+    {"id": 5, "fullname": "No Roles", "roles": []},
+]
+
+
+def test_name_index_finds_substrings():
+    index = StudentNameIndex({1: "Lee Tan", 2: "Mia Tan", 3: "Noa Levi"})
+
+    assert index.find("tan") == [(1, "Lee Tan"), (2, "Mia Tan")]
+    assert index.find("NOA LEVI") == [(3, "Noa Levi")]
+    assert index.find("a l") == [(3, "Noa Levi")]
+    assert index.find("e") == [(1, "Lee Tan"), (3, "Noa Levi")]
+    assert index.find("Cohen") == []
+
+
+def test_get_students_ids_by_name_fetches_once(mocker):
+    get_enrolled_users = mocker.patch(
+        "moodler.students.core_enrol_get_enrolled_users",
+        return_value=ENROLLED_USERS,
+    )
+
+    # Ambiguous names are left out
+    assert get_students_ids_by_name(1, ["Lee", "Tan", "noa", "Teacher"]) == [1, 3]
+    get_enrolled_users.assert_called_once_with(1, STUDENT_FIELDS)
+
+
+def test_enrolled_users_are_fetched_in_pages(mocker):
+    def fake_call(moodle_function, courseid, options):
+        options = {option["name"]: option["value"] for option in options}
+        assert options["userfields"] == "id, fullname, roles"
+        start = options["limitfrom"]
+        return ENROLLED_USERS[start : start + options["limitnumber"]]
+
+    call_moodle_api = mocker.patch(
+        "moodler.students.call_moodle_api", side_effect=fake_call
+    )
+
+    users = list(iter_enrolled_users(1, STUDENT_FIELDS, page_size=2))
+
+    assert users == ENROLLED_USERS
+    assert call_moodle_api.call_count == 3
@@ -0,0 +1,154 @@
+import itertools
+
+import pytest
+
+from moodler.config import settings
+from moodler.groups import Group
+from moodler.moodle import status_report, submissions_statistics
+from moodler.submission import Submission
+
+np = pytest.importorskip("numpy")
+from moodler.submission_table import GroupBy, SubmissionTable  # noqa: E402
+
+TIMESTAMP = 1718254280
+
+
+def make_submissions():
+    # Every combination of the fields the masks depend on
+    submissions = []
+    for user_id, (
+        status,
+        timestamp,
+        grade,
+        grade_timestamp,
+        gradingstatus,
+    ) in enumerate(
+        itertools.product(
+            ["new", "draft", "submitted", "reopened"],
+            [None, 0, TIMESTAMP],
+            [None, "-1.00000", "80.00000"],
+            [None, TIMESTAMP - 1, TIMESTAMP, TIMESTAMP + 1],
+            ["notgraded", "graded", "released", "inmarking"],
+        )
+    ):
+        grade_json = None
+        if grade is not None:
+            grade_json = {"grade": grade, "timemodified": grade_timestamp}
+        elif grade_timestamp is not None:
+            continue
+
+        submissions.append(
+            Submission(
+                user_id,
+                grade_json,
+                {
+                    "status": status,
+                    "attemptnumber": 0,
+                    "gradingstatus": gradingstatus,
+                    "timemodified": timestamp,
+                    "plugins": [],
+                },
+            )
+        )
+    return submissions
+
+
+def is_comparable(submission):
+    # The scalar logic only works when both timestamps are set
+    return submission.timestamp is not None and (
+        submission.grade is None or submission.grade.timestamp is not None
+    )
+
+
+def make_assignments(submissions, count=3):
+    # Splits the submissions between `count` assignments
+    return [
+        type(
+            "FakeAssignment",
+            (),
+            {
+                "uid": uid,
+                "cmid": uid,
+                "name": f"Exercise {uid}",
+                "submissions": submissions[uid::count],
+            },
+        )()
+        for uid in range(count)
+    ]
+
+
+def test_masks_match_submissions():
+    submissions = make_submissions()
+    table = SubmissionTable(make_assignments(submissions, count=1))
+
+    assert len(table) == len(submissions)
+    assert table.needs_grading().tolist() == [
+        submission.needs_grading() for submission in submissions
+    ]
+    assert table.released().tolist() == [
+        submission.released for submission in submissions
+    ]
+    assert table.submitted().tolist() == [
+        submission.status == "submitted" for submission in submissions
+    ]
+
+    comparable = [is_comparable(submission) for submission in submissions]
+    assert list(itertools.compress(table.resubmitted(), comparable)) == [
+        submission.resubmitted
+        for submission in itertools.compress(submissions, comparable)
+    ]
+
+
+def test_group_by_count_and_last():
+    by = GroupBy(["b", "a", "b", "c"], np.array([2, 1, 2, 1]))
+
+    # The groups are in the order of their first row
+    assert by.keys == [("b", 2), ("a", 1), ("c", 1)]
+    assert by.count().tolist() == [2, 1, 1]
+    assert by.count(np.array([True, False, False, True])).tolist() == [1, 0, 1]
+
+    values = np.array([5.0, 3.0, 5.0, 1.0])
+    # Ties keep the first row, groups without selected rows get -1
+    assert by.last(values, values > 0).tolist() == [0, 1, 3]
+    assert by.last(values, values > 2).tolist() == [0, 1, -1]
+
+
+@pytest.mark.parametrize(
+    "groups",
+    [None, [Group({"id": 1, "name": "A"}), Group({"id": 2, "name": "B"})]],
+)
+def test_statistics_match_counting_one_by_one(mocker, monkeypatch, groups):
+    submissions = list(filter(is_comparable, make_submissions()))
+    context = mocker.Mock(
+        students={submission.user_id: "Student" for submission in submissions},
+        assignments=make_assignments(submissions),
+        user_group_map={
+            submission.user_id: "A" if submission.user_id % 2 else "B"
+            for submission in submissions
+        },
+    )
+    ungraded_ids = [s.user_id for s in submissions if s.needs_grading()]
+    monkeypatch.setattr(
+        settings, "STUDENTS_TO_IGNORE", dict.fromkeys(ungraded_ids[:3], "Ignored")
+    )
+
+    stats = submissions_statistics(1, groups, is_verbose=True, context=context)
+    mocker.patch("moodler.moodle._submission_table", return_value=None)
+
+    assert stats == submissions_statistics(1, groups, is_verbose=True, context=context)
+
+
+def test_status_report_matches_counting_one_by_one(mocker):
+    submissions = list(filter(is_comparable, make_submissions()))
+    context = mocker.Mock(
+        students={
+            submission.user_id: f"Student {submission.user_id % 7}"
+            for submission in submissions
+        },
+        assignments=make_assignments(submissions),
+    )
+
+    report = status_report(1, context=context)
+    mocker.patch("moodler.moodle._submission_table", return_value=None)
+
+    assert report == status_report(1, context=context)
@@ -0,0 +1,75 @@
+from moodler.sync import AssignmentSync
+
+ASSIGNMENT_JSONS = [{"id": 1, "cmid": 11, "name": "Assignment 1"}]
+
+
+def submission(user_id, timemodified):
+    return {
+        "userid": user_id,
+        "groupid": 0,
+        "status": "submitted",
+        "attemptnumber": 0,
+        "gradingstatus": "notgraded",
+        "timemodified": timemodified,
+        "plugins": [],
+    }
+
+
+def grade(user_id, timemodified, attemptnumber=0):
+    return {
+        "userid": user_id,
+        "timemodified": timemodified,
+        "attemptnumber": attemptnumber,
+        "grade": "50.0",
+    }
+
+
+def test_sync_fetches_only_changes(mocker, tmp_path):
+    mocker.patch(
+        "moodler.sync.mod_assign_get_assignments", return_value=ASSIGNMENT_JSONS
+    )
+    get_submissions = mocker.patch(
+        "moodler.sync.mod_assign_get_submissions",
+        return_value={1: [submission(1, 100), submission(2, 200)]},
+    )
+    get_grades = mocker.patch(
+        "moodler.sync.mod_assign_get_grades", return_value={1: [grade(1, 150)]}
+    )
+
+    assignments = AssignmentSync(1, tmp_path).sync()
+    get_submissions.assert_called_once_with([1], 1)
+    assert len(assignments[0].submissions) == 2
+    assert not assignments[0].submissions[0].needs_grading()
+
+    # A later run reuses the saved snapshot and only fetches the changes
+    get_submissions.reset_mock()
+    get_submissions.return_value = {1: [submission(1, 300)]}
+    get_grades.return_value = {}
+
+    course_sync = AssignmentSync(1, tmp_path)
+    assignments = course_sync.sync()
+
+    get_submissions.assert_called_once_with([1], 1, since=200)
+    assert course_sync.since == 300
+    assert len(assignments[0].submissions) == 2
+    assert assignments[0].submissions[0].timestamp == 300
+    assert assignments[0].submissions[0].needs_grading()
+
+
+def test_sync_keeps_latest_attempt_grade(mocker):
+    mocker.patch(
+        "moodler.sync.mod_assign_get_assignments", return_value=ASSIGNMENT_JSONS
+    )
+    mocker.patch(
+        "moodler.sync.mod_assign_get_submissions",
+        return_value={1: [submission(1, 100)]},
+    )
+    mocker.patch(
+        "moodler.sync.mod_assign_get_grades",
+        return_value={1: [grade(1, 150, attemptnumber=1), grade(1, 120)]},
+    )
+
+    course_sync = AssignmentSync(1)
+    course_sync.sync()
+
+    assert course_sync.grades[1][1]["attemptnumber"] == 1
@@ -1,5 +1,8 @@
 import pytest
 
+from moodler import moodle_api
+from moodler.config import settings
+from moodler.moodle_api import prepare_data
 from moodler.urlencode import urlencode
 
 
@@ -69,3 +72,34 @@ from moodler.urlencode import urlencode
 )
 def test_urlencode(input, expected):
     assert urlencode(input) == expected
+
+
+def test_urlencode_quotes_unsafe_values():
+    assert urlencode({"text": "a b&c", "ok": True, "big": 1e20, "none": None}) == (
+        "text=a+b%26c&ok=True&big=1e%2B20"
+    )
+    assert urlencode({"ids": [1, 2]}, as_bytes=True) == b"ids[0]=1&ids[1]=2"
+
+
+@pytest.fixture
+def token(monkeypatch):
+    # Set the cached value, the environment may not have a token
+    monkeypatch.setitem(settings.__dict__, "TOKEN", "token")
+    # The static data holds the token of the first call of every function
+    moodle_api._static_data.cache_clear()
+    yield "token"
+    moodle_api._static_data.cache_clear()
+
+
+def test_prepare_data_appends_static_data(token):
+    assert prepare_data("core_course_get_courses", courseid=1) == (
+        f"courseid=1&wstoken={token}&wsfunction=core_course_get_courses"
+        "&moodlewsrestformat=json"
+    )
+    assert (
+        prepare_data("core_course_get_courses", as_bytes=True)
+        == (
+            f"wstoken={token}&wsfunction=core_course_get_courses"
+            "&moodlewsrestformat=json"
+        ).encode()
+    )